@@ -0,0 +1,61 @@
+import logging
+import threading
+import time
+
+
+def position_key(symbol):
+    # /positions reports crypto without the slash ("BTCUSD") while orders and the
+    # watchlist use "BTC/USD", so positions are indexed by the slash-less form
+    return symbol.replace("/", "")
+
+
+class AccountCache:
+    # Short-lived snapshots of /account and /positions. Repeated lookups inside the
+    # TTL are dict reads with no network; any order submission should call
+    # invalidate() so the next lookup sees the new state.
+    def __init__(self, fetch_account, fetch_positions, ttl=10.0, clock=time.monotonic):
+        self.fetch_account = fetch_account
+        self.fetch_positions = fetch_positions
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._account = None
+        self._account_at = None
+        self._positions = None
+        self._positions_at = None
+
+    def _fresh(self, fetched_at):
+        return fetched_at is not None and self.clock() - fetched_at < self.ttl
+
+    def account(self):
+        with self.lock:
+            if not self._fresh(self._account_at):
+                account = self.fetch_account()
+                if account is None:
+                    return None  # don't cache failures
+                self._account = account
+                self._account_at = self.clock()
+            return self._account
+
+    def positions(self, fresh=False):
+        # fresh=True skips the snapshot and refetches
+        with self.lock:
+            if fresh or not self._fresh(self._positions_at):
+                positions = self.fetch_positions()
+                if positions is None:
+                    return None
+                self._positions = {position_key(p["symbol"]): p for p in positions}
+                self._positions_at = self.clock()
+            return self._positions
+
+    def position(self, symbol):
+        positions = self.positions()
+        if positions is None:
+            return None
+        return positions.get(position_key(symbol))
+
+    def invalidate(self):
+        with self.lock:
+            self._account_at = None
+            self._positions_at = None
+        logging.debug("Account cache invalidated")
@@ -1,7 +1,10 @@
-import requests, json
+import json
 import datetime
 import time
 from alpaca_api import AlpacaAPI
+from transport import default_transport
+from account_cache import AccountCache
+from market_calendar import MarketCalendar
 from spot import *
 from config import *
 import datetime
@@ -23,18 +26,105 @@ headers = {
 }
 
 
+def fetch_account():
+    r = default_transport.get(ACCOUNT_URL, headers=headers)
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve account: {r.text}")
+        return None
+    return r.json()
+
+
+def fetch_positions():
+    r = default_transport.get(POSITIONS_URL, headers=headers)
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve positions: {r.text}")
+        return None
+    return r.json()
+
+
+def fetch_fill_activities(after, stop=None, page_size=100):
+    # FILL activities since `after`, newest first, following page tokens until
+    # the history runs out or stop(fills_so_far) says we have enough
+    fills = []
+    params = {"direction": "desc", "page_size": page_size, "after": after}
+    while True:
+        r = default_transport.get(f"{ACTIVITIES_URL}/FILL", headers=headers, params=params)
+        if r.status_code != 200:
+            logging.error(f"Failed to retrieve fill activities: {r.text}")
+            return None
+        page = r.json()
+        fills.extend(page)
+        if len(page) < page_size or (stop and stop(fills)):
+            return fills
+        params = dict(params, page_token=page[-1]["id"])
+
+
+def fetch_orders(status="all", symbols=None, after=None, limit=500):
+    # One page of orders, newest first; `symbols` narrows it server-side
+    params = {"status": status, "direction": "desc", "limit": limit}
+    if symbols:
+        params["symbols"] = ",".join(symbols)
+    if after:
+        params["after"] = after
+    r = default_transport.get(ORDERS_URL, headers=headers, params=params)
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve orders: {r.text}")
+        return None
+    return r.json()
+
+
+def fetch_order(client_order_id):
+    r = default_transport.get(
+        f"{ORDERS_URL}:by_client_order_id", headers=headers, params={"client_order_id": client_order_id}
+    )
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve order {client_order_id}: {r.text}")
+        return None
+    return r.json()
+
+
+def fetch_clock():
+    r = default_transport.get(CLOCK_URL, headers=headers)
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve market clock: {r.text}")
+        return None
+    return r.json()
+
+
+def fetch_calendar(start, end):
+    # Trading sessions (date, open, close in Eastern time) between two dates
+    r = default_transport.get(CALENDAR_URL, headers=headers, params={"start": start, "end": end})
+    if r.status_code != 200:
+        logging.error(f"Failed to retrieve market calendar: {r.text}")
+        return None
+    return r.json()
+
+
+account_cache = AccountCache(fetch_account, fetch_positions, ttl=ACCOUNT_CACHE_TTL)
+market_calendar = MarketCalendar(fetch_clock, fetch_calendar, MARKET_CALENDAR_PATH, days_ahead=MARKET_CALENDAR_DAYS)
+
+
 def get_buying_power():
-    r = requests.get(ACCOUNT_URL, headers=headers)
-    data = r.json()
-    return float(data["buying_power"])
+    account = account_cache.account()
+    if account is None:
+        return None
+    return float(account["buying_power"])
 
 
-def buy(symbol):  # This function buys a stock
-    alpaca = AlpacaAPI(headers=headers)
+def buy(symbol, snapshot=None, client_order_id=None, notional=None):  # This function buys a stock
     # url = "https://paper-api.alpaca.markets/v2/orders"
-    buying_power = get_buying_power()
-    allocation = buying_power * 0.30
-    latest_trade = alpaca.get_latest_trade(symbol)
+    if notional is not None:
+        allocation = notional  # already sized by the scan's batch allocation
+    else:
+        buying_power = get_buying_power()
+        if buying_power is None:
+            logging.error(f"Could not retrieve buying power to buy {symbol}")
+            return
+        allocation = buying_power * ALLOCATION_PER_SYMBOL
+    latest_trade = snapshot.get(symbol) if snapshot is not None else None
+    if latest_trade is None:  # no snapshot, or its price for symbol is missing/stale
+        alpaca = AlpacaAPI(headers=headers, transport=default_transport)
+        latest_trade = alpaca.get_latest_trade(symbol)
 
     if latest_trade is None or latest_trade <= 0:
         logging.error(f"Could not retrieve price for {symbol}")
@@ -53,7 +143,17 @@ def buy(symbol):  # This function buys a stock
         "symbol": symbol,
         "notional": round(allocation, 2),  # This is the number of shares to buy
     }
-    response = requests.post(ORDERS_URL, json=payload, headers=headers)
+    if client_order_id:
+        payload["client_order_id"] = client_order_id
+    # with a client_order_id the broker rejects a second copy, so retrying is safe
+    response = default_transport.post(
+        ORDERS_URL, json=payload, headers=headers, idempotent=bool(client_order_id)
+    )
+    account_cache.invalidate()  # buying power and positions just changed
+    if response.status_code == 422 and client_order_id and "client_order_id" in response.text:
+        # an earlier attempt got through before its response was lost
+        logging.warning(f"Order {client_order_id} for {symbol} already exists, using it")
+        return fetch_order(client_order_id)
     if response.status_code != 200:
         logging.error(f"Order failed for {symbol}: {response.text}")
         return None
@@ -68,41 +168,37 @@ def sell(symbol):
     # real_url = BASE_REAL_URL + f"/positions/{symbol}"
     path_symbol = quote(symbol, safe="") if "/" in symbol else symbol
     real_url = f"{POSITIONS_URL}/{path_symbol}"
-    r = requests.delete(real_url, headers=headers)  # liquidates entire position
+    r = default_transport.delete(real_url, headers=headers)  # liquidates entire position
+    account_cache.invalidate()
     if r.status_code != 200:
         logging.error(f"Sell failed for {symbol}: {r.text}")
         return None
     return r.json()
 
 
-def get_num_of_shares(symbol):
+def get_num_of_shares(symbol, fresh=True):
     # url = "https://paper-api.alpaca.markets/v2/positions"
-
-    response = requests.get(POSITIONS_URL, headers=headers)
-    data = response.json()
-
-    if response.status_code == 200:
-        for list in data:
-            if list["symbol"] == symbol:
-                # print(f"Symbol: {symbol}, Num of shares: {list['qty']}")
-                return float(list["qty"])
+    # fresh by default: callers poll this after an order to see it land;
+    # fresh=False accepts a snapshot up to ACCOUNT_CACHE_TTL old
+    positions = account_cache.positions(fresh=fresh)
+    if positions is None:
+        logging.error(f"Failed to retrieve number of shares for {symbol}")
         return 0
-    else:
-        logging.error(
-            f"Failed to retrieve number of shares for {symbol}: {data['message']}"
-        )
+
+    position = account_cache.position(symbol)  # O(1) lookup in the cached snapshot
+    if position is None:
         return 0
+    return float(position["qty"])
 
 
 def is_market_open(now=None):
-    if now is None:
-        now = datetime.datetime.now(tz=ZoneInfo("America/Los_Angeles"))
-    else:
-        now = now.astimezone(ZoneInfo("America/Los_Angeles"))
+    # Holidays and early closes come from the cached /v2/calendar
+    return market_calendar.is_open(now)
+
 
-    open_time = now.replace(hour=6, minute=30, second=0, microsecond=0)
-    close_time = now.replace(hour=13, minute=0, second=0, microsecond=0)
-    return open_time <= now <= close_time
+def is_tradable(symbol, now=None):
+    # Crypto trades 24/7; equities only during a session
+    return market_calendar.is_tradable(symbol, now)
 
 
 def main():
@@ -0,0 +1,17 @@
+def allocate(buying_power, candidates, per_symbol=0.30, total=0.90, min_shares=0.0001, min_notional=0.0):
+    # Sizes every buy signal of one scan from a single buying-power snapshot.
+    # candidates are (symbol, z, price); the deepest z goes first and gets
+    # per_symbol of buying power, and so on down until `total` of it is used.
+    # Returns [(symbol, notional)] in that order; symbols that can't get at
+    # least min_shares, or an order of at least min_notional dollars, are left
+    # out without using up any budget.
+    cap = buying_power * per_symbol
+    budget = buying_power * total
+    orders = []
+    for symbol, z, price in sorted(candidates, key=lambda c: c[1]):
+        notional = round(min(cap, budget), 2)
+        if notional < min_notional or price is None or not price > 0 or round(notional / price, 6) < min_shares:
+            continue
+        orders.append((symbol, notional))
+        budget -= notional
+    return orders
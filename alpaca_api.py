@@ -1,16 +1,20 @@
-import requests
-import statistics
 from datetime import *
-from urllib.parse import quote
+from urllib.parse import quote, unquote
 import logging
 
+from rolling_stats import mean_stdev
+from transport import default_transport
+
 
 # eth, doge, sq, dotusd,
 class AlpacaAPI:
     DATA_BASE = "https://data.alpaca.markets"
+    MAX_URL_LENGTH = 2000  # keep batched query strings well under proxy/server limits
+    BARS_PAGE_LIMIT = 10000  # max page size the bars endpoints accept
 
-    def __init__(self, headers):
+    def __init__(self, headers, transport=None):
         self.headers = headers
+        self.transport = transport or default_transport
 
     def get_latest_trade(
         self,  # This function gets the latest trade data for a stock
@@ -19,7 +23,7 @@ class AlpacaAPI:
         # url = f"https://data.alpaca.markets/v2/stocks/trades/latest?symbols={symbol}&feed=iex"
         url = f"https://data.alpaca.markets/v1beta3/crypto/us/latest/trades?symbols={quote(symbol, safe='')}"
 
-        response = requests.get(url, headers=self.headers)
+        response = self.transport.get(url, headers=self.headers)
 
         if response.status_code == 200:  # If the request is successful
             data = response.json()
@@ -42,6 +46,58 @@ class AlpacaAPI:
             )
             return None
 
+    def get_latest_trades(self, symbols):
+        # Batched version of get_latest_trade: one request per chunk of symbols
+        # instead of one per symbol. Returns {symbol: price} for every symbol found.
+        crypto = [s for s in symbols if "/" in s]
+        stocks = [s for s in symbols if "/" not in s]
+        prices = {}
+
+        for chunk in self._chunk_symbols(crypto):
+            url = f"{self.DATA_BASE}/v1beta3/crypto/us/latest/trades?symbols={chunk}"
+            prices.update(self._fetch_latest_trades(url))
+        for chunk in self._chunk_symbols(stocks):
+            url = f"{self.DATA_BASE}/v2/stocks/trades/latest?symbols={chunk}&feed=iex"
+            prices.update(self._fetch_latest_trades(url))
+
+        for symbol in symbols:
+            if symbol not in prices:
+                logging.warning(f"No trade data found for {symbol}")
+        return prices
+
+    def _chunk_symbols(self, symbols):
+        # Splits symbols into comma-joined, url-encoded groups that fit in MAX_URL_LENGTH
+        budget = self.MAX_URL_LENGTH - 100  # room for the base url and other params
+        chunk = []
+        length = 0
+        for symbol in symbols:
+            encoded = quote(symbol, safe="")
+            if chunk and length + len(encoded) + 1 > budget:
+                yield ",".join(chunk)
+                chunk = []
+                length = 0
+            chunk.append(encoded)
+            length += len(encoded) + 1
+        if chunk:
+            yield ",".join(chunk)
+
+    def _fetch_latest_trades(self, url):
+        response = self.transport.get(url, headers=self.headers)
+        if response.status_code != 200:
+            logging.error(
+                f"Failed to fetch latest trade data for {url}. Status code: {response.status_code}"
+            )
+            return {}
+
+        trade_data = response.json().get("trades", {})
+        prices = {}
+        for symbol, trade in trade_data.items():
+            latest_trade = trade.get("p", None)
+            if latest_trade is not None:
+                logging.info(f"Symbol: {symbol}, Latest Trade: {latest_trade}")
+                prices[symbol] = latest_trade
+        return prices
+
     # def get_historical_data(self, symbol, lookback=20):
     #     # url = f"https://data.alpaca.markets/v2/stocks/{symbol}/bars"
     #     url = f"https://data.alpaca.markets/v1beta3/crypto/us/bars?symbols={quote(symbol, safe='')}&timeframe=1Min&limit=100"
@@ -85,7 +141,7 @@ class AlpacaAPI:
             url = f"{self.DATA_BASE}/v2/stocks/{symbol}/bars"
             params = {"timeframe": timeframe, "limit": lookback, "start": start}
 
-        r = requests.get(url, headers=self.headers, params=params, timeout=timeout)
+        r = self.transport.get(url, headers=self.headers, params=params, timeout=timeout)
         try:
             r.raise_for_status()
         except Exception:
@@ -113,6 +169,82 @@ class AlpacaAPI:
             logging.error(f"Insufficient closes extracted for {symbol}.")
             return None, None
 
-        avg = sum(closes) / len(closes)
-        sd = statistics.stdev(closes)
-        return avg, sd
+        return mean_stdev(closes)
+
+    def get_bars(self, symbols, lookback=20, timeframe="1Day", start=None, end=None, timeout=15):
+        # Bulk version of the bars request: uses the multi-symbol bars endpoints and
+        # follows next_page_token. Returns {symbol: [bar, ...]} sorted oldest first.
+        # With a lookback, pages are read newest first and only the last `lookback`
+        # bars per symbol are kept; with lookback=None every bar since `start` is kept.
+        if start is None:
+            start = datetime.now(timezone.utc) - timedelta(days=(lookback or 20) * 3)
+        if isinstance(start, datetime):
+            start = start.isoformat().replace("+00:00", "Z")
+        if isinstance(end, datetime):
+            end = end.isoformat().replace("+00:00", "Z")
+
+        crypto = [s for s in symbols if "/" in s]
+        stocks = [s for s in symbols if "/" not in s]
+        bars = {}
+        for chunk in self._chunk_symbols(crypto):
+            url = f"{self.DATA_BASE}/v1beta3/crypto/us/bars?symbols={chunk}"
+            bars.update(self._fetch_bars(url, lookback, timeframe, start, end, timeout))
+        for chunk in self._chunk_symbols(stocks):
+            url = f"{self.DATA_BASE}/v2/stocks/bars?symbols={chunk}"
+            bars.update(self._fetch_bars(url, lookback, timeframe, start, end, timeout))
+        return bars
+
+    def _fetch_bars(self, url, lookback, timeframe, start, end, timeout):
+        wanted = {unquote(s) for s in url.split("symbols=", 1)[1].split(",")}
+        params = {
+            "timeframe": timeframe,
+            "start": start,
+            "limit": self.BARS_PAGE_LIMIT,  # page size; the limit is shared by all symbols
+            "sort": "desc" if lookback else "asc",
+        }
+        if end:
+            params["end"] = end
+
+        bars = {}
+        while True:
+            r = self.transport.get(url, headers=self.headers, params=params, timeout=timeout)
+            try:
+                r.raise_for_status()
+            except Exception:
+                logging.error(f"Failed bars for {', '.join(sorted(wanted))}: {r.status_code} {r.text}")
+                break
+
+            data = r.json()
+            for symbol, symbol_bars in (data.get("bars") or {}).items():
+                bars.setdefault(symbol, []).extend(
+                    b for b in symbol_bars if isinstance(b, dict) and "c" in b
+                )
+
+            page_token = data.get("next_page_token")
+            if not page_token:
+                break
+            if lookback and all(len(bars.get(s, [])) >= lookback for s in wanted):
+                break  # every symbol already has enough recent bars
+            params = dict(params, page_token=page_token)
+
+        for symbol, symbol_bars in bars.items():
+            symbol_bars.sort(key=lambda b: b.get("t") or "")
+            if lookback:
+                bars[symbol] = symbol_bars[-lookback:]
+        return bars
+
+    def get_historical_closes(self, symbols, lookback=20, timeframe="1Day"):
+        # {symbol: [close, ...]} for every symbol, oldest first
+        bars = self.get_bars(symbols, lookback=lookback, timeframe=timeframe)
+        return {symbol: [b["c"] for b in bars.get(symbol, [])] for symbol in symbols}
+
+    def get_historical_stats(self, symbols, lookback=20, timeframe="1Day"):
+        # Bulk version of get_historical_data: {symbol: (average, stdev)}
+        stats = {}
+        for symbol, closes in self.get_historical_closes(symbols, lookback, timeframe).items():
+            if len(closes) < 2:
+                logging.error(f"No/insufficient bars for {symbol}.")
+                stats[symbol] = (None, None)
+            else:
+                stats[symbol] = mean_stdev(closes)
+        return stats
@@ -0,0 +1,61 @@
+import asyncio
+
+from alpaca_api import AlpacaAPI
+
+
+class AsyncAlpacaAPI:
+    # asyncio front end for AlpacaAPI. Each call runs the blocking request in a worker
+    # thread (sharing the pooled transport), and a semaphore caps how many requests
+    # are in flight at once so a big watchlist doesn't flood the API.
+    def __init__(self, headers, transport=None, concurrency=8):
+        self.api = AlpacaAPI(headers, transport=transport)
+        self.headers = headers
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._loop = None
+
+    @property
+    def semaphore(self):
+        # one semaphore per event loop, since main() starts a fresh loop every scan
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _call(self, fn, *args, **kwargs):
+        async with self.semaphore:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def get_latest_trade(self, symbol):
+        return await self._call(self.api.get_latest_trade, symbol)
+
+    async def get_latest_trades(self, symbols):
+        return await self._call(self.api.get_latest_trades, symbols)
+
+    async def get_historical_data(self, symbol, lookback=20, timeframe="1Day", timeout=15):
+        return await self._call(
+            self.api.get_historical_data, symbol, lookback=lookback, timeframe=timeframe, timeout=timeout
+        )
+
+    async def get_bars(self, symbols, lookback=20, timeframe="1Day", start=None, end=None):
+        return await self._call(
+            self.api.get_bars, symbols, lookback=lookback, timeframe=timeframe, start=start, end=end
+        )
+
+    async def gather_bars(self, groups, lookback=20, timeframe="1Day", start=None):
+        # Fans out one bars request per group of symbols and merges the results
+        results = await asyncio.gather(
+            *(self.get_bars(g, lookback=lookback, timeframe=timeframe, start=start) for g in groups)
+        )
+        bars = {}
+        for result in results:
+            bars.update(result)
+        return bars
+
+    async def gather_latest_trades(self, groups):
+        results = await asyncio.gather(*(self.get_latest_trades(g) for g in groups))
+        prices = {}
+        for result in results:
+            prices.update(result)
+        return prices
@@ -0,0 +1,276 @@
+import argparse
+import datetime
+import heapq
+
+import numpy as np
+
+from allocation import allocate
+from rolling_stats import rolling_mean_std
+from signals import SECONDS_PER_DAY
+
+ALLOCATION = 0.30  # same sizing as the live scan: 30% of buying power per order (ALLOCATION_PER_SYMBOL)
+ALLOCATION_TOTAL = 0.90  # and at most 90% across one bar's buys (ALLOCATION_TOTAL)
+MIN_SHARES = 0.0001  # account_stuff.buy refuses anything smaller ("Out of funds")
+MIN_ORDER_NOTIONAL = 1.0  # nor does the live scan send orders under spot.MIN_ORDER_NOTIONAL
+
+
+def next_true(mask):
+    # next_true(mask)[t, n] = first t' >= t with mask[t', n], or T if there is none.
+    # Has one extra row at the bottom so index T is always safe to look up.
+    rows = mask.shape[0]
+    idx = np.where(mask, np.arange(rows)[:, None], rows)
+    out = np.empty((rows + 1,) + mask.shape[1:], dtype=np.int64)
+    out[-1] = rows
+    out[:-1] = np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+    return out
+
+
+def prepare(closes, params):
+    # Everything that doesn't depend on the position path, vectorized over (T, N)
+    means, stdevs = rolling_mean_std(closes, params["lookback"])
+    valid = np.isfinite(closes) & np.isfinite(means) & np.isfinite(stdevs) & (stdevs != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(valid, (closes - means) / stdevs, np.nan)
+        buy_signal = valid & (closes < means - stdevs * params["z_score"])
+        z_exit = valid & ((z >= params["mean_exit_z"]) | (z <= params["panic_z"]))
+    return {
+        "z": z,
+        "valid": valid,
+        "next_buy": next_true(buy_signal),
+        "next_z_exit": next_true(z_exit),
+        "next_valid": next_true(valid),
+    }
+
+
+def find_exit(closes, times, prep, params, col, t0, entry_price):
+    # First bar after t0 where handle_sell_check would sell, and why
+    rows = closes.shape[0]
+    if t0 + 1 >= rows:
+        return rows, None
+    z_exit = prep["next_z_exit"][t0 + 1, col]
+
+    hold_start = np.searchsorted(times, times[t0] + params["max_hold_days"] * SECONDS_PER_DAY)
+    hold_exit = prep["next_valid"][max(hold_start, t0 + 1), col] if hold_start < rows else rows
+
+    # hard take-profit only needs searching up to the earliest of the other exits
+    end = min(z_exit, hold_exit, rows)
+    window = closes[t0 + 1 : end, col]
+    hit = prep["valid"][t0 + 1 : end, col] & (window >= entry_price * params["hard_tp"])
+    tp_exit = t0 + 1 + int(np.argmax(hit)) if hit.any() else rows
+
+    exit_t = min(z_exit, hold_exit, tp_exit)
+    if exit_t >= rows:
+        return rows, None
+    if exit_t == tp_exit:
+        reason = "take_profit"
+    elif exit_t == z_exit:
+        reason = "mean_exit" if prep["z"][exit_t, col] >= params["mean_exit_z"] else "panic"
+    else:
+        reason = "max_hold"
+    return exit_t, reason
+
+
+def run_backtest(
+    closes, times, symbols, params, initial_cash=10000.0, allocation=ALLOCATION,
+    cooldown_after_exit=False, allocation_total=ALLOCATION_TOTAL,
+):
+    # Replays (T, N) closes through the MeanReversion rules. `times` is epoch
+    # seconds per row. Prices are bar closes and mean/stdev use the last
+    # `lookback` closes including the current bar, like the live scan does with
+    # today's forming bar. Within a bar, sells execute before buys, and the bar's
+    # buys are sized together like the live scan: from the cash left after the
+    # sells, deepest z first, `allocation` each up to `allocation_total` in all.
+    #
+    # Live, the repeat-buy cooldown only looks at purchase_info, which is cleared
+    # on sell, so it never blocks a re-entry; cooldown_after_exit=True enforces
+    # min_seconds_between_purchases from the previous buy instead.
+    closes = np.asarray(closes, dtype=float)
+    times = np.asarray(times, dtype=float)
+    rows, cols = closes.shape
+    prep = prepare(closes, params)
+    cooldown = params["min_seconds_between_purchases"]
+
+    cash = initial_cash
+    events = []  # heap of (bar, kind, col); kind 0 = exit, 1 = entry candidate
+    for col in range(cols):
+        t = prep["next_buy"][0, col]
+        if t < rows:
+            heapq.heappush(events, (t, 1, col))
+
+    open_positions = {}  # col -> the open trade
+    trades = []
+    cash_delta = np.zeros(rows + 1)
+    qty_delta = np.zeros((rows + 1, cols))
+
+    while events:
+        t, kind, col = heapq.heappop(events)
+        t, col = int(t), int(col)
+        price = float(closes[t, col])
+        if kind == 0:
+            trade = open_positions.pop(col)
+            proceeds = trade["qty"] * price
+            cash += proceeds
+            cash_delta[t] += proceeds
+            qty_delta[t, col] -= trade["qty"]
+            trade.update(
+                exit_index=t,
+                exit_time=float(times[t]),
+                exit_price=price,
+                pnl=proceeds - trade["notional"],
+                reason=trade.pop("pending_reason"),
+            )
+            t0 = trade["entry_index"]
+            next_t = t + 1
+            if cooldown_after_exit:
+                next_t = max(next_t, int(np.searchsorted(times, times[t0] + cooldown, side="right")))
+            if next_t < rows and prep["next_buy"][next_t, col] < rows:
+                heapq.heappush(events, (prep["next_buy"][next_t, col], 1, col))
+            continue
+
+        # exits sort first, so every other event left at this bar is a buy too
+        batch = [col]
+        while events and events[0][0] == t:
+            batch.append(int(heapq.heappop(events)[2]))
+        batch.sort()
+        candidates = [(c, float(prep["z"][t, c]), float(closes[t, c])) for c in batch]
+        sized = dict(allocate(cash, candidates, allocation, allocation_total, MIN_SHARES, MIN_ORDER_NOTIONAL))
+        for col in batch:
+            if col not in sized:
+                # out of funds: try again on the next signal
+                if prep["next_buy"][t + 1, col] < rows:
+                    heapq.heappush(events, (prep["next_buy"][t + 1, col], 1, col))
+                continue
+            price = float(closes[t, col])
+            notional = sized[col]
+            qty = notional / price  # notional order: fractional fill for the full amount
+            cash -= notional
+            cash_delta[t] -= notional
+            qty_delta[t, col] += qty
+            exit_t, reason = find_exit(closes, times, prep, params, col, t, price)
+            trades.append(
+                {
+                    "symbol": symbols[col],
+                    "entry_index": t,
+                    "entry_time": float(times[t]),
+                    "entry_price": price,
+                    "qty": qty,
+                    "notional": notional,
+                    "z": candidates[batch.index(col)][1],
+                    "exit_index": None,
+                    "exit_time": None,
+                    "exit_price": None,
+                    "pnl": None,
+                    "reason": None,
+                    "pending_reason": reason,
+                }
+            )
+            open_positions[col] = trades[-1]
+            if exit_t < rows:
+                heapq.heappush(events, (exit_t, 0, col))
+
+    for trade in trades:
+        trade.pop("pending_reason", None)
+
+    # equity = cash + mark-to-market of open quantities, with prices carried forward
+    cash_curve = initial_cash + np.cumsum(cash_delta[:rows])
+    qty_held = np.cumsum(qty_delta[:rows], axis=0)
+    marks = forward_fill(closes)
+    equity = cash_curve + np.nansum(qty_held * np.nan_to_num(marks), axis=1)
+    return {
+        "trades": trades,
+        "times": times,
+        "equity": equity,
+        "summary": summarize(trades, times, equity, initial_cash),
+    }
+
+
+def forward_fill(values):
+    rows = values.shape[0]
+    idx = np.where(np.isfinite(values), np.arange(rows)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+def summarize(trades, times, equity, initial_cash):
+    closed = [t for t in trades if t["exit_time"] is not None]
+    pnls = np.array([t["pnl"] for t in closed], dtype=float)
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.array([])
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = (equity - peak) / peak if len(equity) else equity
+
+    sharpe = 0.0
+    if len(returns) > 1 and returns.std() > 0:
+        bar_seconds = float(np.median(np.diff(times)))
+        bars_per_year = 365 * SECONDS_PER_DAY / bar_seconds if bar_seconds > 0 else 0
+        sharpe = float(returns.mean() / returns.std() * np.sqrt(bars_per_year))
+
+    holding = [(t["exit_time"] - t["entry_time"]) / SECONDS_PER_DAY for t in closed]
+    return {
+        "initial_cash": initial_cash,
+        "final_equity": float(equity[-1]) if len(equity) else initial_cash,
+        "total_return": float(equity[-1] / initial_cash - 1) if len(equity) else 0.0,
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "sharpe": sharpe,
+        "trades": len(trades),
+        "closed_trades": len(closed),
+        "open_trades": len(trades) - len(closed),
+        "win_rate": float((pnls > 0).mean()) if len(pnls) else 0.0,
+        "avg_pnl": float(pnls.mean()) if len(pnls) else 0.0,
+        "avg_holding_days": float(np.mean(holding)) if holding else 0.0,
+    }
+
+
+def bars_to_matrix(bars, symbols):
+    # {symbol: [bar, ...]} -> (times, closes) aligned on the union of timestamps
+    stamps = sorted({b["t"] for symbol in symbols for b in bars.get(symbol, [])})
+    index = {t: i for i, t in enumerate(stamps)}
+    closes = np.full((len(stamps), len(symbols)), np.nan)
+    for col, symbol in enumerate(symbols):
+        for b in bars.get(symbol, []):
+            closes[index[b["t"]], col] = b["c"]
+    times = np.array(
+        [datetime.datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp() for t in stamps]
+    )
+    return times, closes
+
+
+def load_closes(symbols, timeframe, start, end=None, store_path="data/bars"):
+    # (times, closes) for the research tools: syncs the local bar store (only
+    # missing bars are downloaded) and reads the matrix straight from it
+    from account_stuff import headers  # spot has to be loaded through account_stuff
+    from alpaca_api import AlpacaAPI
+    from bar_store import BarStore, to_epoch
+
+    store = BarStore(store_path)
+    store.sync(AlpacaAPI(headers), symbols, timeframe, f"{start}T00:00:00Z")
+    end = to_epoch(f"{end}T00:00:00Z") if end else None
+    return store.matrix(symbols, timeframe, to_epoch(f"{start}T00:00:00Z"), end)
+
+
+def research_settings():
+    # (STRATEGY_PARAMS, BAR_STORE_PATH, watchlist) for the command-line tools.
+    import account_stuff  # spot and account_stuff import each other: load spot through it
+    from spot import STRATEGY_PARAMS, BAR_STORE_PATH, watchlist
+
+    return STRATEGY_PARAMS, BAR_STORE_PATH, watchlist
+
+
+def main():
+    STRATEGY_PARAMS, BAR_STORE_PATH, watchlist = research_settings()
+
+    parser = argparse.ArgumentParser(description="Backtest the MeanReversion rules")
+    parser.add_argument("--start", required=True, help="ISO date, e.g. 2024-01-01")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--timeframe", default="1Day")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    args = parser.parse_args()
+
+    symbols = sorted(watchlist)
+    times, closes = load_closes(symbols, args.timeframe, args.start, args.end, BAR_STORE_PATH)
+    result = run_backtest(closes, times, symbols, STRATEGY_PARAMS, initial_cash=args.cash)
+    for key, value in result["summary"].items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
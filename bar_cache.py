@@ -0,0 +1,160 @@
+import asyncio
+from collections import deque
+import logging
+import time
+
+from bar_store import TIMEFRAME_SECONDS, to_iso
+from rolling_stats import RollingStats
+
+
+class BarCache:
+    # Keeps the last `lookback` bars per (symbol, timeframe) so each cycle only has
+    # to download bars newer than the ones we already have.
+    def __init__(self, api, lookback=20, timeframe="1Day", store=None, indicators=None):
+        self.api = api
+        self.store = store  # optional BarStore to warm up from instead of the API
+        self.indicators = indicators  # optional Indicators registry, fed the same closes
+        self.lookback = lookback
+        self.timeframe = timeframe
+        self.bars = {}  # (symbol, timeframe) -> deque of bar dicts, oldest first
+        self.last_t = {}  # (symbol, timeframe) -> timestamp of the newest cached bar
+        self.rolling = {}  # (symbol, timeframe) -> RollingStats over the cached closes
+
+    def refresh(self, symbols, timeframe=None):
+        timeframe = timeframe or self.timeframe
+        self.seed_from_store(symbols, timeframe)
+        cold = [s for s in symbols if (s, timeframe) not in self.last_t]
+        warm = [s for s in symbols if (s, timeframe) in self.last_t]
+
+        if cold:  # first time we see these symbols: pull the full lookback
+            fetched = self.api.get_bars(cold, lookback=self.lookback, timeframe=timeframe)
+            for symbol in cold:
+                self.add_bars(symbol, fetched.get(symbol, []), timeframe)
+
+        for start, group in self.by_last_t(warm, timeframe):  # only bars at or after the newest one we have
+            fetched = self.api.get_bars(group, lookback=None, timeframe=timeframe, start=start)
+            for symbol in group:
+                self.add_bars(symbol, fetched.get(symbol, []), timeframe)
+
+    def by_last_t(self, symbols, timeframe):
+        # [(newest cached bar time, symbols)], so one symbol that fell behind
+        # doesn't make all the others download again from its last bar
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(self.last_t[(symbol, timeframe)], []).append(symbol)
+        return sorted(groups.items())
+
+    async def refresh_async(self, symbols, async_api, groups, timeframe=None):
+        # Same as refresh, but the requests for every group of symbols go out
+        # concurrently through an AsyncAlpacaAPI
+        timeframe = timeframe or self.timeframe
+        self.seed_from_store(symbols, timeframe)
+        cold = [[s for s in g if (s, timeframe) not in self.last_t] for g in groups]
+        warm = [[s for s in g if (s, timeframe) in self.last_t] for g in groups]
+        cold = [g for g in cold if g]
+        warm = [g for g in warm if g]
+
+        jobs = []
+        if cold:
+            jobs.append(async_api.gather_bars(cold, lookback=self.lookback, timeframe=timeframe))
+        starts = {}  # start -> the groups' symbols that are at it
+        for g in warm:
+            for start, group in self.by_last_t(g, timeframe):
+                starts.setdefault(start, []).append(group)
+        for start, groups_at in sorted(starts.items()):
+            jobs.append(async_api.gather_bars(groups_at, lookback=None, timeframe=timeframe, start=start))
+        fetched = {}
+        for result in await asyncio.gather(*jobs):
+            fetched.update(result)
+
+        for symbol in symbols:
+            self.add_bars(symbol, fetched.get(symbol, []), timeframe)
+
+    def refresh_resampled(self, symbols, resampler, now=None):
+        # Every timeframe the Resampler builds, from one 1Min download instead
+        # of one download per timeframe. New symbols get each timeframe's
+        # lookback directly (or the bars since the store's last one), minus its
+        # newest (maybe still forming) bar; the minutes from the oldest of those
+        # bars on rebuild it, and after that only minutes we haven't seen are fetched.
+        now = time.time() if now is None else now
+        cold = [s for s in symbols if resampler.cursor(s) is None]
+        if cold:
+            first = {}
+            for timeframe in resampler.timeframes:
+                self.seed_from_store(cold, timeframe)
+                fresh = [s for s in cold if (s, timeframe) not in self.last_t]
+                fetched = self.api.get_bars(fresh, lookback=self.lookback, timeframe=timeframe) if fresh else {}
+                for start, group in self.by_last_t([s for s in cold if s not in fresh], timeframe):
+                    fetched.update(self.api.get_bars(group, lookback=None, timeframe=timeframe, start=start))
+                for symbol in cold:
+                    bars = fetched.get(symbol, [])
+                    self.add_bars(symbol, bars[:-1], timeframe)
+                    if bars:
+                        first[symbol] = min(first.get(symbol, bars[-1]["t"]), bars[-1]["t"])
+            longest = max(TIMEFRAME_SECONDS[tf] for tf in resampler.timeframes)
+            for symbol in cold:
+                resampler.start_at(symbol, first.get(symbol, to_iso(now - now % 60 - longest)))
+
+        start = min(resampler.cursor(s) for s in symbols)
+        fetched = self.api.get_bars(symbols, lookback=None, timeframe="1Min", start=start)
+        for symbol in symbols:
+            for timeframe, bars in resampler.add(symbol, fetched.get(symbol, []), now).items():
+                self.add_bars(symbol, bars, timeframe)
+
+    def seed_from_store(self, symbols, timeframe):
+        # Symbols we haven't seen yet start from the local store, so only bars
+        # after its last one have to come from the API
+        if self.store is None:
+            return
+        for symbol in symbols:
+            if (symbol, timeframe) not in self.last_t:
+                try:
+                    stored = self.store.last_bars(symbol, timeframe, self.lookback)
+                except ValueError as e:
+                    logging.error(f"Not seeding {symbol} {timeframe} from the bar store: {e}")
+                    continue
+                if len(stored) >= 2:
+                    self.add_bars(symbol, stored, timeframe)
+
+    def add_bars(self, symbol, new_bars, timeframe=None):
+        timeframe = timeframe or self.timeframe
+        key = (symbol, timeframe)
+        buffer = self.bars.setdefault(key, deque(maxlen=self.lookback))
+        rolling = self.rolling.setdefault(key, RollingStats(self.lookback))
+        if self.indicators is not None:
+            self.indicators.attach(key, rolling)
+        for bar in new_bars:
+            t = bar.get("t")
+            last_t = self.last_t.get(key)
+            if last_t is not None and t < last_t:
+                continue
+            if last_t is not None and t == last_t:
+                buffer[-1] = bar  # the newest bar is still forming, take the update
+                rolling.replace_last(bar["c"])
+                if self.indicators is not None:
+                    self.indicators.replace_last(key, bar["c"])
+                continue
+            buffer.append(bar)
+            rolling.push(bar["c"])
+            if self.indicators is not None:
+                self.indicators.push(key, bar["c"])
+            self.last_t[key] = t
+        if not new_bars and key not in self.last_t:
+            logging.warning(f"No bars cached for {symbol} ({timeframe})")
+
+    def closes(self, symbol, timeframe=None):
+        key = (symbol, timeframe or self.timeframe)
+        return [b["c"] for b in self.bars.get(key, ())]
+
+    def indicator(self, symbol, name, timeframe=None):
+        # Latest value of a registered indicator, or None
+        if self.indicators is None:
+            return None
+        return self.indicators.get((symbol, timeframe or self.timeframe), name)
+
+    def stats(self, symbol, timeframe=None):
+        rolling = self.rolling.get((symbol, timeframe or self.timeframe))
+        if rolling is None or len(rolling) < 2:
+            logging.error(f"No/insufficient bars for {symbol}.")
+            return None, None
+        return rolling.mean_stdev()
@@ -0,0 +1,209 @@
+import argparse
+import datetime
+import logging
+import os
+
+import numpy as np
+
+COLUMNS = {"t": "<i8", "o": "<f8", "h": "<f8", "l": "<f8", "c": "<f8", "v": "<f8"}
+TIMEFRAME_SECONDS = {"1Min": 60, "5Min": 300, "15Min": 900, "30Min": 1800, "1Hour": 3600, "4Hour": 14400, "1Day": 86400}
+
+
+def to_epoch(t):
+    return int(datetime.datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp())
+
+
+def to_iso(epoch):
+    return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class BarStore:
+    # Local bar history, one directory per symbol/timeframe holding one flat
+    # fixed-width file per column (t as int64 epoch seconds, OHLCV as float64).
+    # Files are append-only and read back as read-only memmaps, so loading years
+    # of bars doesn't copy anything until it's used. A prepend rewrites them all,
+    # committed by a journal file so a crash can't leave the columns misaligned.
+    def __init__(self, root="data/bars"):
+        self.root = root
+
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol.replace("/", "_"), timeframe)
+
+    def _file(self, symbol, timeframe, column):
+        return os.path.join(self._dir(symbol, timeframe), f"{column}.{COLUMNS[column][1:]}")
+
+    def _journal(self, symbol, timeframe):
+        return os.path.join(self._dir(symbol, timeframe), "prepend.rows")
+
+    def recover(self, symbol, timeframe):
+        # Finishes or undoes an interrupted prepend. Its rewritten columns only
+        # count once the journal (their row count) is in place: then every one
+        # is swapped in, otherwise the partial set is thrown away.
+        journal = self._journal(symbol, timeframe)
+        tmps = {column: f"{self._file(symbol, timeframe, column)}.tmp" for column in COLUMNS}
+        if not os.path.exists(journal):
+            for tmp in list(tmps.values()) + [f"{journal}.tmp"]:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            return
+        with open(journal) as f:
+            n = int(f.read())
+        for column, tmp in tmps.items():
+            if os.path.exists(tmp):
+                if os.path.getsize(tmp) != n * np.dtype(COLUMNS[column]).itemsize:
+                    raise ValueError(f"Bar store {self._dir(symbol, timeframe)}: {tmp} doesn't hold the journal's {n} rows")
+                os.replace(tmp, self._file(symbol, timeframe, column))
+        os.remove(journal)
+
+    def rows(self, symbol, timeframe):
+        # t is written last, so a crash mid-append can only leave extra bytes in
+        # the other columns; the row count is whatever every column has. A
+        # column shorter than t means the files no longer line up.
+        self.recover(symbol, timeframe)
+        counts = {}
+        for column, dtype in COLUMNS.items():
+            file = self._file(symbol, timeframe, column)
+            size = os.path.getsize(file) if os.path.exists(file) else 0
+            counts[column] = size // np.dtype(dtype).itemsize
+        short = [column for column, n in counts.items() if n < counts["t"]]
+        if short:
+            raise ValueError(f"Bar store {self._dir(symbol, timeframe)} is inconsistent: {counts}")
+        return min(counts.values())
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        # {column: memmap} for bars with start <= t < end (epoch seconds)
+        n = self.rows(symbol, timeframe)
+        if n == 0:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+        cols = {
+            column: np.memmap(self._file(symbol, timeframe, column), dtype=dtype, mode="r", shape=(n,))
+            for column, dtype in COLUMNS.items()
+        }
+        lo = 0 if start is None else int(np.searchsorted(cols["t"], start))
+        hi = n if end is None else int(np.searchsorted(cols["t"], end))
+        return {column: values[lo:hi] for column, values in cols.items()}
+
+    def first_time(self, symbol, timeframe):
+        t = self.read(symbol, timeframe)["t"]
+        return int(t[0]) if len(t) else None
+
+    def last_time(self, symbol, timeframe):
+        t = self.read(symbol, timeframe)["t"]
+        return int(t[-1]) if len(t) else None
+
+    def _arrays(self, bars):
+        bars = sorted((b for b in bars if "t" in b and "c" in b), key=lambda b: b["t"])
+        arrays = {"t": np.array([to_epoch(b["t"]) for b in bars], dtype=COLUMNS["t"])}
+        for column in "ohlcv":
+            arrays[column] = np.array([b.get(column, np.nan) for b in bars], dtype=COLUMNS[column])
+        return arrays
+
+    def append(self, symbol, timeframe, bars):
+        # Appends bars newer than the last stored one; returns how many were added
+        arrays = self._arrays(bars)
+        last = self.last_time(symbol, timeframe)
+        keep = arrays["t"] > last if last is not None else np.ones(len(arrays["t"]), dtype=bool)
+        keep &= np.concatenate([[True], np.diff(arrays["t"]) > 0])  # drop duplicate stamps
+        if not keep.any():
+            return 0
+        n = self.rows(symbol, timeframe)
+        os.makedirs(self._dir(symbol, timeframe), exist_ok=True)
+        for column in [c for c in COLUMNS if c != "t"] + ["t"]:
+            file = self._file(symbol, timeframe, column)
+            with open(file, "r+b" if os.path.exists(file) else "wb") as f:
+                f.truncate(n * np.dtype(COLUMNS[column]).itemsize)  # drop bytes from a torn append
+                f.seek(0, os.SEEK_END)
+                f.write(arrays[column][keep].tobytes())
+        return int(keep.sum())
+
+    def prepend(self, symbol, timeframe, bars):
+        # Backfills bars older than the first stored one. Rare (only when the
+        # requested history grows), so the files are rewritten and swapped in
+        # together once the journal says all of them were written.
+        arrays = self._arrays(bars)
+        first = self.first_time(symbol, timeframe)
+        if first is None:
+            return self.append(symbol, timeframe, bars)
+        keep = arrays["t"] < first
+        keep &= np.concatenate([[True], np.diff(arrays["t"]) > 0])
+        if not keep.any():
+            return 0
+        current = self.read(symbol, timeframe)
+        for column in COLUMNS:
+            with open(f"{self._file(symbol, timeframe, column)}.tmp", "wb") as f:
+                f.write(arrays[column][keep].tobytes())
+                f.write(np.asarray(current[column]).tobytes())
+        journal = self._journal(symbol, timeframe)
+        with open(f"{journal}.tmp", "w") as f:
+            f.write(str(int(keep.sum()) + len(current["t"])))
+        os.replace(f"{journal}.tmp", journal)  # the commit point
+        self.recover(symbol, timeframe)
+        return int(keep.sum())
+
+    def sync(self, api, symbols, timeframe, start, now=None):
+        # Downloads only what's missing: history before the first stored bar back
+        # to `start`, and closed bars after the last stored one. The bar that is
+        # still forming is left out, it gets picked up once it closes.
+        now = now or datetime.datetime.now(datetime.timezone.utc).timestamp()
+        start = to_epoch(start) if isinstance(start, str) else int(start)
+        closed_before = now - TIMEFRAME_SECONDS.get(timeframe, 0)
+        added = {}
+
+        head = [s for s in symbols if (self.first_time(s, timeframe) or start) > start]
+        if head:
+            end = max(self.first_time(s, timeframe) for s in head)
+            fetched = api.get_bars(head, lookback=None, timeframe=timeframe, start=to_iso(start), end=to_iso(end))
+            for symbol in head:
+                added[symbol] = self.prepend(symbol, timeframe, fetched.get(symbol, []))
+
+        tails = {}
+        for symbol in symbols:
+            last = self.last_time(symbol, timeframe)
+            tails.setdefault(start if last is None else last + 1, []).append(symbol)
+        for tail_start, group in sorted(tails.items()):
+            fetched = api.get_bars(group, lookback=None, timeframe=timeframe, start=to_iso(tail_start))
+            for symbol in group:
+                bars = [b for b in fetched.get(symbol, []) if to_epoch(b["t"]) <= closed_before]
+                added[symbol] = added.get(symbol, 0) + self.append(symbol, timeframe, bars)
+
+        logging.info(f"Bar store sync {timeframe}: {sum(added.values())} new bars for {len(symbols)} symbols")
+        return added
+
+    def last_bars(self, symbol, timeframe, n):
+        # The newest n bars as Alpaca-style dicts, for seeding BarCache
+        cols = self.read(symbol, timeframe)
+        lo = max(0, len(cols["t"]) - n)
+        return [
+            {"t": to_iso(cols["t"][i]), **{c: float(cols[c][i]) for c in "ohlcv"}}
+            for i in range(lo, len(cols["t"]))
+        ]
+
+    def matrix(self, symbols, timeframe, start=None, end=None):
+        # (times, closes) aligned on the union of timestamps, for the backtester
+        cols = [self.read(s, timeframe, start, end) for s in symbols]
+        times = np.unique(np.concatenate([c["t"] for c in cols])) if cols else np.empty(0, dtype=np.int64)
+        closes = np.full((len(times), len(symbols)), np.nan)
+        for j, c in enumerate(cols):
+            closes[np.searchsorted(times, c["t"]), j] = c["c"]
+        return times.astype(float), closes
+
+
+def main():
+    from account_stuff import headers  # spot has to be loaded through account_stuff
+    from alpaca_api import AlpacaAPI
+    from spot import watchlist
+
+    parser = argparse.ArgumentParser(description="Local bar store")
+    parser.add_argument("command", choices=["sync"])
+    parser.add_argument("--start", required=True, help="ISO date to backfill from, e.g. 2024-01-01")
+    parser.add_argument("--timeframe", default="1Day")
+    parser.add_argument("--root", default="data/bars")
+    args = parser.parse_args()
+
+    added = BarStore(args.root).sync(AlpacaAPI(headers), sorted(watchlist), args.timeframe, f"{args.start}T00:00:00Z")
+    for symbol, n in sorted(added.items()):
+        print(f"{symbol}: +{n}")
+
+
+if __name__ == "__main__":
+    main()
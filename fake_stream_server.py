@@ -0,0 +1,108 @@
+import asyncio
+import json
+import logging
+
+import websockets
+
+
+class FakeAlpacaStream:
+    # Local stand-in for Alpaca's market-data websocket so streaming mode can be
+    # exercised offline. Speaks the same connect/auth/subscribe handshake, then
+    # replays `messages` to each client. With `drop_after`, the first connection is
+    # closed after that many messages to exercise reconnects.
+    def __init__(self, messages=(), key="key", secret="secret", host="127.0.0.1", port=0, drop_after=None, interval=0.0):
+        self.messages = list(messages)
+        self.key = key
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.drop_after = drop_after
+        self.interval = interval
+        self.connections = 0
+        self.subscriptions = []  # every subscribe action received
+        self.server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def handler(self, ws):
+        self.connections += 1
+        first = self.connections == 1
+        await ws.send(json.dumps([{"T": "success", "msg": "connected"}]))
+
+        auth = json.loads(await ws.recv())
+        if auth.get("key") != self.key or auth.get("secret") != self.secret:
+            await ws.send(json.dumps([{"T": "error", "code": 402, "msg": "auth failed"}]))
+            return
+        await ws.send(json.dumps([{"T": "success", "msg": "authenticated"}]))
+
+        sub = json.loads(await ws.recv())
+        self.subscriptions.append(sub)
+        await ws.send(
+            json.dumps([{"T": "subscription", "trades": sub.get("trades", []), "bars": sub.get("bars", [])}])
+        )
+
+        messages = self.messages
+        if first and self.drop_after is not None:
+            messages = messages[: self.drop_after]
+        for msg in messages:
+            await ws.send(json.dumps([msg]))
+            if self.interval:
+                await asyncio.sleep(self.interval)
+        if first and self.drop_after is not None:
+            return  # close the socket so the client has to reconnect
+        await ws.wait_closed()
+
+
+class FakeTradeUpdates(FakeAlpacaStream):
+    # Same idea for the account stream: auth, listen to trade_updates, then
+    # replay `messages` (trade_updates payloads) as binary frames like paper does
+    async def handler(self, ws):
+        self.connections += 1
+        auth = json.loads(await ws.recv())
+        status = "authorized" if auth.get("key") == self.key and auth.get("secret") == self.secret else "unauthorized"
+        await ws.send(json.dumps({"stream": "authorization", "data": {"action": "authenticate", "status": status}}))
+        if status != "authorized":
+            return
+        listen = json.loads(await ws.recv())
+        self.subscriptions.append(listen)
+        await ws.send(json.dumps({"stream": "listening", "data": listen["data"]}).encode())
+        for msg in self.messages:
+            await ws.send(json.dumps({"stream": "trade_updates", "data": msg}).encode())
+            if self.interval:
+                await asyncio.sleep(self.interval)
+        await ws.wait_closed()
+
+
+async def serve_forever(port=8765):
+    msgs = [
+        {"T": "t", "S": "BTC/USD", "p": 64000.0, "t": "2025-09-19T19:30:00Z"},
+        {"T": "b", "S": "BTC/USD", "o": 64000.0, "h": 64100.0, "l": 63900.0, "c": 64050.0, "v": 1.5, "t": "2025-09-19T19:30:00Z"},
+    ]
+    async with FakeAlpacaStream(msgs, port=port, interval=1.0) as server:
+        logging.info(f"Fake stream listening on {server.url}")
+        print(f"Fake stream listening on {server.url}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        print(" Exiting...")
@@ -0,0 +1,253 @@
+from collections import deque
+import math
+
+import numpy as np
+
+RSI_PERIOD = 14
+
+
+class Incremental:
+    # Indicators whose whole state is a few numbers. push(x) folds in a new
+    # close; replace_last(x) swaps the newest one (its bar is still forming)
+    # by rolling back to the state before it. Both are O(1).
+    def __init__(self):
+        self.before = None
+
+    def push(self, x):
+        self.before = self.state()
+        self.apply(float(x))
+
+    def replace_last(self, x):
+        if self.before is None:
+            return self.push(x)
+        self.restore(self.before)
+        self.apply(float(x))
+
+
+class EWMA(Incremental):
+    # Exponentially weighted mean and volatility of the closes
+    def __init__(self, span):
+        super().__init__()
+        self.alpha = 2.0 / (span + 1.0)
+        self.mean = None
+        self.var = 0.0
+
+    def state(self):
+        return self.mean, self.var
+
+    def restore(self, state):
+        self.mean, self.var = state
+
+    def apply(self, x):
+        if self.mean is None:
+            self.mean = x
+            return
+        d = x - self.mean
+        self.mean += self.alpha * d
+        self.var = (1.0 - self.alpha) * (self.var + self.alpha * d * d)
+
+    def value(self):
+        if self.mean is None:
+            return None, None
+        return self.mean, math.sqrt(self.var)
+
+
+class RSI(Incremental):
+    # Wilder's RSI: simple averages of the first `period` gains/losses, then
+    # Wilder smoothing. None until `period` changes have been seen.
+    def __init__(self, period=RSI_PERIOD):
+        super().__init__()
+        self.period = period
+        self.last = None
+        self.gain = 0.0
+        self.loss = 0.0
+        self.changes = 0
+
+    def state(self):
+        return self.last, self.gain, self.loss, self.changes
+
+    def restore(self, state):
+        self.last, self.gain, self.loss, self.changes = state
+
+    def apply(self, x):
+        if self.last is not None:
+            change = x - self.last
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.changes += 1
+            if self.changes <= self.period:
+                self.gain += gain / self.period
+                self.loss += loss / self.period
+            else:
+                self.gain += (gain - self.gain) / self.period
+                self.loss += (loss - self.loss) / self.period
+        self.last = x
+
+    def value(self):
+        if self.changes < self.period:
+            return None
+        if self.loss == 0:
+            return 100.0 if self.gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self.gain / self.loss)
+
+
+class HalfLife:
+    # Mean-reversion half-life in bars, from the least-squares fit of
+    # x[t] - x[t-1] on x[t-1] over the last `window` changes. None when the
+    # fit doesn't revert (slope >= 0). Sums are kept relative to an anchor and
+    # rebuilt every `window` updates, as in RollingStats.
+    def __init__(self, window):
+        self.window = window
+        self.closes = deque(maxlen=window + 1)
+        self.pairs = deque(maxlen=window)  # (x[t-1], x[t] - x[t-1]), anchored
+        self.anchor = None
+        self.sums = [0.0, 0.0, 0.0, 0.0]  # sum x, sum dy, sum x*x, sum x*dy
+        self.updates = 0
+
+    def _add(self, pair, sign):
+        x, dy = pair
+        s = self.sums
+        s[0] += sign * x
+        s[1] += sign * dy
+        s[2] += sign * x * x
+        s[3] += sign * x * dy
+
+    def _pair(self):
+        prev, x = self.closes[-2], self.closes[-1]
+        return prev - self.anchor, x - prev
+
+    def _rebuild(self):
+        self.anchor = float(np.mean(self.closes))
+        self.pairs = deque(maxlen=self.window)
+        closes = list(self.closes)
+        for prev, x in zip(closes, closes[1:]):
+            self.pairs.append((prev - self.anchor, x - prev))
+        self.sums = [0.0, 0.0, 0.0, 0.0]
+        for pair in self.pairs:
+            self._add(pair, 1)
+        self.updates = 0
+
+    def push(self, x):
+        self.closes.append(float(x))
+        if self.anchor is None:
+            self.anchor = float(x)
+        if len(self.closes) >= 2:
+            if len(self.pairs) == self.window:
+                self._add(self.pairs[0], -1)
+            pair = self._pair()
+            self.pairs.append(pair)
+            self._add(pair, 1)
+        self.updates += 1
+        if self.updates >= self.window:
+            self._rebuild()
+
+    def replace_last(self, x):
+        if len(self.closes) < 2:
+            self.closes.clear()
+            self.anchor = None
+            return self.push(x)
+        self._add(self.pairs.pop(), -1)
+        self.closes[-1] = float(x)
+        pair = self._pair()
+        self.pairs.append(pair)
+        self._add(pair, 1)
+
+    def value(self):
+        n = len(self.pairs)
+        if n < 3:
+            return None
+        sx, sy, sxx, sxy = self.sums
+        var = sxx - sx * sx / n
+        if var <= 0:
+            return None
+        slope = (sxy - sx * sy / n) / var
+        if not -1.0 < slope < 0.0:
+            return None
+        return -math.log(2.0) / math.log(1.0 + slope)
+
+
+class View:
+    # Reads another indicator's state; nothing of its own to update
+    def push(self, x):
+        pass
+
+    def replace_last(self, x):
+        pass
+
+
+class MeanStdev(View):
+    def __init__(self, rolling):
+        self.rolling = rolling
+
+    def value(self):
+        if len(self.rolling) < 2:
+            return None, None
+        return self.rolling.mean_stdev()
+
+
+class ZScore(View):
+    # How many stdevs the newest close is from the rolling mean
+    def __init__(self, rolling):
+        self.rolling = rolling
+
+    def value(self):
+        mean, stdev = self.rolling.mean_stdev()
+        if stdev is None or stdev == 0:
+            return None
+        return (self.rolling.values[-1] - mean) / stdev
+
+
+class BollingerWidth(View):
+    # (upper - lower) / middle for bands `k` stdevs either side of the mean
+    def __init__(self, rolling, k=2.0):
+        self.rolling = rolling
+        self.k = k
+
+    def value(self):
+        mean, stdev = self.rolling.mean_stdev()
+        if stdev is None or not mean:
+            return None
+        return 2.0 * self.k * stdev / mean
+
+
+def default_indicators(rolling):
+    # The set every (symbol, timeframe) gets. The windowed ones read the
+    # RollingStats BarCache already keeps, so they cost nothing extra.
+    return {
+        "mean_stdev": MeanStdev(rolling),
+        "zscore": ZScore(rolling),
+        "bollinger_width": BollingerWidth(rolling),
+        "ewma": EWMA(rolling.window),
+        "rsi": RSI(RSI_PERIOD),
+        "half_life": HalfLife(rolling.window),
+    }
+
+
+class Indicators:
+    # Registry of indicator sets, one per BarCache key, fed from the same
+    # closes as its ring buffer. Adding an indicator to the factory adds no
+    # requests and no passes over the bars: each one updates per new close.
+    def __init__(self, factory=default_indicators):
+        self.factory = factory
+        self.sets = {}  # (symbol, timeframe) -> {name: indicator}
+
+    def attach(self, key, rolling):
+        if key not in self.sets:
+            self.sets[key] = self.factory(rolling)
+        return self.sets[key]
+
+    def push(self, key, x):
+        for indicator in self.sets[key].values():
+            indicator.push(x)
+
+    def replace_last(self, key, x):
+        for indicator in self.sets[key].values():
+            indicator.replace_last(x)
+
+    def get(self, key, name):
+        indicators = self.sets.get(key)
+        if indicators is None or name not in indicators:
+            return None
+        return indicators[name].value()
+
+    def values(self, key):
+        return {name: indicator.value() for name, indicator in self.sets.get(key, {}).items()}
@@ -0,0 +1,182 @@
+import bisect
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+import requests
+
+EASTERN = ZoneInfo("America/New_York")
+
+
+def is_crypto(symbol):
+    return "/" in symbol
+
+
+def parse_sessions(calendar):
+    # /v2/calendar days -> sorted (open, close) epoch pairs. Times are Eastern;
+    # early closes simply come back with an earlier "close"
+    sessions = []
+    for day in calendar:
+        date = datetime.date.fromisoformat(day["date"])
+        bounds = []
+        for key in ("open", "close"):
+            hour, minute = (int(part) for part in day[key].split(":"))
+            bounds.append(datetime.datetime.combine(date, datetime.time(hour, minute), EASTERN).timestamp())
+        sessions.append(tuple(bounds))
+    return sorted(sessions)
+
+
+def regular_hours(now, days=7):
+    # Weekday 09:30-16:00 Eastern: only used when the calendar has never loaded
+    today = datetime.datetime.fromtimestamp(now, EASTERN).date()
+    return parse_sessions(
+        {"date": (today + datetime.timedelta(days=i)).isoformat(), "open": "09:30", "close": "16:00"}
+        for i in range(-1, days)
+        if (today + datetime.timedelta(days=i)).weekday() < 5
+    )
+
+
+class MarketCalendar:
+    # When US equities trade, from Alpaca's /v2/clock and /v2/calendar. Both are
+    # fetched at most once a day (and kept in `path` across restarts); is_open()
+    # is answered from the cached session that covers `now`, so the scan loop
+    # can ask about every symbol without any network. Crypto is always open.
+    def __init__(self, fetch_clock, fetch_calendar, path=None, days_ahead=14, retry_after=300.0, clock=time.time):
+        self.fetch_clock = fetch_clock
+        self.fetch_calendar = fetch_calendar
+        self.path = path
+        self.days_ahead = days_ahead
+        self.retry_after = retry_after
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.sessions = []  # sorted (open, close) epochs
+        self.fetched_on = None  # Eastern date of the last successful fetch
+        self.failed_at = None
+        self.window = (0.0, 0.0, False)  # [start, end) over which is_open() doesn't change
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self.sessions = [tuple(s) for s in cached["sessions"]]
+            self.fetched_on = datetime.date.fromisoformat(cached["fetched_on"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring market calendar cache {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fetched_on": self.fetched_on.isoformat(), "sessions": self.sessions}, f)
+        os.replace(tmp, self.path)
+
+    def stale(self, now):
+        today = datetime.datetime.fromtimestamp(now, EASTERN).date()
+        if self.fetched_on == today:
+            return False
+        return self.failed_at is None or now - self.failed_at >= self.retry_after
+
+    def refresh(self, now=None):
+        # Re-reads the calendar for the next `days_ahead` days. The clock is the
+        # authority on today's session (it knows about unscheduled closures),
+        # so it overrides whatever the calendar says about right now.
+        now = self.clock() if now is None else now
+        today = datetime.datetime.fromtimestamp(now, EASTERN).date()
+        calendar = self.fetch("calendar", self.fetch_calendar, today.isoformat(), (today + datetime.timedelta(days=self.days_ahead)).isoformat())
+        market_clock = self.fetch("clock", self.fetch_clock)
+        if calendar is None and market_clock is None:
+            self.failed_at = now
+            logging.error("Failed to refresh the market calendar; keeping the cached sessions")
+            return False
+
+        sessions = parse_sessions(calendar) if calendar is not None else list(self.sessions)
+        if market_clock is not None:
+            sessions = self.apply_clock(sessions, market_clock, now)
+        with self.lock:
+            self.sessions = sessions
+            self.fetched_on = today
+            self.failed_at = None
+            self.window = (0.0, 0.0, False)
+        self.save()
+        logging.info(f"Market calendar refreshed: {len(sessions)} sessions through {today + datetime.timedelta(days=self.days_ahead)}")
+        return True
+
+    @staticmethod
+    def fetch(name, fetcher, *args):
+        # A fetch that raises (timeout, connection reset, a body that isn't
+        # JSON) counts as a failed one, so is_open() still answers from the cache
+        try:
+            return fetcher(*args)
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"Failed to fetch the market {name}: {e}")
+            return None
+
+    @staticmethod
+    def apply_clock(sessions, market_clock, now):
+        next_open = datetime.datetime.fromisoformat(market_clock["next_open"]).timestamp()
+        next_close = datetime.datetime.fromisoformat(market_clock["next_close"]).timestamp()
+        if market_clock["is_open"]:
+            # open now until next_close; drop anything the calendar had overlapping it
+            start = next((s[0] for s in sessions if s[0] <= now < s[1]), now)
+            current = (start, next_close)
+        else:
+            # closed until next_open: no session may cover the gap
+            current = (next_open, next_close)
+            sessions = [s for s in sessions if s[1] <= now or s[0] >= next_open]
+        sessions = [s for s in sessions if s[1] <= current[0] or s[0] >= current[1]]
+        return sorted(sessions + [current])
+
+    def is_open(self, now=None):
+        # Whether equities trade at `now` (epoch seconds or an aware datetime)
+        if isinstance(now, datetime.datetime):
+            now = now.timestamp()
+        now = self.clock() if now is None else now
+        start, end, open_ = self.window
+        if start <= now < end:
+            return open_
+        if self.stale(now):
+            self.refresh(now)
+        with self.lock:
+            sessions = self.sessions or regular_hours(now)
+            start, end, open_ = self.find_window(sessions, now)
+            # look again after midnight Eastern, when the daily refresh is due
+            today = datetime.datetime.fromtimestamp(now, EASTERN).date()
+            midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time(), EASTERN)
+            self.window = (start, min(end, midnight.timestamp()), open_)
+            return open_
+
+    @staticmethod
+    def find_window(sessions, now):
+        # The stretch around `now` during which the answer stays the same:
+        # the session itself, or the gap between two sessions
+        i = bisect.bisect_right(sessions, (now, float("inf")))
+        if i and now < sessions[i - 1][1]:
+            return (sessions[i - 1][0], sessions[i - 1][1], True)
+        start = sessions[i - 1][1] if i else float("-inf")
+        end = sessions[i][0] if i < len(sessions) else now + 60.0  # past the cache: recheck soon
+        return (start, end, False)
+
+    def is_tradable(self, symbol, now=None):
+        return is_crypto(symbol) or self.is_open(now)
+
+    def tradable(self, symbols, now=None):
+        # Symbols worth requesting data for right now
+        stocks_open = None
+        out = []
+        for symbol in symbols:
+            if not is_crypto(symbol):
+                if stocks_open is None:
+                    stocks_open = self.is_open(now)
+                if not stocks_open:
+                    continue
+            out.append(symbol)
+        return out
@@ -0,0 +1,92 @@
+import logging
+import queue
+import threading
+import time
+
+from account_cache import position_key
+
+
+def make_client_order_id(side, symbol, created):
+    # Derived from the intent alone, so every retry of one intent carries the
+    # same id and the broker turns a repeat into a rejection instead of a fill
+    return f"mr-{side}-{position_key(symbol)}-{int(created * 1000)}"
+
+
+class OrderQueue:
+    # Order execution off the scan thread. submit() records an intent and returns
+    # straight away; a single worker places intents in FIFO order through
+    # execute(intent) and hands each result to on_result(intent, order), where
+    # order is None when nothing was placed. While one intent for a symbol is
+    # queued or in flight, further intents for it are dropped.
+    def __init__(self, execute, on_result=None, clock=time.time):
+        self.execute = execute
+        self.on_result = on_result
+        self.clock = clock
+        self.queue = queue.Queue()
+        self.in_flight = {}  # symbol -> intent
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="order-queue", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def submit(self, side, symbol, **details):
+        created = self.clock()
+        intent = dict(
+            details,
+            side=side,
+            symbol=symbol,
+            created=created,
+            client_order_id=make_client_order_id(side, symbol, created),
+        )
+        with self.lock:
+            if symbol in self.in_flight:
+                logging.info(f"{side} {symbol} not queued, {self.in_flight[symbol]['side']} already in flight")
+                return None
+            self.in_flight[symbol] = intent
+        self.queue.put(intent)
+        return intent
+
+    def busy(self, symbol):
+        with self.lock:
+            return symbol in self.in_flight
+
+    def join(self):
+        # Blocks until every queued intent has been processed
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            intent = self.queue.get()
+            try:
+                if intent is None:
+                    return
+                self.process(intent)
+            finally:
+                self.queue.task_done()
+
+    def process(self, intent):
+        start = time.monotonic()
+        order = None
+        try:
+            order = self.execute(intent)
+        except Exception as e:
+            logging.error(f"{intent['side']} {intent['symbol']} failed: {e}")
+        logging.debug(f"{intent['side']} {intent['symbol']} took {time.monotonic() - start:.3f}s")
+        try:
+            if self.on_result:
+                self.on_result(intent, order)
+        except Exception as e:
+            logging.error(f"Handling the {intent['side']} result for {intent['symbol']} failed: {e}")
+        finally:
+            with self.lock:
+                self.in_flight.pop(intent["symbol"], None)
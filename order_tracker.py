@@ -0,0 +1,118 @@
+from collections import OrderedDict
+import datetime
+import logging
+import threading
+
+DONE_STATUSES = {"canceled", "expired", "rejected", "done_for_day", "stopped", "suspended", "replaced"}
+
+
+def is_open(entry):
+    return entry["status"] != "filled" and entry["status"] not in DONE_STATUSES
+
+
+def progress(order):
+    status = order.get("status")
+    return float(order.get("filled_qty") or 0), status == "filled" or status in DONE_STATUSES
+
+
+def parse_time(t):
+    return datetime.datetime.fromisoformat(t.replace("Z", "+00:00")) if t else None
+
+
+class OrderTracker:
+    # In-memory table of the orders we placed, keyed by client_order_id and kept
+    # current from trade_updates events (or REST polls when the stream is down).
+    # on_fill(entry) runs once when an order is completely filled, on_done(entry)
+    # once when it ends any other way (possibly with a partial fill).
+    def __init__(self, on_fill=None, on_done=None, max_unmatched=200):
+        self.on_fill = on_fill
+        self.on_done = on_done
+        self.orders = {}
+        # events for orders not tracked yet: the stream can report a fill
+        # before the POST/DELETE response reaches track()
+        self.unmatched = OrderedDict()
+        self.max_unmatched = max_unmatched
+        self.live = False  # set by the trade_updates stream while it's connected
+        self.lock = threading.Lock()
+
+    def track(self, order, **meta):
+        # Registers an order from the POST/DELETE response; `meta` rides along
+        # to the callbacks
+        entry = {
+            "client_order_id": order["client_order_id"],
+            "id": order.get("id"),
+            "symbol": order["symbol"],
+            "side": order.get("side"),
+            "status": "new",
+            "filled_qty": 0.0,
+            "filled_avg_price": None,
+            "filled_at": None,
+            "submitted_at": parse_time(order.get("submitted_at")),
+            "meta": meta,
+        }
+        with self.lock:
+            self.orders[entry["client_order_id"]] = entry
+            early = self.unmatched.pop(entry["client_order_id"], None)
+        # the response can already be filled; of it and an early event, the
+        # one further along goes last so the entry doesn't step backwards
+        states = [order] if early is None else sorted([order, early], key=progress)
+        for state in states:
+            self.update(state)
+        return entry
+
+    def update(self, order):
+        # Applies the latest state of an order (the "order" object of a
+        # trade_updates event, or a REST order). Unknown orders are held back
+        # in case track() is about to register them.
+        with self.lock:
+            client_order_id = order.get("client_order_id")
+            entry = self.orders.get(client_order_id)
+            if entry is None and client_order_id:
+                self.unmatched[client_order_id] = order
+                self.unmatched.move_to_end(client_order_id)
+                while len(self.unmatched) > self.max_unmatched:
+                    self.unmatched.popitem(last=False)
+            if entry is None or not is_open(entry):
+                return None  # not ours (yet), or a late duplicate of a final event
+            status = order.get("status", entry["status"])
+            entry["status"] = status
+            entry["filled_qty"] = float(order.get("filled_qty") or 0)
+            if order.get("filled_avg_price") is not None:
+                entry["filled_avg_price"] = float(order["filled_avg_price"])
+            if order.get("filled_at"):
+                entry["filled_at"] = parse_time(order["filled_at"])
+
+        if status == "filled":
+            logging.info(
+                f"{entry['side']} {entry['symbol']} filled: {entry['filled_qty']} @ {entry['filled_avg_price']}"
+            )
+            if self.on_fill:
+                self.on_fill(entry)
+        elif status in DONE_STATUSES:
+            logging.warning(f"{entry['side']} {entry['symbol']} {status} after filling {entry['filled_qty']}")
+            if self.on_done:
+                self.on_done(entry)
+        return entry
+
+    def handle_event(self, event):
+        # One trade_updates payload: {"event": "fill", "order": {...}, ...}
+        return self.update(event.get("order", {}))
+
+    def pending(self, symbol, side=None):
+        with self.lock:
+            return [
+                e
+                for e in self.orders.values()
+                if e["symbol"] == symbol and is_open(e) and (side is None or e["side"] == side)
+            ]
+
+    def open_orders(self):
+        with self.lock:
+            return [e for e in self.orders.values() if is_open(e)]
+
+    def poll(self, fetch_order):
+        # REST fallback: one lookup per open order, for when trade_updates is down
+        for entry in self.open_orders():
+            order = fetch_order(entry["client_order_id"])
+            if order is not None:
+                self.update(order)
@@ -0,0 +1,115 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+
+class PositionStore:
+    # Durable copy of purchase_info, so a restart still knows entry prices and
+    # purchase times (HARD_TP and MAX_HOLD_DAYS depend on them). SQLite in WAL
+    # mode with synchronous=NORMAL: a commit is an append to the WAL without an
+    # fsync, which keeps writes off the order path's critical time, and the
+    # database still survives the process dying at any point.
+    #
+    # `positions` holds the open entries; `trades` is an append-only log of every
+    # buy and sell.
+    def __init__(self, path="data/positions.db"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()  # the streaming runner records from worker threads
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS positions (
+                symbol TEXT PRIMARY KEY,
+                entry_price REAL NOT NULL,
+                purchase_time TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                price REAL,
+                time TEXT NOT NULL
+            );
+            """
+        )
+
+    def _write(self, statements):
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for sql, args in statements:
+                    self.conn.execute(sql, args)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def record_buy(self, symbol, entry_price, purchase_time):
+        when = purchase_time.isoformat()
+        self._write(
+            [
+                (
+                    "INSERT OR REPLACE INTO positions (symbol, entry_price, purchase_time) VALUES (?, ?, ?)",
+                    (symbol, entry_price, when),
+                ),
+                ("INSERT INTO trades (symbol, side, price, time) VALUES (?, 'buy', ?, ?)", (symbol, entry_price, when)),
+            ]
+        )
+
+    def record_sell(self, symbol, exit_price, exit_time):
+        self._write(
+            [
+                ("DELETE FROM positions WHERE symbol = ?", (symbol,)),
+                (
+                    "INSERT INTO trades (symbol, side, price, time) VALUES (?, 'sell', ?, ?)",
+                    (symbol, exit_price, exit_time.isoformat()),
+                ),
+            ]
+        )
+
+    def restore(self, symbol, entry_price, purchase_time):
+        # Entry rebuilt from broker data at startup: not a trade of ours, so it
+        # only goes into positions
+        self._write(
+            [
+                (
+                    "INSERT OR REPLACE INTO positions (symbol, entry_price, purchase_time) VALUES (?, ?, ?)",
+                    (symbol, entry_price, purchase_time.isoformat()),
+                )
+            ]
+        )
+
+    def forget(self, symbol):
+        # Position closed outside the strategy (or while it was down)
+        self._write([("DELETE FROM positions WHERE symbol = ?", (symbol,))])
+
+    def purchase_info(self):
+        # {symbol: {"entry_price", "purchase_time"}} in the shape trading_logic uses
+        with self.lock:
+            rows = self.conn.execute("SELECT symbol, entry_price, purchase_time FROM positions").fetchall()
+        return {
+            symbol: {
+                "entry_price": entry_price,
+                "purchase_time": datetime.datetime.fromisoformat(purchase_time),
+            }
+            for symbol, entry_price, purchase_time in rows
+        }
+
+    def trades(self, symbol=None):
+        sql = "SELECT symbol, side, price, time FROM trades"
+        args = ()
+        if symbol is not None:
+            sql += " WHERE symbol = ?"
+            args = (symbol,)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY id", args).fetchall()
+        return [{"symbol": s, "side": side, "price": p, "time": t} for s, side, p, t in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
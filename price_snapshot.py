@@ -0,0 +1,37 @@
+import logging
+import time
+
+
+class PriceSnapshot:
+    # Latest-trade prices taken once per scan and shared by the strategy and the
+    # order functions, so placing an order doesn't refetch a price we already have.
+    # Prices older than max_age seconds are treated as missing.
+    def __init__(self, prices=None, max_age=30.0, clock=time.monotonic):
+        self.max_age = max_age
+        self.clock = clock
+        self.prices = {}  # symbol -> (price, taken_at)
+        if prices:
+            self.update(prices)
+
+    def update(self, prices):
+        now = self.clock()
+        for symbol, price in prices.items():
+            if price is not None:
+                self.prices[symbol] = (price, now)
+
+    def age(self, symbol):
+        if symbol not in self.prices:
+            return None
+        return self.clock() - self.prices[symbol][1]
+
+    def get(self, symbol):
+        if symbol not in self.prices:
+            return None
+        price, taken_at = self.prices[symbol]
+        if self.clock() - taken_at > self.max_age:
+            logging.warning(f"Snapshot price for {symbol} is stale ({self.clock() - taken_at:.1f}s old)")
+            return None
+        return price
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
@@ -0,0 +1,88 @@
+import logging
+import math
+import threading
+
+import numpy as np
+
+from rate_limiter import TokenBucket
+
+
+def threshold_distance(prices, means, stdevs, entry_prices, params):
+    # How many stdevs each symbol's price has to move before a rule fires: the
+    # -z_score entry for symbols we don't hold; mean_exit_z, panic_z or the
+    # hard_tp price for the ones we do. Zero when a rule already fires or a
+    # value is missing (those are worth a look soon).
+    prices = np.asarray(prices, dtype=float)
+    means = np.asarray(means, dtype=float)
+    stdevs = np.asarray(stdevs, dtype=float)
+    entry_prices = np.asarray(entry_prices, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (prices - means) / stdevs
+        entry = np.maximum(z + params["z_score"], 0.0)
+        exit_mean = np.maximum(params["mean_exit_z"] - z, 0.0)
+        panic = np.maximum(z - params["panic_z"], 0.0)
+        take_profit = np.maximum((entry_prices * params["hard_tp"] - prices) / stdevs, 0.0)
+        held = np.isfinite(entry_prices)
+        distance = np.where(held, np.minimum(np.minimum(exit_mean, panic), take_profit), entry)
+    valid = np.isfinite(distance) & np.isfinite(stdevs) & (stdevs > 0)
+    return np.where(valid, distance, 0.0)
+
+
+class PriorityPoller:
+    # Decides which symbols get a quick price check between full scans. The
+    # poll interval grows from min_interval (within `near` stdevs of a
+    # threshold) to max_interval (`far` stdevs or more), log-linearly in
+    # between. Every check costs about one latest-trades request per asset
+    # class, paid from a requests_per_minute budget; ticks without budget are
+    # skipped, and so are ticks where headroom() (the rate limiter's spare
+    # tokens) says the scans need the quota.
+    def __init__(self, min_interval=5.0, max_interval=120.0, near=0.25, far=3.0, requests_per_minute=24, max_symbols=None, clock=None, headroom=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near = near
+        self.far = far
+        self.max_symbols = max_symbols
+        self.headroom = headroom
+        kwargs = {"clock": clock} if clock else {}
+        self.budget = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute // 6), **kwargs)
+        self.distance = {}
+        self.next_due = {}
+        self.lock = threading.Lock()
+
+    def interval(self, distance):
+        if distance <= self.near:
+            return self.min_interval
+        if distance >= self.far:
+            return self.max_interval
+        share = (distance - self.near) / (self.far - self.near)
+        return self.min_interval * math.exp(share * math.log(self.max_interval / self.min_interval))
+
+    def observe(self, symbols, distances, now):
+        # Called after any evaluation: the symbol's next check is scheduled off
+        # its fresh distance
+        with self.lock:
+            for symbol, d in zip(symbols, distances):
+                d = float(d)
+                self.distance[symbol] = d
+                self.next_due[symbol] = now + self.interval(d)
+
+    def due(self, now, symbols=None):
+        # Symbols to check this tick, nearest first; [] when the budget is spent
+        with self.lock:
+            pool = self.next_due if symbols is None else {s: self.next_due[s] for s in symbols if s in self.next_due}
+            ready = sorted((s for s, t in pool.items() if t <= now), key=lambda s: self.distance[s])
+        if self.max_symbols:
+            ready = ready[: self.max_symbols]
+        if not ready:
+            return []
+        if self.headroom is not None and self.headroom() < len({"/" in s for s in ready}):
+            logging.debug("Priority check skipped, the data API quota is needed for the scans")
+            return []
+        # one request for crypto and one for stocks; the class holding the
+        # nearest symbol gets the budget first
+        paid = set()
+        for crypto in dict.fromkeys("/" in s for s in ready):
+            if self.budget.try_acquire() > 0:
+                break
+            paid.add(crypto)
+        return [s for s in ready if ("/" in s) in paid]
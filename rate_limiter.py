@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+# Alpaca's default quotas, requests per minute
+RATE_LIMITS = {"data": 200, "trading": 200}
+
+
+class TokenBucket:
+    # `capacity` tokens refilled at `rate` per second. Low-priority callers can't
+    # take the last `reserve` tokens, so orders still go out when a scan has
+    # used up the rest of the quota.
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, reserve=0):
+        # Takes a token and returns 0, or returns how long to wait before trying again
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens - reserve >= 1 - 1e-9:  # float slack, or a refill can fall just short
+                self.tokens -= 1
+                return 0.0
+            return (1 + reserve - self.tokens) / self.rate
+
+    def available(self):
+        # Tokens on hand right now, 0 while a server reset is pending
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            return 0.0 if now < self.blocked_until else self.tokens
+
+    def acquire(self, reserve=0, sleep=time.sleep):
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(reserve)
+            if wait <= 0:
+                return waited
+            sleep(wait)
+            waited += wait
+
+    def calibrate(self, limit=None, remaining=None, reset_in=None):
+        # Takes the server's view over ours: its quota, how much of it is left,
+        # and (when nothing is) how long until it resets
+        with self.lock:
+            self._refill(self.clock())
+            if limit:
+                self.capacity = limit
+                self.rate = limit / 60.0
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if remaining <= 0 and reset_in:
+                    self.blocked_until = max(self.blocked_until, self.clock() + reset_in)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class RateLimiter:
+    # One bucket per Alpaca API (market data and trading have separate quotas),
+    # shared by every request that goes through the Transport.
+    def __init__(self, limits=None, reserve_fraction=0.1, clock=time.monotonic, wall_clock=time.time, sleep=time.sleep):
+        limits = dict(RATE_LIMITS, **(limits or {}))
+        self.buckets = {api: TokenBucket(n / 60.0, n, clock) for api, n in limits.items()}
+        self.reserve_fraction = reserve_fraction
+        self.wall_clock = wall_clock
+        self.sleep = sleep
+
+    def api(self, url):
+        return "data" if "data.alpaca.markets" in url else "trading"
+
+    def acquire(self, url, priority=False):
+        bucket = self.buckets[self.api(url)]
+        reserve = 0 if priority else int(bucket.capacity * self.reserve_fraction)
+        waited = bucket.acquire(reserve, sleep=self.sleep)
+        if waited > 0.5:
+            logging.info(f"Rate limiter held a {self.api(url)} request for {waited:.2f}s")
+        return waited
+
+    def headroom(self, url):
+        # Requests a low-priority caller could make to url's API right now
+        # without waiting
+        bucket = self.buckets[self.api(url)]
+        return max(0.0, bucket.available() - int(bucket.capacity * self.reserve_fraction))
+
+    def observe(self, url, response):
+        # Reads X-RateLimit-Limit/Remaining/Reset and 429s off a response
+        bucket = self.buckets[self.api(url)]
+        headers = getattr(response, "headers", None) or {}
+        try:
+            limit = int(headers["X-RateLimit-Limit"]) if "X-RateLimit-Limit" in headers else None
+            remaining = int(headers["X-RateLimit-Remaining"]) if "X-RateLimit-Remaining" in headers else None
+            reset = float(headers["X-RateLimit-Reset"]) if "X-RateLimit-Reset" in headers else None
+        except (TypeError, ValueError):
+            return
+        reset_in = max(0.0, reset - self.wall_clock()) if reset is not None else None
+        if limit or remaining is not None:
+            bucket.calibrate(limit, remaining, reset_in)
+        if response.status_code == 429:
+            # hold every caller, not just the one that got the 429
+            retry_after = headers.get("Retry-After")
+            wait = reset_in or (float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else 0)
+            if wait:
+                bucket.pause(wait)
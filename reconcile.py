@@ -0,0 +1,91 @@
+import datetime
+import logging
+
+from account_cache import position_key
+
+
+def parse_time(t):
+    return datetime.datetime.fromisoformat(t.replace("Z", "+00:00"))
+
+
+def last_buys(fills, orders=()):
+    # {position_key: (price, time)} of the newest buy per symbol, from fill
+    # activities first and filled orders for anything the fills didn't cover
+    found = {}
+    for fill in fills:
+        key = position_key(fill["symbol"])
+        if fill.get("side") == "buy" and key not in found:
+            found[key] = (float(fill["price"]), parse_time(fill["transaction_time"]))
+    for order in orders:
+        key = position_key(order["symbol"])
+        if order.get("side") == "buy" and order.get("filled_at") and key not in found:
+            found[key] = (float(order["filled_avg_price"]), parse_time(order["filled_at"]))
+    return found
+
+
+def rebuild_purchase_info(watchlist, positions, buys, stored, now, tz):
+    # purchase_info for every watchlist symbol we actually hold. The store wins
+    # when it has the symbol (it has the exact entry the strategy saw); otherwise
+    # the broker's average entry price and the newest buy fill are used, and
+    # failing that the position is treated as bought now, so MAX_HOLD_DAYS
+    # restarts rather than selling on a guess.
+    info = {}
+    for symbol in watchlist:
+        key = position_key(symbol)
+        position = positions.get(key)
+        if position is None:
+            continue
+        if symbol in stored:
+            info[symbol] = stored[symbol]
+            continue
+        price, when = buys.get(key, (None, None))
+        if when is None:
+            logging.warning(f"No buy found for held {symbol}, treating it as bought at startup")
+            when = now
+        entry_price = float(position.get("avg_entry_price") or price)
+        info[symbol] = {"entry_price": entry_price, "purchase_time": when.astimezone(tz)}
+    return info
+
+
+def reconcile(watchlist, purchase_info, tz, position_store=None, lookback_days=30, now=None):
+    # Startup pass before the first scan: one /positions call, then fill
+    # activities (newest first, stopping as soon as every held symbol has a buy)
+    # and a single /orders call only for symbols the fills didn't explain.
+    # Updates purchase_info in place and brings the position store in line.
+    from account_stuff import fetch_fill_activities, fetch_orders, fetch_positions
+
+    now = now or datetime.datetime.now(tz=tz)
+    positions = fetch_positions()
+    if positions is None:
+        logging.error("Reconcile: could not load positions, keeping stored state")
+        return purchase_info
+    positions = {position_key(p["symbol"]): p for p in positions}
+    held = {position_key(s) for s in watchlist} & set(positions)
+    stored = position_store.purchase_info() if position_store else dict(purchase_info)
+    missing = {k for k in held if k not in {position_key(s) for s in stored}}
+
+    fills, orders = [], []
+    if missing:
+        after = (now - datetime.timedelta(days=lookback_days)).astimezone(datetime.timezone.utc).isoformat()
+        stop = lambda so_far: missing <= set(last_buys(so_far))
+        fills = fetch_fill_activities(after, stop=stop) or []
+        unexplained = missing - set(last_buys(fills))
+        if unexplained:
+            symbols = [s for s in watchlist if position_key(s) in unexplained]
+            orders = fetch_orders(status="closed", symbols=symbols, after=after) or []
+
+    info = rebuild_purchase_info(watchlist, positions, last_buys(fills, orders), stored, now, tz)
+    if position_store:
+        for symbol in set(stored) - set(info):
+            position_store.forget(symbol)  # closed while we were down
+        for symbol, entry in info.items():
+            if symbol not in stored:
+                position_store.restore(symbol, entry["entry_price"], entry["purchase_time"])
+
+    purchase_info.clear()
+    purchase_info.update(info)
+    logging.info(
+        f"Reconciled {len(info)} held symbols ({len(missing)} rebuilt from "
+        f"{len(fills)} fills and {len(orders)} orders)"
+    )
+    return purchase_info
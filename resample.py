@@ -0,0 +1,107 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from bar_store import TIMEFRAME_SECONDS, to_epoch, to_iso
+
+
+def utc_offsets(t, tz):
+    # Seconds east of UTC at each epoch in `t`; zone offsets only change on the
+    # hour, so it's looked up once per distinct hour
+    hours, inverse = np.unique(np.asarray(t, dtype=np.int64) // 3600, return_inverse=True)
+    offsets = np.array(
+        [datetime.datetime.fromtimestamp(int(h) * 3600, tz).utcoffset().total_seconds() for h in hours],
+        dtype=np.int64,
+    )
+    return offsets[inverse.reshape(-1)]
+
+
+def bucket_starts(t, seconds, tz=None):
+    # Start of the `seconds`-long bucket each epoch falls in. Intraday buckets
+    # are aligned on UTC; with a tz, daily ones start at local midnight.
+    t = np.asarray(t, dtype=np.int64)
+    if seconds < 86400 or tz is None:
+        return t - t % seconds
+    local = t + utc_offsets(t, tz)
+    midnight = local - local % seconds
+    return midnight - utc_offsets(midnight - utc_offsets(t, tz), tz)
+
+
+def resample(t, o, h, l, c, v, seconds, tz=None):
+    # OHLCV of sorted finer bars grouped into `seconds` buckets, all columns at
+    # once: returns (t, o, h, l, c, v) arrays with one row per non-empty bucket
+    t = np.asarray(t, dtype=np.int64)
+    if not len(t):
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.int64), empty, empty, empty, empty, empty
+    keys = bucket_starts(t, seconds, tz)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    return (
+        keys[starts],
+        np.asarray(o, dtype=float)[starts],
+        np.maximum.reduceat(np.asarray(h, dtype=float), starts),
+        np.minimum.reduceat(np.asarray(l, dtype=float), starts),
+        np.asarray(c, dtype=float)[ends],
+        np.add.reduceat(np.asarray(v, dtype=float), starts),
+    )
+
+
+class Resampler:
+    # Builds coarser bars from 1-minute bars, so one minute download serves
+    # every timeframe. Each minute is counted once: add() skips minutes it has
+    # already seen and the ones still forming, and folds the rest into each
+    # timeframe's forming bar. Daily bars are cut at midnight in `tz` like
+    # Alpaca's; from IEX minutes their volume is IEX-only.
+    def __init__(self, timeframes=("5Min", "15Min", "1Hour", "1Day"), tz="America/New_York"):
+        self.timeframes = list(timeframes)
+        self.tz = ZoneInfo(tz) if isinstance(tz, str) else tz
+        self.forming = {}  # (symbol, timeframe) -> the newest bar, still open
+        self.last_t = {}  # symbol -> epoch of the newest minute folded in
+
+    def cursor(self, symbol):
+        # ISO time of the first minute add() still wants for `symbol`, or None
+        last = self.last_t.get(symbol)
+        return None if last is None else to_iso(last + 60)
+
+    def start_at(self, symbol, t):
+        # Minutes before `t` (ISO) are treated as already seen
+        self.last_t[symbol] = to_epoch(t) - 60
+
+    def add(self, symbol, minute_bars, now=None):
+        # Returns {timeframe: [bar, ...]} oldest first: the bars these minutes
+        # completed or changed, the last one still forming. Bars are dicts in
+        # the API's {"t", "o", "h", "l", "c", "v"} shape.
+        t = np.fromiter((to_epoch(b["t"]) for b in minute_bars), dtype=np.int64, count=len(minute_bars))
+        keep = np.ones(len(t), dtype=bool)
+        if symbol in self.last_t:
+            keep &= t > self.last_t[symbol]
+        if now is not None:
+            keep &= t + 60 <= now  # a minute that hasn't closed yet would be counted twice
+        index = np.flatnonzero(keep)
+        if not len(index):
+            return {tf: [] for tf in self.timeframes}
+        index = index[np.argsort(t[index], kind="stable")]
+        columns = [t[index]] + [
+            np.fromiter((minute_bars[i].get(k, 0.0) for i in index), dtype=float, count=len(index))
+            for k in ("o", "h", "l", "c", "v")
+        ]
+        self.last_t[symbol] = int(columns[0][-1])
+
+        out = {}
+        for tf in self.timeframes:
+            bt, bo, bh, bl, bc, bv = resample(*columns, TIMEFRAME_SECONDS[tf], self.tz)
+            bars = [
+                {"t": to_iso(bt[i]), "o": bo[i], "h": bh[i], "l": bl[i], "c": bc[i], "v": bv[i]}
+                for i in range(len(bt))
+            ]
+            prev = self.forming.get((symbol, tf))
+            if prev is not None and bars[0]["t"] == prev["t"]:
+                first = bars[0]
+                bars[0] = dict(
+                    first, o=prev["o"], h=max(prev["h"], first["h"]), l=min(prev["l"], first["l"]), v=prev["v"] + first["v"]
+                )
+            self.forming[(symbol, tf)] = bars[-1]
+            out[tf] = bars
+        return out
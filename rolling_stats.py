@@ -0,0 +1,118 @@
+from collections import deque
+import math
+
+import numpy as np
+
+
+def mean_stdev(closes):
+    # Batch path (cold start): average and sample stdev of a list of closes
+    values = np.asarray(closes, dtype=float)
+    return float(values.mean()), float(values.std(ddof=1))
+
+
+class RollingStats:
+    # Mean and sample stdev over the last `window` values, updated in O(1) per value.
+    # Sums are kept relative to an anchor close to the mean so the sum-of-squares
+    # doesn't lose precision on big prices; the anchor is reset every `window` updates.
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.anchor = 0.0
+        self.s1 = 0.0  # sum of (x - anchor)
+        self.s2 = 0.0  # sum of (x - anchor) ** 2
+        self.updates = 0
+        for x in values:
+            self.values.append(float(x))
+        self.reanchor()
+
+    def __len__(self):
+        return len(self.values)
+
+    def reanchor(self):
+        values = np.fromiter(self.values, dtype=float, count=len(self.values))
+        self.anchor = float(values.mean()) if len(values) else 0.0
+        shifted = values - self.anchor
+        self.s1 = float(shifted.sum())
+        self.s2 = float((shifted * shifted).sum())
+        self.updates = 0
+
+    def _bump(self):
+        self.updates += 1
+        if self.updates >= self.window:
+            self.reanchor()
+
+    def push(self, x):
+        x = float(x)
+        if len(self.values) == self.window:
+            old = self.values[0] - self.anchor
+            self.s1 -= old
+            self.s2 -= old * old
+        self.values.append(x)
+        d = x - self.anchor
+        self.s1 += d
+        self.s2 += d * d
+        self._bump()
+
+    def replace_last(self, x):
+        # The newest bar is still forming: swap its close without shifting the window
+        x = float(x)
+        old = self.values[-1] - self.anchor
+        self.values[-1] = x
+        d = x - self.anchor
+        self.s1 += d - old
+        self.s2 += d * d - old * old
+        self._bump()
+
+    def mean(self):
+        n = len(self.values)
+        if n == 0:
+            return None
+        return self.anchor + self.s1 / n
+
+    def stdev(self):
+        n = len(self.values)
+        if n < 2:
+            return None
+        var = (self.s2 - self.s1 * self.s1 / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def mean_stdev(self):
+        return self.mean(), self.stdev()
+
+
+def rolling_mean_std(values, window, chunk_rows=65536):
+    # Vectorized mean and sample stdev over the last `window` rows (current row
+    # included) for a (T, N) array, used by the backtester. Rows before the first
+    # full window, or windows containing a NaN, come back as NaN. Uses running
+    # sums over chunks of rows, shifted by each chunk's mean so the sum of squares
+    # keeps its precision on long histories.
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    rows = values.shape[0]
+    means = np.full(values.shape, np.nan)
+    stds = np.full(values.shape, np.nan)
+    if rows < window or window < 2:
+        return means, stds
+
+    for lo in range(window - 1, rows, chunk_rows):
+        hi = min(rows, lo + chunk_rows)
+        block = values[lo - window + 1 : hi]
+        finite = np.isfinite(block)
+        with np.errstate(invalid="ignore"):
+            anchor = np.nanmean(block, axis=0) if finite.any() else np.zeros(block.shape[1])
+        anchor = np.nan_to_num(anchor)
+        shifted = np.where(finite, block - anchor, 0.0)
+
+        zero = np.zeros((1, block.shape[1]))
+        s1 = np.concatenate([zero, np.cumsum(shifted, axis=0)])
+        s2 = np.concatenate([zero, np.cumsum(shifted * shifted, axis=0)])
+        count = np.concatenate([zero, np.cumsum(finite, axis=0)])
+        w1 = s1[window:] - s1[:-window]
+        w2 = s2[window:] - s2[:-window]
+        full = (count[window:] - count[:-window]) == window
+
+        var = np.maximum((w2 - w1 * w1 / window) / (window - 1), 0.0)
+        means[lo:hi] = np.where(full, anchor + w1 / window, np.nan)
+        stds[lo:hi] = np.where(full, np.sqrt(var), np.nan)
+    return means, stds
@@ -0,0 +1,110 @@
+import logging
+import math
+import threading
+import time
+
+
+class Job:
+    # `fn` runs on wall-clock multiples of `interval` (+ `offset`) seconds,
+    # whenever `active(now)` says so. Ticks missed because a run overran are
+    # dropped, not queued up.
+    def __init__(self, name, interval, fn, active=None, offset=0.0):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.active = active
+        self.offset = offset
+        self.next_run = None
+        self.runs = 0
+        self.skipped = 0  # ticks not run: overrun, or the job wasn't active
+        self.errors = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_duration = None
+
+    def deadline_after(self, now):
+        # first deadline strictly after `now`
+        return (math.floor((now - self.offset) / self.interval) + 1) * self.interval + self.offset
+
+    def metrics(self):
+        return {
+            "next_run": self.next_run,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "last_duration": self.last_duration,
+        }
+
+
+class Scheduler:
+    # Runs jobs on fixed wall-clock deadlines, so the cycle doesn't drift by the
+    # time each scan takes. Jobs run one at a time on the calling thread.
+    def __init__(self, clock=time.time, sleep=None):
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.sleep = sleep or self.stopped.wait  # stop() wakes a sleeping scheduler
+        self.jobs = []
+
+    def add(self, name, interval, fn, active=None, offset=0.0):
+        job = Job(name, interval, fn, active, offset)
+        job.next_run = job.deadline_after(self.clock())
+        self.jobs.append(job)
+        return job
+
+    def metrics(self):
+        return {job.name: job.metrics() for job in self.jobs}
+
+    def run_pending(self):
+        # Runs every job whose deadline has passed; returns how many ran
+        ran = 0
+        for job in sorted(self.jobs, key=lambda j: j.next_run):
+            now = self.clock()
+            if now < job.next_run:
+                continue
+            deadline = job.next_run
+            job.next_run = job.deadline_after(now)
+            missed = int(round((job.next_run - deadline) / job.interval)) - 1
+            if missed > 0:
+                job.skipped += missed
+                logging.warning(f"Job {job.name} is {now - deadline:.1f}s late, dropped {missed} ticks")
+            try:
+                active = job.active is None or job.active(now)
+            except Exception as e:
+                # e.g. the market-hours check couldn't tell: skip the tick
+                job.errors += 1
+                logging.error(f"Job {job.name} failed its active check: {e}")
+                active = False
+            if not active:
+                job.skipped += 1
+                continue
+
+            job.last_lag = now - deadline
+            job.max_lag = max(job.max_lag, job.last_lag)
+            try:
+                job.fn()
+            except Exception as e:
+                job.errors += 1
+                logging.error(f"Job {job.name} failed: {e}")
+            job.runs += 1
+            end = self.clock()
+            job.last_duration = end - now
+            if end >= job.next_run:
+                # overran: the ticks it covered are dropped
+                after = job.deadline_after(end)
+                job.skipped += int(round((after - job.next_run) / job.interval))
+                job.next_run = after
+            ran += 1
+        return ran
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            self.run_pending()
+            if self.jobs:
+                wait = min(job.next_run for job in self.jobs) - self.clock()
+                if wait > 0:
+                    self.sleep(wait)
+
+    def stop(self):
+        self.stopped.set()
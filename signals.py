@@ -0,0 +1,44 @@
+import numpy as np
+
+# Action codes returned by evaluate()
+SKIP = -1  # missing price/mean/stdev, or stdev == 0
+HOLD = 0
+BUY = 1
+SELL = 2
+
+SECONDS_PER_DAY = 86400
+
+
+def evaluate(prices, means, stdevs, entry_prices, entry_times, now, params):
+    # The MeanReversion buy/hold/sell rules for a whole watchlist in one pass.
+    # All inputs are equal-length arrays; entry_prices/entry_times are NaN for
+    # symbols we don't hold, entry_times and now are epoch seconds. Returns
+    # (actions, z) where actions holds one of SKIP/HOLD/BUY/SELL per symbol.
+    prices = np.asarray(prices, dtype=float)
+    means = np.asarray(means, dtype=float)
+    stdevs = np.asarray(stdevs, dtype=float)
+    entry_prices = np.asarray(entry_prices, dtype=float)
+    entry_times = np.asarray(entry_times, dtype=float)
+
+    valid = np.isfinite(prices) & np.isfinite(means) & np.isfinite(stdevs) & (stdevs != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(valid, (prices - means) / stdevs, np.nan)
+        held = np.isfinite(entry_prices)
+        held_seconds = now - entry_times
+        holding_days = np.floor(held_seconds / SECONDS_PER_DAY)
+
+        sell = held & (
+            (z >= params["mean_exit_z"])
+            | (prices >= entry_prices * params["hard_tp"])
+            | (holding_days >= params["max_hold_days"])
+            | (z <= params["panic_z"])
+        )
+        # no repeat-buy cooldown here: live it's measured from the entry we still
+        # hold (can_buy), and a held symbol never gets a buy signal anyway
+        buy = ~held & (prices < means - stdevs * params["z_score"])
+
+    actions = np.full(prices.shape, HOLD, dtype=np.int8)
+    actions[buy] = BUY
+    actions[sell] = SELL
+    actions[~valid] = SKIP
+    return actions, z
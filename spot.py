@@ -105,6 +105,10 @@ ACTIVE_BASE = (
 ACCOUNT_URL = f"{ACTIVE_BASE}/account"
 ORDERS_URL = f"{ACTIVE_BASE}/orders"
 POSITIONS_URL = f"{ACTIVE_BASE}/positions"
+ACTIVITIES_URL = f"{ACTIVE_BASE}/account/activities"
+CLOCK_URL = f"{ACTIVE_BASE}/clock"
+CALENDAR_URL = f"{ACTIVE_BASE}/calendar"
+TRADE_STREAM_URL = ACTIVE_BASE.replace("https://", "wss://").replace("/v2", "/stream")  # trade_updates
 
 purchase_info = {}
 summary = {}
@@ -136,6 +140,42 @@ PANIC_Z = -2.8
 MAX_HOLD_DAYS = 5
 LOOKBACK = 30
 
+# Same rules as above, in the form the vectorized evaluator/backtester take them
+STRATEGY_PARAMS = {
+    "z_score": Z_SCORE,
+    "mean_exit_z": MEAN_EXIT_Z,
+    "hard_tp": HARD_TP,
+    "panic_z": PANIC_Z,
+    "max_hold_days": MAX_HOLD_DAYS,
+    "lookback": LOOKBACK,
+    "min_seconds_between_purchases": min_seconds_between_purchases,
+}
+
+USE_ASYNC_SCAN = True
+SCAN_CONCURRENCY = 8  # max data requests in flight during an async scan
+SCAN_BATCH_SIZE = None  # symbols per concurrent bars/price request; None = one batch per asset class
+ACCOUNT_CACHE_TTL = 10  # seconds an /account or /positions snapshot is reused
+PRICE_MAX_AGE = 30  # seconds a scan's price snapshot can be used to size an order
+BUY_MAX_RSI = None  # e.g. 30: buy signals also need the bars' RSI below this
+STRATEGY_TIMEFRAME = "1Day"  # bars the mean/stdev and indicators are computed over
+RESAMPLE_TIMEFRAMES = ()  # e.g. ("1Day", "1Hour"): build these from one 1Min download instead of fetching each
+BAR_STORE_PATH = "data/bars"  # local bar history, filled by `python bar_store.py sync`
+POSITION_DB_PATH = "data/positions.db"  # purchase_info survives restarts here
+MARKET_CALENDAR_PATH = "data/calendar.json"  # /v2/calendar sessions, refetched once a day
+MARKET_CALENDAR_DAYS = 14  # how many days of sessions each calendar fetch covers
+RECONCILE_LOOKBACK_DAYS = 30  # how far back startup looks for the fills behind open positions
+ALLOCATION_PER_SYMBOL = 0.30  # each buy gets up to 30% of the scan's buying power snapshot
+ALLOCATION_TOTAL = 0.90  # and all buys from one scan together at most 90% of it
+MIN_ORDER_NOTIONAL = 1.0  # Alpaca rejects notional orders under $1, so smaller allocations aren't sent
+CRYPTO_SCAN_SECONDS = 120  # crypto scans run on these wall-clock multiples, around the clock
+STOCK_SCAN_SECONDS = 120  # stock scans, only while the market is open
+PRIORITY_TICK_SECONDS = 5  # how often the poller looks for symbols due a quick price check
+PRIORITY_MIN_INTERVAL = 5  # seconds between checks for a symbol right at a threshold
+PRIORITY_MAX_INTERVAL = 120  # ... and for one 3+ stdevs away from every threshold
+PRIORITY_QUOTA_SHARE = 0.25  # share of the data API's per-minute quota the quick checks may use
+SUMMARY_CHECK_SECONDS = 300  # how often to check whether the daily summary is due
+SCHEDULER_METRICS_SECONDS = 900  # how often the scheduler logs its run/lag counters
+
 headers = {
     "accept": "application/json",
     "APCA-API-KEY-ID": API_KEY,
@@ -0,0 +1,304 @@
+import asyncio
+import datetime
+import json
+import logging
+import random
+import time
+
+import websockets
+
+CRYPTO_STREAM_URL = "wss://stream.data.alpaca.markets/v1beta3/crypto/us"
+STOCK_STREAM_URL = "wss://stream.data.alpaca.markets/v2/iex"
+
+
+class StreamError(Exception):
+    pass
+
+
+def parse_time(t):
+    # Alpaca sends RFC3339 with up to nanosecond precision, fromisoformat takes micro
+    t = t.replace("Z", "+00:00")
+    if "." in t:
+        head, rest = t.split(".", 1)
+        frac, _, tz = rest.partition("+")
+        t = f"{head}.{frac[:6]}+{tz}"
+    return datetime.datetime.fromisoformat(t)
+
+
+class MarketStream:
+    # One websocket connection to an Alpaca market-data stream. Keeps a live
+    # last-price table, reconnects with backoff (resubscribing every time), and
+    # reports gaps: missed minute bars, or a silent socket for `stale_after` seconds.
+    # With `is_live(t)` (e.g. the market calendar's is_open), silence and missing
+    # bars only count while it says the symbols trade; a closed session is quiet.
+    def __init__(
+        self,
+        url,
+        symbols,
+        key,
+        secret,
+        on_trade=None,
+        on_bar=None,
+        on_gap=None,
+        on_connect=None,
+        stale_after=90,
+        is_live=None,
+        bar_seconds=60,
+        reconnect_delay=1.0,
+        max_reconnect_delay=30.0,
+    ):
+        self.url = url
+        self.symbols = list(symbols)
+        self.key = key
+        self.secret = secret
+        self.on_trade = on_trade
+        self.on_bar = on_bar
+        self.on_gap = on_gap
+        self.on_connect = on_connect
+        self.stale_after = stale_after
+        self.is_live = is_live
+        self.bar_seconds = bar_seconds
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.last_prices = {}  # symbol -> latest trade price
+        self.last_bar_time = {}  # symbol -> datetime of the latest minute bar
+        self.connects = 0
+        self.running = False
+
+    async def run(self):
+        self.running = True
+        attempt = 0
+        while self.running:
+            try:
+                await self._session()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Stream {self.url} dropped: {e}")
+            if not self.running:
+                break
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2**attempt)
+            attempt += 1
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    def stop(self):
+        self.running = False
+
+    def live(self, t=None):
+        return self.is_live is None or self.is_live(time.time() if t is None else t)
+
+    async def _session(self):
+        async with websockets.connect(self.url) as ws:
+            await self._expect(ws, "success", "connected")
+            await ws.send(json.dumps({"action": "auth", "key": self.key, "secret": self.secret}))
+            await self._expect(ws, "success", "authenticated")
+            await ws.send(
+                json.dumps({"action": "subscribe", "trades": self.symbols, "bars": self.symbols})
+            )
+            self.connects += 1
+            logging.info(f"Subscribed to {len(self.symbols)} symbols on {self.url}")
+            if self.connects > 1 and self.on_gap and self.live():
+                # anything could have happened to our symbols while we were disconnected
+                await self._call(self.on_gap, list(self.symbols), None, None)
+            if self.on_connect:
+                await self._call(self.on_connect)
+
+            while self.running:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=self.stale_after)
+                except asyncio.TimeoutError:
+                    if not self.live():
+                        continue  # nothing trades, so nothing to hear
+                    raise StreamError(f"no messages for {self.stale_after}s")
+                for msg in json.loads(raw):
+                    await self.handle_message(msg)
+
+    async def _expect(self, ws, kind, text):
+        for msg in json.loads(await ws.recv()):
+            if msg.get("T") == "error":
+                raise StreamError(f"{msg.get('code')} {msg.get('msg')}")
+            if msg.get("T") == kind and msg.get("msg") == text:
+                return msg
+        raise StreamError(f"expected {kind}/{text}")
+
+    async def _call(self, fn, *args):
+        result = fn(*args)
+        if asyncio.iscoroutine(result):
+            await result
+
+    async def handle_message(self, msg):
+        kind = msg.get("T")
+        if kind == "t":
+            symbol, price = msg["S"], msg["p"]
+            self.last_prices[symbol] = price
+            if self.on_trade:
+                await self._call(self.on_trade, symbol, price)
+        elif kind == "b":
+            symbol = msg["S"]
+            t = parse_time(msg["t"])
+            last = self.last_bar_time.get(symbol)
+            if last is not None and (t - last).total_seconds() > self.bar_seconds and self.on_gap:
+                # only if the first and last missing minutes were in session
+                step = datetime.timedelta(seconds=self.bar_seconds)
+                if self.live(last + step) and self.live(t - step):
+                    await self._call(self.on_gap, [symbol], last, t)
+            if last is None or t > last:
+                self.last_bar_time[symbol] = t
+            self.last_prices.setdefault(symbol, msg["c"])
+            if self.on_bar:
+                await self._call(self.on_bar, symbol, msg)
+        elif kind == "subscription":
+            logging.info(f"Stream subscription: trades={msg.get('trades')} bars={msg.get('bars')}")
+        elif kind == "error":
+            logging.error(f"Stream error {msg.get('code')}: {msg.get('msg')}")
+
+
+class TradeUpdatesStream:
+    # Alpaca's account stream, listening to trade_updates only. Every order event
+    # goes to the OrderTracker; after a reconnect the tracker is polled over REST
+    # for anything that changed while we weren't listening.
+    def __init__(self, url, key, secret, tracker, fetch_order=None, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.url = url
+        self.key = key
+        self.secret = secret
+        self.tracker = tracker
+        self.fetch_order = fetch_order
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connects = 0
+        self.running = False
+
+    async def run(self):
+        self.running = True
+        attempt = 0
+        while self.running:
+            try:
+                await self._session()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Trade updates stream dropped: {e}")
+            finally:
+                self.tracker.live = False
+            if not self.running:
+                break
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2**attempt)
+            attempt += 1
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    def stop(self):
+        self.running = False
+
+    async def _recv(self, ws):
+        raw = await ws.recv()
+        return json.loads(raw.decode() if isinstance(raw, bytes) else raw)  # paper sends binary frames
+
+    async def _session(self):
+        async with websockets.connect(self.url) as ws:
+            await ws.send(json.dumps({"action": "auth", "key": self.key, "secret": self.secret}))
+            msg = await self._recv(ws)
+            if msg.get("data", {}).get("status") != "authorized":
+                raise StreamError(f"trade_updates auth failed: {msg}")
+            await ws.send(json.dumps({"action": "listen", "data": {"streams": ["trade_updates"]}}))
+            self.connects += 1
+            self.tracker.live = True
+            logging.info(f"Listening to trade_updates on {self.url}")
+            if self.fetch_order:
+                # catch up on anything that happened before we were listening
+                await asyncio.to_thread(self.tracker.poll, self.fetch_order)
+
+            while self.running:
+                msg = await self._recv(ws)
+                if msg.get("stream") == "trade_updates":
+                    await asyncio.to_thread(self.tracker.handle_event, msg["data"])
+
+
+class StreamingRunner:
+    # Event-driven version of main(): instead of scanning the whole watchlist every
+    # 120s, trades re-evaluate just their symbol against its cached mean/stdev, at
+    # most once per `eval_interval` seconds each (a busy symbol trades many times a
+    # second). `market_open(t)` keeps the stock stream quiet outside the session.
+    def __init__(
+        self, strategy, key, secret, crypto_url=CRYPTO_STREAM_URL, stock_url=STOCK_STREAM_URL,
+        bar_refresh_seconds=300, trade_url=None, fetch_order=None, market_open=None,
+        eval_interval=1.0, clock=time.monotonic,
+    ):
+        self.strategy = strategy
+        self.bar_refresh_seconds = bar_refresh_seconds
+        self.eval_interval = eval_interval
+        self.clock = clock
+        self.last_eval = {}  # symbol -> clock() of its latest evaluation
+        self.lock = asyncio.Lock()  # one evaluation/order at a time
+        symbols = list(strategy.watchlist)
+        crypto = [s for s in symbols if "/" in s]
+        stocks = [s for s in symbols if "/" not in s]
+        self.streams = []
+        for url, group, is_live in ((crypto_url, crypto, None), (stock_url, stocks, market_open)):
+            if group:
+                self.streams.append(
+                    MarketStream(
+                        url, group, key, secret,
+                        on_trade=self.on_trade, on_gap=self.on_gap, is_live=is_live,
+                    )
+                )
+        self.trade_updates = None
+        if trade_url:
+            self.trade_updates = TradeUpdatesStream(trade_url, key, secret, strategy.orders, fetch_order)
+
+    @property
+    def last_prices(self):
+        prices = {}
+        for stream in self.streams:
+            prices.update(stream.last_prices)
+        return prices
+
+    async def on_trade(self, symbol, price):
+        self.strategy.snapshot.update({symbol: price})
+        now = self.clock()
+        if now - self.last_eval.get(symbol, float("-inf")) < self.eval_interval:
+            return
+        self.last_eval[symbol] = now
+        average, stdev = self.strategy.bars.stats(symbol)
+        async with self.lock:
+            await asyncio.to_thread(self.strategy.evaluate_symbol, symbol, price, average, stdev)
+
+    async def on_gap(self, symbols, last, t):
+        # backfill the daily bars through REST so mean/stdev don't go stale
+        logging.warning(f"Stream gap for {', '.join(symbols)} ({last} -> {t}), refreshing bars")
+        await asyncio.to_thread(self.strategy.bars.refresh, symbols)
+
+    async def refresh_bars(self):
+        while True:
+            await asyncio.to_thread(self.strategy.bars.refresh, list(self.strategy.watchlist))
+            await asyncio.sleep(self.bar_refresh_seconds)
+
+    async def run(self):
+        streams = self.streams + ([self.trade_updates] if self.trade_updates else [])
+        await asyncio.gather(self.refresh_bars(), *(s.run() for s in streams))
+
+
+def main():
+    from trading_logic import MeanReversion, fetch_order, is_market_open
+    from zoneinfo import ZoneInfo
+    from position_store import PositionStore
+    from reconcile import reconcile
+    from spot import watchlist, purchase_info, target_gain, start_date, API_KEY, SECRET_KEY
+    from spot import POSITION_DB_PATH, RECONCILE_LOOKBACK_DAYS, TRADE_STREAM_URL
+
+    position_store = PositionStore(POSITION_DB_PATH)
+    purchase_info.update(position_store.purchase_info())
+    reconcile(watchlist, purchase_info, ZoneInfo("America/Los_Angeles"), position_store, RECONCILE_LOOKBACK_DAYS)
+    strategy = MeanReversion(watchlist, purchase_info, target_gain, start_date, position_store)
+    runner = StreamingRunner(
+        strategy, API_KEY, SECRET_KEY, trade_url=TRADE_STREAM_URL, fetch_order=fetch_order, market_open=is_market_open
+    )
+    asyncio.run(runner.run())
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(" Exiting...")
@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import run_backtest
+
+_shared = {}  # per worker process: name -> ndarray view on shared memory
+
+
+def param_grid(space):
+    # {"z_score": [1.5, 2.0], ...} -> every combination as a list of dicts
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_search(space, n, seed=0):
+    # Values are either a list to choose from or a (low, high) tuple to sample;
+    # ints on both ends sample ints
+    rng = random.Random(seed)
+    points = []
+    for _ in range(n):
+        point = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    point[name] = rng.randint(low, high)
+                else:
+                    point[name] = rng.uniform(low, high)
+            else:
+                point[name] = rng.choice(values)
+        points.append(point)
+    return points
+
+
+def point_key(point):
+    return json.dumps(point, sort_keys=True)
+
+
+def data_hash(closes, times, symbols):
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(times, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(closes, dtype=float).tobytes())
+    h.update(json.dumps(list(symbols)).encode())
+    return h.hexdigest()
+
+
+def sweep_fingerprint(closes, times, symbols, base_params, options):
+    # Everything a point's result depends on besides the point itself
+    blob = json.dumps(
+        {"data": data_hash(closes, times, symbols), "base_params": base_params, "options": options or {}}, sort_keys=True
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class SharedArrays:
+    # Copies the bar arrays into shared memory once; workers map them read-only
+    # instead of getting a pickled copy with every task
+    def __init__(self, **arrays):
+        self.blocks = {}
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks[name] = block
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(specs):
+    # Pool workers share the parent's resource tracker, so attaching here doesn't
+    # hand ownership of the block to the worker; the parent unlinks it when done
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        view.flags.writeable = False
+        _shared[name] = view
+        _shared[f"_{name}_block"] = block  # keep the mapping alive
+
+
+def _run_point(task):
+    point, base_params, symbols, options = task
+    params = dict(base_params, **point)
+    result = run_backtest(_shared["closes"], _shared["times"], symbols, params, **options)
+    return point, result["summary"]
+
+
+def ranked(results, metric="sharpe"):
+    return sorted(results, key=lambda r: r["summary"].get(metric, float("-inf")), reverse=True)
+
+
+def load_results(path):
+    results = []
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        results.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logging.warning(f"Skipping truncated line in {path}")
+    return results
+
+
+def run_sweep(closes, times, symbols, points, base_params, results_path, processes=None, metric="sharpe", options=None, on_result=None):
+    # Runs a backtest for every parameter point across a process pool. Each
+    # finished point is appended to results_path (JSON lines) straight away, so an
+    # interrupted sweep picks up where it stopped: points already in the file are
+    # skipped. The file's first line fingerprints the data, base_params and
+    # options; a file from a different sweep is refused rather than mixed in.
+    # Returns every result (old and new), best `metric` first.
+    fingerprint = sweep_fingerprint(closes, times, symbols, base_params, options)
+    records = load_results(results_path)
+    results = [r for r in records if "params" in r]
+    if records and [r["sweep"] for r in records if "sweep" in r] != [fingerprint]:
+        raise ValueError(
+            f"{results_path} holds results for other data, base params or options; pass a new results path"
+        )
+    done = {point_key(r["params"]) for r in results}
+    todo = [p for p in points if point_key(p) not in done]
+    logging.info(f"Sweep: {len(done)} points already done, {len(todo)} to run")
+    if not todo:
+        return ranked(results, metric)
+
+    if results_path:
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+    tasks = [(p, base_params, list(symbols), options or {}) for p in todo]
+    with SharedArrays(closes=np.asarray(closes, dtype=float), times=np.asarray(times, dtype=float)) as shared:
+        with multiprocessing.Pool(processes, initializer=_attach, initargs=(shared.specs,)) as pool, \
+                (open(results_path, "a") if results_path else contextlib.nullcontext()) as out:
+            if out and not records:
+                out.write(json.dumps({"sweep": fingerprint}) + "\n")
+            chunksize = max(1, len(tasks) // (processes * 8))
+            for point, summary in pool.imap_unordered(_run_point, tasks, chunksize=chunksize):
+                result = {"params": point, "summary": summary}
+                if out:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                results.append(result)
+                if on_result:
+                    on_result(result, results)
+    return ranked(results, metric)
+
+
+def print_table(results, metric="sharpe", top=20):
+    columns = ["total_return", "sharpe", "max_drawdown", "closed_trades", "win_rate"]
+    for i, r in enumerate(ranked(results, metric)[:top], 1):
+        stats = " ".join(f"{c}={r['summary'][c]:.4g}" for c in columns)
+        print(f"{i:>3}. {point_key(r['params'])} {stats}")
+
+
+def parse_space(specs):
+    # ["z_score=1.5,2,2.5", "lookback=10:60"] -> {"z_score": [1.5, 2.0, 2.5], "lookback": (10, 60)}
+    space = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        number = lambda v: int(v) if v.lstrip("-").isdigit() else float(v)
+        if ":" in values:
+            low, high = values.split(":")
+            space[name] = (number(low), number(high))
+        else:
+            space[name] = [number(v) for v in values.split(",")]
+    return space
+
+
+def main():
+    from backtest import load_closes, research_settings
+
+    STRATEGY_PARAMS, BAR_STORE_PATH, watchlist = research_settings()
+
+    parser = argparse.ArgumentParser(description="Parameter sweep over the MeanReversion backtest")
+    parser.add_argument("space", nargs="+", help="name=v1,v2,... for a grid, name=low:high for random search")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--timeframe", default="1Day")
+    parser.add_argument("--random", type=int, default=0, help="number of random points instead of a grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--metric", default="sharpe")
+    parser.add_argument("--out", default="sweeps/results.jsonl")
+    args = parser.parse_args()
+
+    space = parse_space(args.space)
+    points = random_search(space, args.random, args.seed) if args.random else param_grid(space)
+    symbols = sorted(watchlist)
+    times, closes = load_closes(symbols, args.timeframe, args.start, args.end, BAR_STORE_PATH)
+
+    def progress(result, results):
+        if len(results) % 50 == 0:
+            print(f"--- {len(results)} points ---")
+            print_table(results, args.metric, top=5)
+
+    results = run_sweep(
+        closes, times, symbols, points, STRATEGY_PARAMS, args.out,
+        processes=args.processes, metric=args.metric, on_result=progress,
+    )
+    print_table(results, args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from unittest.mock import Mock
+
+from account_cache import AccountCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(ttl=10):
+    fetch_account = Mock(return_value={"buying_power": "1000.00"})
+    fetch_positions = Mock(
+        return_value=[{"symbol": "BTCUSD", "qty": "0.5"}, {"symbol": "AAPL", "qty": "10"}]
+    )
+    clock = FakeClock()
+    return AccountCache(fetch_account, fetch_positions, ttl=ttl, clock=clock), clock
+
+
+def test_snapshots_are_reused_within_ttl():
+    cache, clock = make_cache(ttl=10)
+    cache.account()
+    cache.position("AAPL")
+    clock.now = 9.9
+    cache.account()
+    cache.position("BTC/USD")
+
+    assert cache.fetch_account.call_count == 1
+    assert cache.fetch_positions.call_count == 1
+
+    clock.now = 10.0
+    cache.account()
+    assert cache.fetch_account.call_count == 2
+
+
+def test_positions_are_indexed_by_symbol_including_crypto():
+    cache, _ = make_cache()
+    assert cache.position("BTC/USD")["qty"] == "0.5"
+    assert cache.position("AAPL")["qty"] == "10"
+    assert cache.position("ETH/USD") is None
+
+
+def test_invalidate_forces_a_refetch():
+    cache, _ = make_cache()
+    cache.account()
+    cache.positions()
+    cache.invalidate()
+    cache.account()
+    cache.positions()
+    assert cache.fetch_account.call_count == 2
+    assert cache.fetch_positions.call_count == 2
+
+
+def test_failures_are_not_cached():
+    cache, _ = make_cache()
+    cache.fetch_account.side_effect = [None, {"buying_power": "5"}]
+    assert cache.account() is None
+    assert cache.account() == {"buying_power": "5"}
+
+
+def test_fresh_positions_skip_the_snapshot():
+    cache, _ = make_cache()
+    cache.positions()
+    cache.positions(fresh=True)
+    cache.position("AAPL")  # reuses the fresh snapshot
+    assert cache.fetch_positions.call_count == 2
+
+
+def test_fetch_positions_checks_the_status_before_decoding():
+    from unittest.mock import patch
+
+    import account_stuff as acct
+
+    bad = Mock(status_code=502, text="bad gateway")
+    bad.json.side_effect = ValueError("not json")
+    with patch("account_stuff.default_transport.get", return_value=bad):
+        assert acct.fetch_positions() is None
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import trading_logic as tl
+from allocation import allocate
+
+
+def test_deepest_signal_first_with_per_symbol_and_total_caps():
+    candidates = [("A", -1.6, 10.0), ("B", -2.5, 10.0), ("C", -2.0, 10.0), ("D", -1.9, 10.0)]
+    orders = allocate(1000.0, candidates, per_symbol=0.30, total=0.90)
+    assert orders == [("B", 300.0), ("C", 300.0), ("D", 300.0)]
+
+
+def test_last_order_gets_what_is_left_and_tiny_ones_are_skipped():
+    candidates = [("A", -2.0, 10.0), ("B", -1.8, 10.0), ("C", -1.7, float("nan"))]
+    assert allocate(1000.0, candidates, per_symbol=0.5, total=0.8) == [("A", 500.0), ("B", 300.0)]
+    # B can't afford min_shares at this price, but A's share isn't given away
+    assert allocate(1.0, [("A", -2.0, 1.0), ("B", -1.8, 1e9)], per_symbol=0.3) == [("A", 0.3)]
+
+
+def test_allocations_under_the_minimum_order_are_skipped():
+    candidates = [("A", -2.0, 10.0), ("B", -1.9, 10.0), ("C", -1.8, 0.01)]
+    assert allocate(100.0, candidates, per_symbol=0.3, total=0.65, min_notional=1.0) == [("A", 30.0), ("B", 30.0), ("C", 5.0)]
+    # C would only get the $0.50 left under the total cap
+    assert allocate(100.0, candidates, per_symbol=0.3, total=0.605, min_notional=1.0) == [("A", 30.0), ("B", 30.0)]
+    assert allocate(2.5, candidates, per_symbol=0.3, min_notional=1.0) == []  # $0.75 each
+
+
+def test_scan_does_not_queue_orders_under_the_minimum(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "get_buying_power", lambda: 2.0)
+    strategy = tl.MeanReversion(["A"], {}, 1.08, "2025-01-01")
+    with patch.object(strategy.order_queue, "submit") as submit:
+        strategy.handle_buys([("A", -2.5, 10.0)])
+    submit.assert_not_called()  # 30% of $2 is under MIN_ORDER_NOTIONAL
+
+
+def test_deterministic_regardless_of_input_order():
+    candidates = [("A", -2.0, 10.0), ("B", -2.0, 10.0), ("C", -3.0, 10.0)]
+    assert allocate(100.0, candidates) == allocate(100.0, list(candidates))
+    assert [s for s, _ in allocate(100.0, candidates)] == ["C", "A", "B"]
+
+
+def test_scan_sizes_all_buys_from_one_account_lookup(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    lookups = []
+    monkeypatch.setattr(tl, "get_buying_power", lambda: lookups.append(1) or 1000.0)
+    strategy = tl.MeanReversion(["A", "B", "C", "D"], {}, 1.08, "2025-01-01")
+    closes = [100.0, 102.0, 98.0, 101.0, 99.0]
+    for s in strategy.watchlist:
+        strategy.bars.add_bars(s, [{"t": f"2025-09-0{i}T00:00:00Z", "c": c} for i, c in enumerate(closes, 1)])
+    prices = {"A": 95.0, "B": 90.0, "C": 93.0, "D": 100.0}  # D isn't a signal
+
+    with patch("trading_logic.buy", return_value=None) as mock_buy:
+        strategy.evaluate_watchlist(list(strategy.watchlist), prices)
+        strategy.order_queue.join()
+
+    assert lookups == [1]
+    placed = [(c.args[0], c.kwargs["notional"]) for c in mock_buy.call_args_list]
+    assert placed == [("B", 300.0), ("C", 300.0), ("A", 300.0)]
@@ -11,6 +11,14 @@ import trading_logic as tl
 import account_stuff as acct
 from alpaca_api import AlpacaAPI
 
+@pytest.fixture(autouse=True)
+def fresh_account_cache():
+    # account/positions snapshots are cached module-wide, don't leak them between tests
+    acct.account_cache.invalidate()
+    yield
+    acct.account_cache.invalidate()
+
+
 # ---------------------------
 # AlpacaAPI.get_latest_trade
 # ---------------------------
@@ -23,12 +31,46 @@ def test_get_latest_trade():
     mock_resp.status_code = 200
     mock_resp.json.return_value = {"trades": {"AAPL": {"p": 150.25}}}
 
-    with patch("trading_logic.requests.get", return_value=mock_resp):
+    with patch("trading_logic.default_transport.get", return_value=mock_resp):
         api = tl.AlpacaAPI(headers={})
         price = api.get_latest_trade("AAPL")
         assert price == 150.25
 
 
+def test_get_latest_trades_batches_symbols_into_one_request():
+    mock_resp = Mock()
+    mock_resp.status_code = 200
+    mock_resp.json.return_value = {
+        "trades": {"BTC/USD": {"p": 64000.0}, "ETH/USD": {"p": 3100.5}}
+    }
+
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp) as mock_get:
+        api = AlpacaAPI(headers={})
+        prices = api.get_latest_trades(["BTC/USD", "ETH/USD", "DOGE/USD"])
+
+        assert mock_get.call_count == 1
+        called_url = mock_get.call_args[0][0]
+        assert "symbols=BTC%2FUSD,ETH%2FUSD,DOGE%2FUSD" in called_url
+        # DOGE had no trade in the response so it is left out
+        assert prices == {"BTC/USD": 64000.0, "ETH/USD": 3100.5}
+
+
+def test_get_latest_trades_chunks_long_symbol_lists():
+    mock_resp = Mock()
+    mock_resp.status_code = 200
+    mock_resp.json.return_value = {"trades": {}}
+
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp) as mock_get:
+        api = AlpacaAPI(headers={})
+        api.MAX_URL_LENGTH = 200
+        symbols = [f"C{i:03d}/USD" for i in range(40)]
+        api.get_latest_trades(symbols)
+
+        assert mock_get.call_count > 1
+        for call in mock_get.call_args_list:
+            assert len(call[0][0]) <= api.MAX_URL_LENGTH
+
+
 # --------------------------------
 # AlpacaAPI.get_historical_data()
 # --------------------------------
@@ -44,7 +86,7 @@ def test_get_historical_data_avg_sd():
         "bars": {"AAPL": [{"c": 150.2}, {"c": 138.99}, {"c": 151.0}]}
     }
 
-    with patch("alpaca_api.requests.get", return_value=mock_resp):
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp):
         api = AlpacaAPI(headers={})
         avg, sd = api.get_historical_data("AAPL", lookback=3)
         assert round(avg, 2) == 146.73
@@ -69,7 +111,7 @@ def test_buy_posts_notional_market_order_for_crypto():
             }
 
             # IMPORTANT: patch the module where `buy` is defined
-            with patch("account_stuff.requests.post", return_value=mock_post) as post:
+            with patch("account_stuff.default_transport.post", return_value=mock_post) as post:
                 result = acct.buy("BTC/USD")
 
                 post.assert_called_once()
@@ -97,7 +139,7 @@ def test_sell_closes_position_via_delete():
     mock_delete.status_code = 200
     mock_delete.json.return_value = {"symbol": "AAPL", "status": "closed"}
 
-    with patch("account_stuff.requests.delete", return_value=mock_delete) as req_delete:
+    with patch("account_stuff.default_transport.delete", return_value=mock_delete) as req_delete:
         result = acct.sell("AAPL")
 
         req_delete.assert_called_once()
@@ -118,7 +160,7 @@ def test_get_num_of_shares_tolerates_fractionals():
     mock_resp.status_code = 200
     mock_resp.json.return_value = [{"symbol": "AAPL", "qty": "10.125000000"}]
 
-    with patch("account_stuff.requests.get", return_value=mock_resp):
+    with patch("account_stuff.default_transport.get", return_value=mock_resp):
         qty = acct.get_num_of_shares("AAPL")
 
         # Accept string, float, or int behavior:
@@ -149,8 +191,8 @@ def test_sell_liquidates_position_end_to_end():
     mock_delete.status_code = 200
     mock_delete.json.return_value = {"symbol": "AAPL", "status": "closed"}
 
-    with patch("account_stuff.requests.get", side_effect=[pre_get, post_get]) as req_get, \
-         patch("account_stuff.requests.delete", return_value=mock_delete) as req_delete:
+    with patch("account_stuff.default_transport.get", side_effect=[pre_get, post_get]) as req_get, \
+         patch("account_stuff.default_transport.delete", return_value=mock_delete) as req_delete:
 
         # Pre-condition
         qty_before = acct.get_num_of_shares("AAPL")
@@ -194,8 +236,8 @@ def test_sell_and_verify_polls_until_closed():
     mid = Mock();  mid.status_code = 200;  mid.json.return_value  = [{"symbol":"AAPL","qty":"1.0"}]
     post= Mock(); post.status_code = 200; post.json.return_value = []  # closed
 
-    with patch("account_stuff.requests.delete", return_value=mock_delete) as req_del, \
-         patch("account_stuff.requests.get", side_effect=[pre, mid, post]) as req_get, \
+    with patch("account_stuff.default_transport.delete", return_value=mock_delete) as req_del, \
+         patch("account_stuff.default_transport.get", side_effect=[pre, mid, post]) as req_get, \
          patch("account_stuff.time.sleep") as _sleep:  # don't actually sleep
         resp = sell_and_verify("AAPL", retries=5, sleep_s=0.01)
 
@@ -299,7 +341,7 @@ def test_get_historical_data_sends_start_param_and_uses_crypto_endpoint():
         }
     }
 
-    with patch("alpaca_api.requests.get", return_value=mock_resp) as mock_get:
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp) as mock_get:
         api = AlpacaAPI(headers={})
         avg, sd = api.get_historical_data(symbol, lookback=2, timeframe="1Min")
 
@@ -336,7 +378,7 @@ def test_get_historical_data_avg_sd_multiple_bars():
         }
     }
 
-    with patch("alpaca_api.requests.get", return_value=mock_resp):
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp):
         api = AlpacaAPI(headers={})
         avg, sd = api.get_historical_data(symbol, lookback=3, timeframe="1Min")
 
@@ -352,8 +394,71 @@ def test_get_historical_data_insufficient_bars_returns_none():
     mock_resp.status_code = 200
     mock_resp.json.return_value = {"bars": {symbol: [{"t": "2025-09-22T00:00:00Z", "c": 64000.0}]}}  # only one bar
 
-    with patch("alpaca_api.requests.get", return_value=mock_resp):
+    with patch("alpaca_api.default_transport.get", return_value=mock_resp):
         api = AlpacaAPI(headers={})
         avg, sd = api.get_historical_data(symbol, lookback=3, timeframe="1Min")
         assert avg is None and sd is None
 
+
+# ---- 4) bulk bars follow next_page_token and split closes per symbol ----
+def test_get_historical_closes_follows_pagination():
+    page1 = Mock()
+    page1.status_code = 200
+    page1.json.return_value = {
+        "bars": {
+            "BTC/USD": [
+                {"t": "2025-09-19T19:32:00Z", "c": 63900.0},
+                {"t": "2025-09-19T19:31:00Z", "c": 64100.0},
+            ]
+        },
+        "next_page_token": "abc",
+    }
+    page2 = Mock()
+    page2.status_code = 200
+    page2.json.return_value = {
+        "bars": {
+            "BTC/USD": [{"t": "2025-09-19T19:30:00Z", "c": 64000.0}],
+            "ETH/USD": [
+                {"t": "2025-09-19T19:31:00Z", "c": 3010.0},
+                {"t": "2025-09-19T19:30:00Z", "c": 3000.0},
+            ],
+        },
+        "next_page_token": None,
+    }
+
+    with patch("alpaca_api.default_transport.get", side_effect=[page1, page2]) as mock_get:
+        api = AlpacaAPI(headers={})
+        closes = api.get_historical_closes(["BTC/USD", "ETH/USD"], lookback=3, timeframe="1Min")
+
+        assert mock_get.call_count == 2
+        assert "page_token" not in mock_get.call_args_list[0][1]["params"]
+        assert mock_get.call_args_list[1][1]["params"]["page_token"] == "abc"
+        assert mock_get.call_args_list[0][0][0].endswith("/v1beta3/crypto/us/bars?symbols=BTC%2FUSD,ETH%2FUSD")
+
+        # oldest first, per symbol
+        assert closes["BTC/USD"] == [64000.0, 64100.0, 63900.0]
+        assert closes["ETH/USD"] == [3000.0, 3010.0]
+
+
+def test_get_historical_stats_stops_paging_once_lookback_is_filled():
+    page1 = Mock()
+    page1.status_code = 200
+    page1.json.return_value = {
+        "bars": {
+            "BTC/USD": [
+                {"t": "2025-09-19T19:32:00Z", "c": 63900.0},
+                {"t": "2025-09-19T19:31:00Z", "c": 64100.0},
+                {"t": "2025-09-19T19:30:00Z", "c": 64000.0},
+            ]
+        },
+        "next_page_token": "more-old-bars",
+    }
+
+    with patch("alpaca_api.default_transport.get", return_value=page1) as mock_get:
+        api = AlpacaAPI(headers={})
+        stats = api.get_historical_stats(["BTC/USD"], lookback=3, timeframe="1Min")
+
+        assert mock_get.call_count == 1
+        avg, sd = stats["BTC/USD"]
+        assert round(avg, 2) == 64000.00
+        assert round(sd, 2) == 100.00
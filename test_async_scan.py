@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import trading_logic as tl
+from async_alpaca_api import AsyncAlpacaAPI
+
+
+def make_strategy(watchlist):
+    return tl.MeanReversion(watchlist, {}, 1.08, "2025-01-01")
+
+
+def test_async_api_limits_requests_in_flight():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_bars(symbols, **kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return {s: [] for s in symbols}
+
+    api = AsyncAlpacaAPI(headers={}, concurrency=2)
+    api.api.get_bars = slow_bars
+    groups = [[f"S{i}/USD"] for i in range(6)]
+    bars = asyncio.run(api.gather_bars(groups))
+
+    assert set(bars) == {f"S{i}/USD" for i in range(6)}
+    assert peak == 2
+
+
+def test_async_buy_or_sell_applies_decisions_in_watchlist_order(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "get_buying_power", lambda: 1000.0)
+    watchlist = ["BTC/USD", "ETH/USD", "SOL/USD"]
+    strategy = make_strategy(watchlist)
+
+    def fake_bars(symbols, **kwargs):
+        return {
+            s: [{"t": f"2025-09-0{d}T00:00:00Z", "c": c} for d, c in enumerate([90.0, 100.0, 110.0], 1)]
+            for s in symbols
+        }
+
+    strategy.async_api.api.get_bars = fake_bars
+    # every symbol is far below the mean so every symbol is a buy
+    strategy.async_api.api.get_latest_trades = lambda symbols: {s: 50.0 for s in symbols}
+
+    def filled(symbol, snapshot=None, client_order_id=None, notional=None):
+        return {
+            "client_order_id": f"c-{symbol}", "symbol": symbol, "side": "buy", "status": "filled",
+            "filled_qty": "1", "filled_avg_price": "50.0", "filled_at": "2025-09-04T00:00:00Z",
+        }
+
+    with patch("trading_logic.buy", side_effect=filled) as mock_buy:
+        asyncio.run(strategy.async_buy_or_sell(batch_size=1))
+        strategy.order_queue.join()
+
+    assert [c[0][0] for c in mock_buy.call_args_list] == watchlist
+    assert set(strategy.purchase_info) == set(watchlist)
+
+
+def test_default_scan_makes_one_request_per_asset_class(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    strategy = make_strategy(["BTC/USD", "AAPL", "ETH/USD", "MSFT", "SOL/USD"])
+    calls = []
+
+    def bars(symbols, **kwargs):
+        calls.append(("bars", sorted(symbols)))
+        return {}
+
+    def trades(symbols):
+        calls.append(("trades", sorted(symbols)))
+        return {}
+
+    strategy.async_api.api.get_bars = bars
+    strategy.async_api.api.get_latest_trades = trades
+    asyncio.run(strategy.async_buy_or_sell())
+
+    assert sorted(calls) == [
+        ("bars", ["AAPL", "MSFT"]), ("bars", ["BTC/USD", "ETH/USD", "SOL/USD"]),
+        ("trades", ["AAPL", "MSFT"]), ("trades", ["BTC/USD", "ETH/USD", "SOL/USD"]),
+    ]
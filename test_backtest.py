@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from allocation import allocate
+from backtest import run_backtest, bars_to_matrix, ALLOCATION, ALLOCATION_TOTAL, MIN_SHARES
+from rolling_stats import rolling_mean_std
+from signals import evaluate, BUY, SELL
+
+PARAMS = {
+    "z_score": 1.5,
+    "mean_exit_z": 0.5,
+    "hard_tp": 1.03,
+    "panic_z": -2.8,
+    "max_hold_days": 5,
+    "lookback": 20,
+    "min_seconds_between_purchases": 259200,
+}
+
+
+def random_walk(rows, cols, seed=1):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.01, size=(rows, cols))
+    closes = 100 * np.exp(np.cumsum(steps, axis=0))
+    closes[rng.random((rows, cols)) < 0.01] = np.nan  # some missing bars
+    times = 1_700_000_000 + np.arange(rows) * 3600.0  # hourly bars
+    return closes, times
+
+
+def stepwise(closes, times, params, cash):
+    # bar-by-bar replay through signals.evaluate, the way the live loop would run it
+    means, stdevs = rolling_mean_std(closes, params["lookback"])
+    rows, cols = closes.shape
+    entry_price = np.full(cols, np.nan)
+    entry_time = np.full(cols, np.nan)
+    qty = np.zeros(cols)
+    trades = []
+    open_trade = {}  # col -> index into trades
+    for t in range(rows):
+        actions, z = evaluate(closes[t], means[t], stdevs[t], entry_price, entry_time, times[t], params)
+        for col in np.flatnonzero(actions == SELL):
+            cash += qty[col] * closes[t, col]
+            trades[open_trade.pop(col)][2] = t
+            entry_price[col] = entry_time[col] = np.nan
+            qty[col] = 0
+        buys = [(col, z[col], closes[t, col]) for col in np.flatnonzero(actions == BUY)]
+        for col, notional in allocate(cash, buys, ALLOCATION, ALLOCATION_TOTAL, MIN_SHARES):
+            cash -= notional
+            qty[col] = notional / closes[t, col]
+            entry_price[col] = closes[t, col]
+            entry_time[col] = times[t]
+            open_trade[col] = len(trades)
+            trades.append([col, t, None])
+    return [tuple(tr) for tr in trades], cash + np.nansum(qty * closes[-1])
+
+
+def test_matches_bar_by_bar_replay():
+    closes, times = random_walk(3000, 6)
+    closes[-1] = np.where(np.isnan(closes[-1]), 100.0, closes[-1])
+    symbols = [f"S{i}" for i in range(6)]
+    result = run_backtest(closes, times, symbols, PARAMS, initial_cash=10000.0)
+
+    expected_trades, expected_equity = stepwise(closes, times, PARAMS, 10000.0)
+    got = [(symbols.index(t["symbol"]), t["entry_index"], t["exit_index"]) for t in result["trades"]]
+    assert sorted(got) == sorted(expected_trades)
+    assert len(got) > 20
+    assert result["equity"][-1] == pytest.approx(expected_equity, rel=1e-9)
+    assert {t["reason"] for t in result["trades"] if t["exit_index"] is not None} <= {
+        "mean_exit", "take_profit", "panic", "max_hold"
+    }
+
+
+def test_cooldown_after_exit_blocks_quick_reentries():
+    closes, times = random_walk(3000, 3, seed=5)
+    symbols = ["A", "B", "C"]
+    free = run_backtest(closes, times, symbols, PARAMS)
+    cooled = run_backtest(closes, times, symbols, PARAMS, cooldown_after_exit=True)
+
+    assert len(cooled["trades"]) < len(free["trades"])
+    for symbol in symbols:
+        entries = [t["entry_time"] for t in cooled["trades"] if t["symbol"] == symbol]
+        assert all(b - a > PARAMS["min_seconds_between_purchases"] for a, b in zip(entries, entries[1:]))
+
+
+def test_summary_and_bars_to_matrix():
+    bars = {
+        "A": [{"t": "2025-01-01T00:00:00Z", "c": 1.0}, {"t": "2025-01-02T00:00:00Z", "c": 2.0}],
+        "B": [{"t": "2025-01-02T00:00:00Z", "c": 3.0}],
+    }
+    times, closes = bars_to_matrix(bars, ["A", "B"])
+    assert times[1] - times[0] == 86400
+    assert np.isnan(closes[0, 1]) and closes[1, 1] == 3.0
+
+    result = run_backtest(closes, times, ["A", "B"], PARAMS)
+    assert result["trades"] == []
+    assert result["summary"]["final_equity"] == 10000.0
+    assert result["summary"]["total_return"] == 0.0
@@ -0,0 +1,58 @@
+from unittest.mock import Mock
+
+from bar_cache import BarCache
+
+
+def bar(day, close):
+    return {"t": f"2025-09-{day:02d}T00:00:00Z", "c": close}
+
+
+def test_refresh_fetches_full_lookback_once_then_only_new_bars():
+    api = Mock()
+    api.get_bars.side_effect = [
+        {"BTC/USD": [bar(1, 100.0), bar(2, 102.0), bar(3, 101.0)]},
+        # the forming bar from day 3 comes back updated, plus one new bar
+        {"BTC/USD": [bar(3, 104.0), bar(4, 106.0)]},
+    ]
+    cache = BarCache(api, lookback=3)
+
+    cache.refresh(["BTC/USD"])
+    assert cache.closes("BTC/USD") == [100.0, 102.0, 101.0]
+    assert api.get_bars.call_args[1]["lookback"] == 3
+
+    cache.refresh(["BTC/USD"])
+    kwargs = api.get_bars.call_args[1]
+    assert kwargs["start"] == "2025-09-03T00:00:00Z"
+    assert kwargs["lookback"] is None
+    # ring buffer keeps only the last 3 bars
+    assert cache.closes("BTC/USD") == [102.0, 104.0, 106.0]
+
+    avg, sd = cache.stats("BTC/USD")
+    assert avg == 104.0
+    assert round(sd, 2) == 2.0
+
+
+def test_symbols_that_fell_behind_are_fetched_from_their_own_last_bar():
+    api = Mock()
+    api.get_bars.side_effect = [
+        {"BTC/USD": [bar(1, 100.0), bar(9, 101.0)], "ETH/USD": [bar(1, 10.0), bar(2, 11.0)]},
+        {"ETH/USD": [bar(2, 11.0), bar(3, 12.0)]},
+        {"BTC/USD": [bar(9, 102.0)]},
+    ]
+    cache = BarCache(api, lookback=3)
+    cache.refresh(["BTC/USD", "ETH/USD"])
+    cache.refresh(["BTC/USD", "ETH/USD"])
+
+    warm = [(c.args[0], c.kwargs["start"]) for c in api.get_bars.call_args_list[1:]]
+    assert warm == [(["ETH/USD"], "2025-09-02T00:00:00Z"), (["BTC/USD"], "2025-09-09T00:00:00Z")]
+    assert cache.closes("BTC/USD") == [100.0, 102.0]
+
+
+def test_stats_with_too_few_bars_returns_none():
+    api = Mock()
+    api.get_bars.return_value = {"BTC/USD": [bar(1, 100.0)]}
+    cache = BarCache(api, lookback=3)
+    cache.refresh(["BTC/USD", "ETH/USD"])
+
+    assert cache.stats("BTC/USD") == (None, None)
+    assert cache.stats("ETH/USD") == (None, None)
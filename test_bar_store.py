@@ -0,0 +1,126 @@
+import os
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from bar_cache import BarCache
+from bar_store import BarStore, to_epoch, to_iso
+
+DAY = 86400
+T0 = to_epoch("2024-01-01T00:00:00Z")
+
+
+def bar(day, close):
+    return {"t": to_iso(T0 + day * DAY), "o": close, "h": close, "l": close, "c": close, "v": 100.0}
+
+
+def test_append_and_read_memmap(tmp_path):
+    store = BarStore(tmp_path)
+    assert store.append("AAPL", "1Day", [bar(0, 1.0), bar(1, 2.0)]) == 2
+    # already stored and duplicate stamps are skipped
+    assert store.append("AAPL", "1Day", [bar(1, 2.0), bar(2, 3.0), bar(2, 3.0)]) == 1
+
+    cols = store.read("AAPL", "1Day")
+    assert isinstance(cols["c"], np.memmap)
+    assert cols["c"].tolist() == [1.0, 2.0, 3.0]
+    assert store.read("AAPL", "1Day", start=T0 + DAY, end=T0 + 2 * DAY)["c"].tolist() == [2.0]
+    assert store.last_time("AAPL", "1Day") == T0 + 2 * DAY
+
+
+def test_torn_append_is_ignored_and_overwritten(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("AAPL", "1Day", [bar(0, 1.0)])
+    # crash after the close column was written but before t was
+    with open(store._file("AAPL", "1Day", "c"), "ab") as f:
+        f.write(np.array([99.0]).tobytes())
+    assert store.rows("AAPL", "1Day") == 1
+
+    store.append("AAPL", "1Day", [bar(1, 2.0)])
+    assert store.read("AAPL", "1Day")["c"].tolist() == [1.0, 2.0]
+
+
+def test_prepend_backfills_older_bars(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("BTC/USD", "1Day", [bar(2, 3.0)])
+    assert store.prepend("BTC/USD", "1Day", [bar(0, 1.0), bar(1, 2.0), bar(2, 9.0)]) == 2
+    assert store.read("BTC/USD", "1Day")["c"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_interrupted_prepend_is_all_or_nothing(tmp_path, monkeypatch):
+    store = BarStore(tmp_path)
+    store.append("BTC/USD", "1Day", [bar(2, 3.0)])
+
+    # crash before the journal is in place: the rewritten columns are dropped
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", Mock(side_effect=OSError("disk full")))
+    with pytest.raises(OSError):
+        store.prepend("BTC/USD", "1Day", [bar(0, 1.0), bar(1, 2.0)])
+    monkeypatch.setattr(os, "replace", real_replace)
+    assert store.read("BTC/USD", "1Day")["c"].tolist() == [3.0]
+    assert not any(name.endswith(".tmp") for name in os.listdir(store._dir("BTC/USD", "1Day")))
+
+    # crash after it: the next open finishes swapping every column in
+    monkeypatch.setattr(BarStore, "recover", lambda self, symbol, timeframe: None)
+    store.prepend("BTC/USD", "1Day", [bar(0, 1.0), bar(1, 2.0)])
+    monkeypatch.undo()
+    cols = BarStore(tmp_path).read("BTC/USD", "1Day")
+    assert cols["t"].tolist() == [T0, T0 + DAY, T0 + 2 * DAY]
+    assert cols["c"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_misaligned_columns_are_refused(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("AAPL", "1Day", [bar(0, 1.0), bar(1, 2.0)])
+    with open(store._file("AAPL", "1Day", "c"), "r+b") as f:
+        f.truncate(8)
+    with pytest.raises(ValueError, match="inconsistent"):
+        store.read("AAPL", "1Day")
+
+    cache = BarCache(Mock(), lookback=5, store=store)
+    cache.seed_from_store(["AAPL"], "1Day")  # falls back to the API instead
+    assert cache.closes("AAPL") == []
+
+
+def test_sync_only_fetches_missing_closed_bars(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("AAPL", "1Day", [bar(0, 1.0), bar(1, 2.0)])
+    api = Mock()
+    api.get_bars.side_effect = lambda symbols, **kw: {
+        "AAPL": [bar(2, 3.0), bar(3, 4.0)],
+        "MSFT": [bar(0, 5.0), bar(1, 6.0), bar(2, 7.0), bar(3, 8.0)],
+    }
+    now = T0 + 3 * DAY + 3600  # day 3 is still forming
+
+    added = store.sync(api, ["AAPL", "MSFT"], "1Day", to_iso(T0), now=now)
+
+    assert added == {"AAPL": 1, "MSFT": 3}
+    starts = {tuple(c.args[0]): c.kwargs["start"] for c in api.get_bars.call_args_list}
+    assert starts == {("MSFT",): to_iso(T0), ("AAPL",): to_iso(T0 + DAY + 1)}
+    assert store.read("AAPL", "1Day")["c"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_matrix_aligns_symbols(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("AAPL", "1Day", [bar(0, 1.0), bar(1, 2.0)])
+    store.append("MSFT", "1Day", [bar(1, 5.0), bar(2, 6.0)])
+
+    times, closes = store.matrix(["AAPL", "MSFT"], "1Day")
+
+    assert times.tolist() == [T0, T0 + DAY, T0 + 2 * DAY]
+    assert np.isnan(closes[0, 1]) and np.isnan(closes[2, 0])
+    assert closes[1].tolist() == [2.0, 5.0]
+
+
+def test_bar_cache_seeds_from_store(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("AAPL", "1Day", [bar(d, float(d)) for d in range(30)])
+    api = Mock()
+    api.get_bars.return_value = {"AAPL": [bar(30, 30.0)]}
+
+    cache = BarCache(api, lookback=20, store=store)
+    cache.refresh(["AAPL"])
+
+    # only the bars after the stored ones were requested
+    assert api.get_bars.call_args.kwargs["start"] == to_iso(T0 + 29 * DAY)
+    assert cache.closes("AAPL") == [float(d) for d in range(11, 31)]
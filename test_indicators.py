@@ -0,0 +1,102 @@
+import math
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+import trading_logic as tl
+from bar_cache import BarCache
+from indicators import EWMA, RSI, HalfLife, Indicators
+
+
+def rsi_reference(closes, period=14):
+    changes = np.diff(closes)
+    gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+    gain, loss = gains[:period].mean(), losses[:period].mean()
+    for g, l in zip(gains[period:], losses[period:]):
+        gain += (g - gain) / period
+        loss += (l - loss) / period
+    return 100 - 100 / (1 + gain / loss)
+
+
+def half_life_reference(closes):
+    x = np.asarray(closes[:-1])
+    dy = np.diff(closes)
+    slope = np.polyfit(x, dy, 1)[0]
+    return -math.log(2) / math.log(1 + slope)
+
+
+def ou_path(n, seed=5):
+    rng = np.random.default_rng(seed)
+    x = [100.0]
+    for _ in range(n - 1):
+        x.append(x[-1] + 0.2 * (100.0 - x[-1]) + rng.normal(0, 1))
+    return x
+
+
+def test_incremental_values_match_batch_formulas():
+    closes = ou_path(300)
+    rsi, ewma, half_life = RSI(14), EWMA(20), HalfLife(50)
+    for x in closes:
+        rsi.push(x)
+        ewma.push(x)
+        half_life.push(x)
+
+    assert rsi.value() == pytest.approx(rsi_reference(closes), rel=1e-9)
+    assert half_life.value() == pytest.approx(half_life_reference(closes[-51:]), rel=1e-6)
+    weights = (1 - 2 / 21) ** np.arange(len(closes))[::-1]
+    assert ewma.value()[0] == pytest.approx(
+        closes[0] * weights[0] + sum(2 / 21 * w * x for w, x in zip(weights[1:], closes[1:])), rel=1e-9
+    )
+
+
+def test_replacing_the_forming_close_equals_pushing_the_final_one():
+    bars = [{"t": f"2025-09-{i:02d}", "c": c} for i, c in enumerate(ou_path(25), 1)]
+    a = BarCache(Mock(), lookback=20, indicators=Indicators())
+    b = BarCache(Mock(), lookback=20, indicators=Indicators())
+    a.add_bars("BTC/USD", bars[:-1] + [dict(bars[-1], c=50.0)])
+    a.add_bars("BTC/USD", [bars[-1]])  # the forming bar's final close
+    b.add_bars("BTC/USD", bars)
+
+    for name, value in b.indicators.values(("BTC/USD", "1Day")).items():
+        assert a.indicators.get(("BTC/USD", "1Day"), name) == pytest.approx(value, rel=1e-9), name
+
+
+def test_bar_cache_feeds_indicators_without_extra_requests():
+    closes = ou_path(40)
+    api = Mock()
+    api.get_bars.return_value = {"BTC/USD": [{"t": f"2025-09-{i:02d}", "c": c} for i, c in enumerate(closes, 1)][:30]}
+    cache = BarCache(api, lookback=30, indicators=Indicators())
+    cache.refresh(["BTC/USD"])
+
+    assert api.get_bars.call_count == 1
+    mean, stdev = cache.stats("BTC/USD")
+    assert cache.indicator("BTC/USD", "mean_stdev") == (mean, stdev)
+    assert cache.indicator("BTC/USD", "zscore") == pytest.approx((closes[29] - mean) / stdev)
+    assert cache.indicator("BTC/USD", "rsi") == pytest.approx(rsi_reference(closes[:30]))
+    assert cache.indicator("BTC/USD", "nope") is None
+
+
+def test_rsi_filter_drops_buy_signals(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "BUY_MAX_RSI", 30)
+    strategy = tl.MeanReversion(["BTC/USD", "ETH/USD"], {}, 1.08, "2025-01-01")
+    strategy.bars.stats = Mock(return_value=(100.0, 2.0))
+    strategy.bars.indicator = Mock(side_effect=lambda symbol, name: {"BTC/USD": 25.0, "ETH/USD": 45.0}[symbol])
+    strategy.handle_buys = Mock()
+
+    strategy.evaluate_watchlist(["BTC/USD", "ETH/USD"], {"BTC/USD": 90.0, "ETH/USD": 90.0})
+
+    (candidates,), _ = strategy.handle_buys.call_args
+    assert [c[0] for c in candidates] == ["BTC/USD"]
+
+
+def test_strategy_timeframe_must_be_resampled(monkeypatch):
+    monkeypatch.setattr(tl, "STRATEGY_TIMEFRAME", "1Hour")
+    monkeypatch.setattr(tl, "RESAMPLE_TIMEFRAMES", ("1Day", "5Min"))
+    with pytest.raises(ValueError, match="1Hour"):
+        tl.MeanReversion(["BTC/USD"], {}, 1.08, "2025-01-01")
+
+    monkeypatch.setattr(tl, "RESAMPLE_TIMEFRAMES", ("1Hour",))
+    strategy = tl.MeanReversion(["BTC/USD"], {}, 1.08, "2025-01-01")
+    assert strategy.bars.timeframe == "1Hour"  # what stats() and indicator() read
@@ -0,0 +1,93 @@
+import datetime
+from unittest.mock import Mock
+
+from market_calendar import EASTERN, MarketCalendar
+
+# Wed 2025-07-02 regular, Thu 07-03 early close, Fri 07-04 holiday, Mon 07-07 regular
+CALENDAR = [
+    {"date": "2025-07-02", "open": "09:30", "close": "16:00"},
+    {"date": "2025-07-03", "open": "09:30", "close": "13:00"},
+    {"date": "2025-07-07", "open": "09:30", "close": "16:00"},
+]
+CLOSED_CLOCK = {"is_open": False, "next_open": "2025-07-03T09:30:00-04:00", "next_close": "2025-07-03T13:00:00-04:00"}
+
+
+def at(day, hour, minute=0):
+    return datetime.datetime(2025, 7, day, hour, minute, tzinfo=EASTERN).timestamp()
+
+
+def make_calendar(now, path=None, clock=CLOSED_CLOCK):
+    fetch_clock = Mock(return_value=clock)
+    fetch_calendar = Mock(return_value=CALENDAR)
+    times = {"now": now}
+    cal = MarketCalendar(fetch_clock, fetch_calendar, path, clock=lambda: times["now"])
+    return cal, fetch_calendar, times
+
+
+def test_holidays_and_early_closes():
+    cal, _, _ = make_calendar(at(2, 20))
+    assert not cal.is_open(at(2, 20))
+    assert cal.is_open(at(3, 12, 59))
+    assert not cal.is_open(at(3, 13, 30))  # early close
+    assert not cal.is_open(at(4, 11))  # Independence Day
+    assert not cal.is_open(at(5, 11))  # Saturday
+    assert cal.is_open(datetime.datetime(2025, 7, 7, 7, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=-7))))
+
+
+def test_fetches_once_a_day_and_answers_from_the_cache():
+    cal, fetch_calendar, times = make_calendar(at(2, 20))
+    for minute in range(0, 240, 2):
+        times["now"] = at(2, 20) + minute * 60
+        cal.is_open()
+    assert fetch_calendar.call_count == 1
+    assert fetch_calendar.call_args.args == ("2025-07-02", "2025-07-16")
+
+    cal.is_open(at(3, 10))  # new day
+    assert fetch_calendar.call_count == 2
+
+
+def test_clock_overrides_an_unscheduled_closure():
+    # the calendar says Wednesday is a session, the clock says the market is shut
+    closed = {"is_open": False, "next_open": "2025-07-03T09:30:00-04:00", "next_close": "2025-07-03T13:00:00-04:00"}
+    cal, _, _ = make_calendar(at(2, 11), clock=closed)
+    assert not cal.is_open(at(2, 11))
+    assert cal.is_open(at(3, 10))
+
+
+def test_crypto_is_always_tradable_and_closed_stocks_are_skipped():
+    cal, _, _ = make_calendar(at(5, 11))
+    assert cal.tradable(["AAPL", "BTC/USD", "MSFT", "ETH/USD"], at(5, 11)) == ["BTC/USD", "ETH/USD"]
+    assert cal.tradable(["AAPL", "BTC/USD"], at(7, 10)) == ["AAPL", "BTC/USD"]
+
+
+def test_cache_survives_a_restart_and_a_failed_refresh(tmp_path):
+    path = str(tmp_path / "calendar.json")
+    cal, _, _ = make_calendar(at(2, 20), path)
+    cal.is_open(at(2, 20))
+
+    offline = MarketCalendar(Mock(return_value=None), Mock(return_value=None), path, clock=lambda: at(3, 10))
+    assert offline.is_open(at(3, 10))  # from disk, though the refresh failed
+    assert offline.fetch_calendar.call_count == 1
+    offline.is_open(at(3, 10, 1))
+    assert offline.fetch_calendar.call_count == 1  # waits retry_after before trying again
+
+
+def test_a_refresh_that_raises_falls_back_to_the_cache(tmp_path):
+    import requests
+
+    path = str(tmp_path / "calendar.json")
+    cal, _, _ = make_calendar(at(2, 20), path)
+    cal.is_open(at(2, 20))
+
+    offline = MarketCalendar(
+        Mock(side_effect=ValueError("Expecting value")),
+        Mock(side_effect=requests.ConnectionError("reset")),
+        path,
+        clock=lambda: at(3, 10),
+    )
+    assert offline.is_open(at(3, 10))
+    assert offline.failed_at == at(3, 10)
+
+    fresh = MarketCalendar(Mock(side_effect=requests.Timeout()), Mock(side_effect=requests.Timeout()), clock=lambda: at(5, 11))
+    assert not fresh.is_open(at(5, 11))  # regular hours: Saturday
+    assert fresh.is_open(at(7, 10))
@@ -0,0 +1,102 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import account_stuff as acct
+from order_queue import OrderQueue, make_client_order_id
+from transport import Transport
+
+
+def test_submit_returns_immediately_and_dedupes_per_symbol():
+    release = threading.Event()
+    placed = []
+    results = []
+
+    def slow_execute(intent):
+        release.wait(5)
+        placed.append(intent["symbol"])
+        return {"client_order_id": intent["client_order_id"]}
+
+    q = OrderQueue(slow_execute, on_result=lambda i, o: results.append((i["symbol"], o))).start()
+    start = time.perf_counter()
+    first = q.submit("buy", "BTC/USD")
+    assert q.submit("buy", "BTC/USD") is None  # already in flight
+    assert q.submit("sell", "BTC/USD") is None
+    q.submit("buy", "ETH/USD")
+    assert time.perf_counter() - start < 0.5
+    assert q.busy("BTC/USD")
+
+    release.set()
+    q.join()
+    q.stop()
+
+    assert placed == ["BTC/USD", "ETH/USD"]
+    assert results[0] == ("BTC/USD", {"client_order_id": first["client_order_id"]})
+    assert not q.busy("BTC/USD")
+    assert q.submit("sell", "BTC/USD") is not None  # free again once the result is in
+
+
+def test_errors_are_reported_as_no_order():
+    results = []
+    q = OrderQueue(Mock(side_effect=RuntimeError("boom")), on_result=lambda i, o: results.append(o)).start()
+    q.submit("buy", "AAPL")
+    q.join()
+    assert results == [None]
+    assert not q.busy("AAPL")
+
+
+def test_client_order_id_is_deterministic():
+    assert make_client_order_id("buy", "BTC/USD", 1.5) == make_client_order_id("buy", "BTC/USD", 1.5)
+    assert make_client_order_id("buy", "BTC/USD", 1.5) != make_client_order_id("buy", "BTC/USD", 2.5)
+    assert "/" not in make_client_order_id("buy", "BTC/USD", 1.5)
+
+
+def test_post_with_client_order_id_is_retried():
+    t = Transport(max_retries=2)
+    fail = Mock(status_code=503, headers={})
+    ok = Mock(status_code=200, headers={})
+    with patch.object(t.session, "request", side_effect=[fail, ok]) as req, patch("transport.time.sleep"):
+        r = t.post("https://api.alpaca.markets/v2/orders", json={"client_order_id": "x"}, idempotent=True)
+    assert r is ok
+    assert req.call_count == 2
+
+
+def test_buy_reuses_order_when_client_order_id_already_exists(monkeypatch):
+    monkeypatch.setattr(acct, "get_buying_power", lambda: 1000.0)
+    duplicate = Mock(status_code=422, text='{"message": "client_order_id must be unique"}')
+    existing = {"client_order_id": "mr-buy-AAPL-1", "status": "filled"}
+    snapshot = Mock(get=Mock(return_value=100.0))
+    with patch("account_stuff.default_transport.post", return_value=duplicate) as post, \
+            patch("account_stuff.fetch_order", return_value=existing) as fetch:
+        order = acct.buy("AAPL", snapshot=snapshot, client_order_id="mr-buy-AAPL-1")
+
+    assert order is existing
+    fetch.assert_called_once_with("mr-buy-AAPL-1")
+    assert post.call_args.kwargs["json"]["client_order_id"] == "mr-buy-AAPL-1"
+    assert post.call_args.kwargs["idempotent"] is True
+
+
+def test_summary_keeps_orders_placed_while_it_is_sent(monkeypatch):
+    import trading_logic as tl
+
+    summary = {"AAPL": {"order_type": "sell", "latest_trade": 1.0, "exit_time": None}}
+    monkeypatch.setattr(tl, "summary", summary)
+    strategy = tl.MeanReversion(["AAPL", "MSFT"], {}, 1.08, "2025-01-01")
+    strategy.order_queue.stop()
+    placed = threading.Event()
+
+    def writer():
+        # the order worker reporting a sell, through the real path and its lock
+        intent = {"side": "sell", "symbol": "MSFT", "latest_trade": 2.0}
+        strategy.on_order_result(intent, {"client_order_id": "mr-sell-MSFT-2", "symbol": "MSFT", "side": "sell"})
+        placed.set()
+
+    def tweet(message):
+        assert "AAPL" in message and "MSFT" not in message
+        threading.Thread(target=writer).start()
+        assert placed.wait(5)  # the result lands before the summary is cleared
+
+    monkeypatch.setattr(tl, "tweet", tweet)
+    strategy.generate_summary()
+    assert list(summary) == ["MSFT"]
+    assert summary["MSFT"]["latest_trade"] == 2.0
@@ -0,0 +1,149 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+import trading_logic as tl
+from fake_stream_server import FakeTradeUpdates
+from order_tracker import OrderTracker
+from stream import TradeUpdatesStream
+
+
+def order(coid, side="buy", status="accepted", qty=None, price=None, symbol="BTC/USD"):
+    return {
+        "client_order_id": coid, "id": f"id-{coid}", "symbol": symbol, "side": side, "status": status,
+        "filled_qty": qty or "0", "filled_avg_price": price,
+        "filled_at": "2025-09-04T16:00:00Z" if status == "filled" else None,
+    }
+
+
+def test_fill_reported_once_with_real_price():
+    fills = []
+    tracker = OrderTracker(on_fill=fills.append)
+    tracker.track(order("a"))
+    assert tracker.pending("BTC/USD")
+
+    tracker.handle_event({"event": "partial_fill", "order": order("a", status="partially_filled", qty="0.5", price="99")})
+    assert fills == []
+    tracker.handle_event({"event": "fill", "order": order("a", status="filled", qty="1", price="99.5")})
+    tracker.handle_event({"event": "fill", "order": order("a", status="filled", qty="1", price="99.5")})  # duplicate
+
+    assert len(fills) == 1
+    assert fills[0]["filled_avg_price"] == 99.5
+    assert tracker.pending("BTC/USD") == []
+    # orders we didn't place are ignored
+    assert tracker.handle_event({"event": "fill", "order": order("other", status="filled")}) is None
+
+
+def test_fill_that_arrives_before_track_is_applied():
+    fills = []
+    tracker = OrderTracker(on_fill=fills.append)
+    # the stream is faster than the POST response handled on the order worker
+    tracker.handle_event({"event": "fill", "order": order("a", status="filled", qty="1", price="99.5")})
+    assert fills == []
+
+    tracker.track(order("a"))
+
+    assert [f["filled_avg_price"] for f in fills] == [99.5]
+    assert tracker.pending("BTC/USD") == []
+    assert tracker.unmatched == {}
+
+
+def test_poll_fallback_updates_open_orders():
+    fills = []
+    tracker = OrderTracker(on_fill=fills.append)
+    tracker.track(order("a"))
+    tracker.track(order("b", symbol="ETH/USD"))
+    fetch = Mock(side_effect=lambda coid: order(coid, status="filled", qty="1", price="10") if coid == "a" else None)
+
+    tracker.poll(fetch)
+
+    assert [f["client_order_id"] for f in fills] == ["a"]
+    assert [e["client_order_id"] for e in tracker.open_orders()] == ["b"]
+
+
+def make_strategy(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "get_buying_power", lambda: 1000.0)
+    return tl.MeanReversion(["BTC/USD"], {}, 1.08, "2025-01-01")
+
+
+def test_failed_buy_leaves_no_entry(monkeypatch):
+    strategy = make_strategy(monkeypatch)
+    with patch("trading_logic.buy", return_value=None):
+        strategy.handle_buy_check("BTC/USD", 100.0)
+        strategy.order_queue.join()
+    assert strategy.purchase_info == {}
+
+
+def test_entry_comes_from_fill_and_open_order_blocks_rebuy(monkeypatch):
+    strategy = make_strategy(monkeypatch)
+    with patch("trading_logic.buy", return_value=order("a")) as mock_buy:
+        strategy.handle_buy_check("BTC/USD", 100.0)
+        strategy.order_queue.join()
+        strategy.handle_buy_check("BTC/USD", 100.0)
+        strategy.order_queue.join()
+    assert mock_buy.call_count == 1
+    assert strategy.purchase_info == {}
+
+    strategy.orders.handle_event({"event": "fill", "order": order("a", status="filled", qty="1", price="100.7")})
+    assert strategy.purchase_info["BTC/USD"]["entry_price"] == 100.7
+    assert strategy.purchase_info["BTC/USD"]["purchase_time"].tzinfo == strategy.tz
+
+
+def test_entry_is_read_once_while_a_sell_removes_it(monkeypatch):
+    class SoldMidRead(dict):
+        # `symbol in purchase_info` still saw the entry; the sell's pop won the race
+        def __contains__(self, key):
+            return True
+
+    strategy = make_strategy(monkeypatch)
+    strategy.purchase_info = SoldMidRead()
+    assert strategy.can_buy("BTC/USD")
+    _, _, _, entry_prices, entry_times = strategy.signal_inputs(["BTC/USD"], {"BTC/USD": 100.0}, {})
+    assert np.isnan(entry_prices[0]) and np.isnan(entry_times[0])
+
+
+def test_rejected_sell_keeps_position(monkeypatch):
+    strategy = make_strategy(monkeypatch)
+    entry = {"entry_price": 100.0, "purchase_time": tl.datetime.datetime.now(tz=strategy.tz)}
+    strategy.purchase_info["BTC/USD"] = entry
+    with patch("trading_logic.sell", return_value=order("s", side="sell")):
+        strategy.handle_sell("BTC/USD", 90.0)
+        strategy.order_queue.join()
+    assert "BTC/USD" not in strategy.purchase_info
+
+    strategy.orders.handle_event({"event": "rejected", "order": order("s", side="sell", status="rejected")})
+    assert strategy.purchase_info["BTC/USD"] is entry
+
+
+def test_trade_updates_stream_feeds_tracker():
+    fills = []
+    tracker = OrderTracker(on_fill=fills.append)
+    tracker.track(order("a"))
+
+    async def scenario():
+        msgs = [
+            {"event": "new", "order": order("a", status="new")},
+            {"event": "fill", "order": order("a", status="filled", qty="1", price="64000")},
+        ]
+        async with FakeTradeUpdates(msgs) as server:
+            stream = TradeUpdatesStream(server.url, "key", "secret", tracker)
+            task = asyncio.create_task(stream.run())
+            for _ in range(500):
+                if fills:
+                    break
+                await asyncio.sleep(0.01)
+            assert tracker.live
+            stream.stop()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return server
+
+    server = asyncio.run(scenario())
+    assert server.subscriptions == [{"action": "listen", "data": {"streams": ["trade_updates"]}}]
+    assert fills[0]["filled_avg_price"] == 64000.0
+    assert not tracker.live
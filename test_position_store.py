@@ -0,0 +1,80 @@
+import datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import trading_logic as tl
+from position_store import PositionStore
+
+TZ = ZoneInfo("America/Los_Angeles")
+
+
+def test_buys_and_sells_survive_reopen(tmp_path):
+    path = tmp_path / "positions.db"
+    store = PositionStore(str(path))
+    bought = datetime.datetime(2025, 9, 1, 9, 30, tzinfo=TZ)
+    store.record_buy("BTC/USD", 100.0, bought)
+    store.record_buy("AAPL", 200.0, bought)
+    store.record_sell("AAPL", 210.0, bought + datetime.timedelta(days=1))
+    store.close()
+
+    reopened = PositionStore(str(path))
+    info = reopened.purchase_info()
+    assert info == {"BTC/USD": {"entry_price": 100.0, "purchase_time": bought}}
+    # still usable with the strategy's aware datetimes
+    assert (datetime.datetime.now(tz=TZ) - info["BTC/USD"]["purchase_time"]).total_seconds() > 0
+    assert [t["side"] for t in reopened.trades("AAPL")] == ["buy", "sell"]
+
+
+def test_rebuy_replaces_entry(tmp_path):
+    store = PositionStore(str(tmp_path / "positions.db"))
+    first = datetime.datetime(2025, 9, 1, tzinfo=TZ)
+    store.record_buy("ETH/USD", 10.0, first)
+    store.record_buy("ETH/USD", 12.0, first + datetime.timedelta(hours=2))
+    assert store.purchase_info()["ETH/USD"]["entry_price"] == 12.0
+    assert len(store.trades()) == 2
+
+
+def test_writes_are_cheap(tmp_path):
+    # WAL without a sync per commit, and each record is a single transaction
+    path = str(tmp_path / "positions.db")
+    store = PositionStore(path)
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert store.conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    statements = []
+    store.conn.set_trace_callback(statements.append)
+    now = datetime.datetime.now(tz=TZ)
+    for i in range(20):
+        store.record_buy(f"S{i}", 1.0, now)
+    assert statements.count("BEGIN") == statements.count("COMMIT") == 20
+    assert len(statements) == 20 * 4  # BEGIN, two inserts, COMMIT
+
+    store.conn.set_trace_callback(None)
+    assert len(PositionStore(path).purchase_info()) == 20
+
+
+def test_strategy_records_buys_and_sells(tmp_path, monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "get_buying_power", lambda: 1000.0)
+    store = PositionStore(str(tmp_path / "positions.db"))
+    strategy = tl.MeanReversion(["BTC/USD"], {}, 1.08, "2025-01-01", store)
+
+    def order(side, status, price=None):
+        return {
+            "client_order_id": f"c-{side}", "symbol": "BTC/USD", "side": side, "status": status,
+            "filled_qty": "1" if price else "0", "filled_avg_price": price,
+            "filled_at": "2025-09-04T00:00:00Z" if price else None,
+        }
+
+    with patch("trading_logic.buy", return_value=order("buy", "accepted")), \
+            patch("trading_logic.sell", return_value=order("sell", "accepted")):
+        strategy.handle_buy_check("BTC/USD", 100.0)
+        strategy.order_queue.join()
+        strategy.orders.handle_event({"event": "fill", "order": order("buy", "filled", "100.5")})
+        assert store.purchase_info()["BTC/USD"]["entry_price"] == 100.5
+        strategy.handle_sell("BTC/USD", 110.0)
+        strategy.order_queue.join()
+        strategy.orders.handle_event({"event": "fill", "order": order("sell", "filled", "110.2")})
+
+    assert store.purchase_info() == {}
+    assert [(t["side"], t["price"]) for t in store.trades()] == [("buy", 100.5), ("sell", 110.2)]
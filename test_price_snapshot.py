@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+import account_stuff as acct
+from price_snapshot import PriceSnapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_prices_expire_after_max_age():
+    clock = FakeClock()
+    snapshot = PriceSnapshot({"BTC/USD": 64000.0, "ETH/USD": None}, max_age=30, clock=clock)
+    assert snapshot.get("BTC/USD") == 64000.0
+    assert snapshot.get("ETH/USD") is None
+    clock.now = 30.5
+    assert snapshot.get("BTC/USD") is None
+    assert "BTC/USD" not in snapshot
+
+
+def test_buy_uses_snapshot_price_without_fetching():
+    snapshot = PriceSnapshot({"BTC/USD": 60000.0})
+    with patch("account_stuff.get_buying_power", return_value=1000.0), \
+         patch("alpaca_api.AlpacaAPI.get_latest_trade") as fetch, \
+         patch("account_stuff.default_transport.post") as post:
+        post.return_value.status_code = 200
+        post.return_value.json.return_value = {"status": "accepted"}
+        result = acct.buy("BTC/USD", snapshot=snapshot)
+
+    fetch.assert_not_called()
+    assert post.call_args[1]["json"]["notional"] == 300.00
+    assert result["status"] == "accepted"
+
+
+def test_buy_refetches_when_snapshot_is_stale():
+    clock = FakeClock()
+    snapshot = PriceSnapshot({"BTC/USD": 60000.0}, max_age=5, clock=clock)
+    clock.now = 6
+    with patch("account_stuff.get_buying_power", return_value=1000.0), \
+         patch("alpaca_api.AlpacaAPI.get_latest_trade", return_value=61000.0) as fetch, \
+         patch("account_stuff.default_transport.post") as post:
+        post.return_value.status_code = 200
+        post.return_value.json.return_value = {"status": "accepted"}
+        acct.buy("BTC/USD", snapshot=snapshot)
+
+    fetch.assert_called_once_with("BTC/USD")
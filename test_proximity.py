@@ -0,0 +1,125 @@
+from unittest.mock import Mock
+
+import pytest
+
+import trading_logic as tl
+from proximity import PriorityPoller, threshold_distance
+
+PARAMS = {"z_score": 1.5, "mean_exit_z": 0.5, "hard_tp": 1.03, "panic_z": -2.8}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_distance_to_nearest_threshold():
+    nan = float("nan")
+    d = threshold_distance(
+        prices=[98.0, 90.0, 99.0, 100.0, 100.0],
+        means=[100.0] * 5,
+        stdevs=[4.0, 4.0, 4.0, 4.0, 0.0],
+        entry_prices=[nan, nan, 99.0, 97.0, nan],
+        params=PARAMS,
+    )
+    assert d[0] == 1.0  # z=-0.5, entry at -1.5
+    assert d[1] == 0.0  # z=-2.5, already past the entry
+    assert d[2] == pytest.approx(0.7425)  # held, z=-0.25: hard_tp at 101.97 is nearer than the mean exit
+    assert d[3] == 0.0  # held, price above entry * hard_tp
+    assert d[4] == 0.0  # no stdev: unknown, check soon
+
+
+def test_near_symbols_come_up_more_often_within_budget():
+    clock = FakeClock()
+    poller = PriorityPoller(min_interval=5, max_interval=120, requests_per_minute=12, clock=clock)
+    assert poller.interval(0.1) == 5
+    assert poller.interval(10) == 120
+    assert 5 < poller.interval(1.5) < 120
+
+    poller.observe(["NEAR/USD", "FAR/USD", "AAPL"], [0.1, 5.0, 0.2], now=0.0)
+    clock.now = 5.0
+    due = poller.due(5.0)
+    assert due == ["NEAR/USD", "AAPL"]  # nearest first, two requests
+    poller.observe(due, [0.1, 0.2], now=5.0)
+
+    requests = 0
+    for t in range(10, 70, 5):
+        clock.now = float(t)
+        got = poller.due(float(t))
+        requests += len({"/" in s for s in got})
+        poller.observe(got, [0.1] * len(got), now=float(t))
+    # both want a check every 5s (24 requests/minute), the budget allows 12
+    assert requests == 12
+    clock.now = 119.0
+    assert poller.due(119.0, ["FAR/USD"]) == []
+    clock.now = 121.0
+    assert poller.due(121.0, ["FAR/USD"]) == ["FAR/USD"]
+
+
+def test_priority_scan_only_fetches_due_symbols(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    strategy = tl.MeanReversion(["BTC/USD", "ETH/USD"], {}, 1.08, "2025-01-01")
+    strategy.poller.observe(["BTC/USD", "ETH/USD"], [0.0, 10.0], now=0.0)
+    strategy.api.get_latest_trades = Mock(return_value={"BTC/USD": 100.0})
+    strategy.evaluate_watchlist = Mock()
+
+    monkeypatch.setattr(tl.time, "monotonic", lambda: 10.0)
+    strategy.priority_scan()
+
+    strategy.api.get_latest_trades.assert_called_once_with(["BTC/USD"])
+    strategy.evaluate_watchlist.assert_called_once_with(["BTC/USD"], {"BTC/USD": 100.0})
+    assert strategy.snapshot.get("BTC/USD") == 100.0
+
+
+def test_quick_checks_and_scans_stay_within_the_data_quota(monkeypatch):
+    from rate_limiter import RateLimiter
+    from scheduler import Scheduler
+
+    monkeypatch.setattr(tl, "summary", {})
+    monkeypatch.setattr(tl, "is_market_open", lambda now=None: False)  # no calendar requests
+    clock = FakeClock()
+    monkeypatch.setattr(tl.time, "monotonic", clock)
+    limiter = RateLimiter(clock=clock)
+    url = tl.AlpacaAPI.DATA_BASE
+    strategy = tl.MeanReversion(["BTC/USD", "ETH/USD"], {}, 1.08, "2025-01-01")
+    strategy.poller = PriorityPoller(
+        tl.PRIORITY_MIN_INTERVAL, tl.PRIORITY_MAX_INTERVAL,
+        requests_per_minute=limiter.buckets["data"].capacity * tl.PRIORITY_QUOTA_SHARE,
+        clock=clock, headroom=lambda: limiter.headroom(url),
+    )
+    # worst case: every symbol sits on a threshold and stays due
+    strategy.poller.observe(["BTC/USD", "ETH/USD"], [0.0, 0.0], now=0.0)
+    strategy.evaluate_watchlist = Mock()
+    requests = []
+
+    def latest_trades(symbols):
+        limiter.acquire(url)
+        requests.append(clock.now)
+        return {}
+
+    def scan(strategy, symbols):
+        for _ in range(2):
+            limiter.acquire(url)
+            requests.append(clock.now)
+
+    strategy.api.get_latest_trades = latest_trades
+    monkeypatch.setattr(tl, "run_scan", scan)
+    scheduler = tl.build_scheduler(strategy, Scheduler(clock=clock))
+    for t in range(1, 601):
+        clock.now = float(t)
+        scheduler.run_pending()
+
+    assert len([t for t in requests if t > 540]) <= 200 * tl.PRIORITY_QUOTA_SHARE + 2
+    # near symbols got a check on every 5s tick, not just at the 120s scans
+    assert len(requests) >= 600 // tl.PRIORITY_TICK_SECONDS
+
+
+def test_no_quick_checks_without_headroom():
+    clock = FakeClock()
+    poller = PriorityPoller(requests_per_minute=60, clock=clock, headroom=lambda: 0.0)
+    poller.observe(["BTC/USD"], [0.0], now=0.0)
+    clock.now = 10.0
+    assert poller.due(10.0) == []
@@ -0,0 +1,65 @@
+from unittest.mock import Mock, patch
+
+from rate_limiter import RateLimiter, TokenBucket
+from transport import Transport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_bucket_paces_instead_of_failing():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+    waits = [bucket.acquire(sleep=clock.sleep) for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == waits[3] == 0.5
+    assert clock.now == 1001.0
+
+
+def test_orders_can_use_the_reserve():
+    clock = FakeClock()
+    limiter = RateLimiter(limits={"trading": 10}, reserve_fraction=0.2, clock=clock, sleep=clock.sleep)
+    for _ in range(8):
+        assert limiter.acquire("https://api.alpaca.markets/v2/account") == 0
+    # scan traffic now has to wait, an order doesn't
+    assert limiter.acquire("https://api.alpaca.markets/v2/orders", priority=True) == 0
+    assert limiter.acquire("https://api.alpaca.markets/v2/positions") > 0
+    # the data API has its own bucket
+    assert limiter.acquire("https://data.alpaca.markets/v2/stocks/bars") == 0
+
+
+def test_calibrates_from_headers_and_waits_for_reset():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, wall_clock=lambda: 5000.0, sleep=clock.sleep)
+    url = "https://data.alpaca.markets/v2/stocks/bars"
+    headers = {"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "5003"}
+    limiter.observe(url, Mock(status_code=200, headers=headers))
+
+    bucket = limiter.buckets["data"]
+    assert bucket.capacity == 1000
+    assert limiter.acquire(url) >= 3.0
+
+
+def test_transport_takes_a_token_per_attempt():
+    limiter = Mock()
+    t = Transport(max_retries=2, limiter=limiter)
+    fail = Mock(status_code=503, headers={})
+    ok = Mock(status_code=200, headers={})
+    with patch.object(t.session, "request", side_effect=[fail, ok, ok]), patch("transport.time.sleep"):
+        t.get("https://data.alpaca.markets/v2/stocks/bars")
+        t.post("https://api.alpaca.markets/v2/orders", json={})
+
+    assert [c.args for c in limiter.acquire.call_args_list] == [
+        ("https://data.alpaca.markets/v2/stocks/bars", False),
+        ("https://data.alpaca.markets/v2/stocks/bars", False),
+        ("https://api.alpaca.markets/v2/orders", True),
+    ]
+    assert limiter.observe.call_count == 3
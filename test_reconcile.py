@@ -0,0 +1,92 @@
+import datetime
+from unittest.mock import Mock, patch
+from zoneinfo import ZoneInfo
+
+import account_stuff as acct
+from position_store import PositionStore
+from reconcile import reconcile
+
+TZ = ZoneInfo("America/Los_Angeles")
+NOW = datetime.datetime(2025, 9, 10, 9, 0, tzinfo=TZ)
+WATCHLIST = ["BTC/USD", "ETH/USD", "AAPL", "MSFT"]
+
+POSITIONS = [
+    {"symbol": "BTCUSD", "qty": "0.1", "avg_entry_price": "60000"},
+    {"symbol": "AAPL", "qty": "2", "avg_entry_price": "200"},
+    {"symbol": "MSFT", "qty": "1", "avg_entry_price": "400"},
+]
+
+
+def fill(symbol, side, price, when):
+    return {"id": f"{symbol}-{when}", "symbol": symbol, "side": side, "price": str(price), "transaction_time": when}
+
+
+def test_rebuilds_held_symbols_from_fills_and_orders():
+    fills = [
+        fill("AAPL", "buy", 201, "2025-09-08T16:00:00Z"),
+        fill("BTC/USD", "buy", 61000, "2025-09-07T10:00:00Z"),
+        fill("BTC/USD", "buy", 59000, "2025-09-01T10:00:00Z"),
+        fill("ETH/USD", "sell", 3000, "2025-09-05T10:00:00Z"),
+    ]
+    orders = [{"symbol": "MSFT", "side": "buy", "filled_at": "2025-09-02T14:00:00Z", "filled_avg_price": "401"}]
+    purchase_info = {"ETH/USD": {"entry_price": 2900.0, "purchase_time": NOW}}  # sold while down
+
+    with patch("account_stuff.fetch_positions", return_value=POSITIONS), \
+            patch("account_stuff.fetch_fill_activities", return_value=fills) as mock_fills, \
+            patch("account_stuff.fetch_orders", return_value=orders) as mock_orders:
+        reconcile(WATCHLIST, purchase_info, TZ, now=NOW)
+
+    assert set(purchase_info) == {"BTC/USD", "AAPL", "MSFT"}
+    assert purchase_info["BTC/USD"]["entry_price"] == 60000.0
+    assert purchase_info["BTC/USD"]["purchase_time"] == datetime.datetime(2025, 9, 7, 10, tzinfo=datetime.timezone.utc)
+    assert purchase_info["MSFT"]["purchase_time"] == datetime.datetime(2025, 9, 2, 14, tzinfo=datetime.timezone.utc)
+    # orders are only asked for what the fills couldn't explain
+    assert mock_orders.call_args.kwargs["symbols"] == ["MSFT"]
+    assert mock_fills.call_count == 1
+
+
+def test_stored_entries_win_and_no_history_requests_when_all_known(tmp_path):
+    store = PositionStore(str(tmp_path / "positions.db"))
+    for symbol in ["BTC/USD", "AAPL", "MSFT", "ETH/USD"]:
+        store.record_buy(symbol, 1.0, NOW)
+    purchase_info = {}
+
+    with patch("account_stuff.fetch_positions", return_value=POSITIONS), \
+            patch("account_stuff.fetch_fill_activities") as mock_fills, \
+            patch("account_stuff.fetch_orders") as mock_orders:
+        reconcile(WATCHLIST, purchase_info, TZ, position_store=store, now=NOW)
+
+    mock_fills.assert_not_called()
+    mock_orders.assert_not_called()
+    assert set(purchase_info) == {"BTC/USD", "AAPL", "MSFT"}
+    assert purchase_info["AAPL"]["entry_price"] == 1.0
+    assert set(store.purchase_info()) == {"BTC/USD", "AAPL", "MSFT"}  # ETH dropped
+
+
+def test_unexplained_position_counts_as_bought_now(tmp_path):
+    store = PositionStore(str(tmp_path / "positions.db"))
+    purchase_info = {}
+    with patch("account_stuff.fetch_positions", return_value=POSITIONS[:1]), \
+            patch("account_stuff.fetch_fill_activities", return_value=[]), \
+            patch("account_stuff.fetch_orders", return_value=[]):
+        reconcile(WATCHLIST, purchase_info, TZ, position_store=store, now=NOW)
+
+    assert purchase_info["BTC/USD"]["purchase_time"] == NOW
+    assert store.purchase_info()["BTC/USD"]["entry_price"] == 60000.0
+    assert store.trades() == []  # rebuilt entries aren't logged as trades
+
+
+def test_fill_activities_stop_paging_once_satisfied():
+    page1 = [fill("AAPL", "buy", 1, "2025-09-08T16:00:00Z")] + [
+        fill("MSFT", "sell", 1, f"2025-09-08T15:{i:02d}:00Z") for i in range(1, 3)
+    ]
+    page2 = [fill("BTC/USD", "buy", 1, "2025-09-01T10:00:00Z")] * 3
+    responses = [Mock(status_code=200, json=Mock(return_value=p)) for p in (page1, page2)]
+
+    with patch("account_stuff.default_transport.get", side_effect=responses) as mock_get:
+        fills = acct.fetch_fill_activities(
+            "2025-08-01T00:00:00Z", stop=lambda so_far: any(f["symbol"] == "AAPL" for f in so_far), page_size=3
+        )
+
+    assert fills == page1
+    assert mock_get.call_count == 1
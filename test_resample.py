@@ -0,0 +1,110 @@
+from unittest.mock import Mock
+
+import numpy as np
+
+from bar_cache import BarCache
+from bar_store import BarStore, to_epoch, to_iso
+from resample import Resampler, bucket_starts, resample
+
+T0 = to_epoch("2025-09-02T13:30:00Z")
+
+
+def minutes(start, closes, volume=1.0):
+    return [
+        {"t": to_iso(start + 60 * i), "o": c - 0.5, "h": c + 1.0, "l": c - 1.0, "c": c, "v": volume}
+        for i, c in enumerate(closes)
+    ]
+
+
+def test_resample_matches_a_plain_loop():
+    rng = np.random.default_rng(3)
+    bars = minutes(T0, list(100 + rng.normal(0, 1, 200).cumsum()))
+    cols = [np.array([to_epoch(b["t"]) for b in bars])] + [np.array([b[k] for b in bars]) for k in "ohlcv"]
+    t, o, h, l, c, v = resample(*cols, 900)
+
+    groups = {}
+    for b in bars:
+        groups.setdefault(to_epoch(b["t"]) // 900 * 900, []).append(b)
+    assert list(t) == sorted(groups)
+    for i, key in enumerate(t):
+        g = groups[key]
+        assert o[i] == g[0]["o"] and c[i] == g[-1]["c"] and v[i] == len(g)
+        assert h[i] == max(b["h"] for b in g) and l[i] == min(b["l"] for b in g)
+
+
+def test_daily_buckets_start_at_eastern_midnight_across_dst():
+    from zoneinfo import ZoneInfo
+
+    tz = ZoneInfo("America/New_York")
+    summer = to_epoch("2025-09-02T13:30:00Z")
+    winter = to_epoch("2025-12-02T03:00:00Z")  # still Dec 1st in New York
+    starts = bucket_starts([summer, winter], 86400, tz)
+    assert [to_iso(s) for s in starts] == ["2025-09-02T04:00:00Z", "2025-12-01T05:00:00Z"]
+
+
+def test_incremental_updates_equal_one_pass():
+    closes = [100.0 + i % 7 for i in range(90)]
+    bars = minutes(T0, closes)
+
+    whole = Resampler(["5Min", "1Hour"]).add("AAPL", bars)
+    inc = Resampler(["5Min", "1Hour"])
+    merged = {}
+    for i in range(0, 90, 13):
+        for tf, out in inc.add("AAPL", bars[: i + 13]).items():  # overlapping batches are fine
+            for b in out:
+                merged.setdefault(tf, {})[b["t"]] = b
+    for tf in whole:
+        assert list(merged[tf].values()) == whole[tf]
+
+
+def test_forming_minute_waits_until_it_closes():
+    bars = minutes(T0, [100.0, 101.0, 102.0])
+    r = Resampler(["5Min"])
+    out = r.add("AAPL", bars, now=T0 + 150)  # third minute still open
+    assert out["5Min"][0]["c"] == 101.0 and out["5Min"][0]["v"] == 2.0
+    out = r.add("AAPL", bars, now=T0 + 180)
+    assert out["5Min"][0]["c"] == 102.0 and out["5Min"][0]["v"] == 3.0
+    assert r.cursor("AAPL") == to_iso(T0 + 180)
+
+
+def test_bar_cache_serves_every_timeframe_from_one_minute_download():
+    api = Mock()
+    native = {
+        "5Min": {"AAPL": [{"t": to_iso(T0 - 300), "c": 99.0}, {"t": to_iso(T0), "c": 0.0}]},
+        "1Hour": {"AAPL": [{"t": to_iso(T0 - 5400), "c": 98.0}, {"t": to_iso(T0 - 1800), "c": 0.0}]},
+    }
+    api.get_bars.side_effect = lambda symbols, lookback, timeframe, start=None: (
+        native[timeframe] if timeframe in native else {"AAPL": minutes(to_epoch(start), [100.0] * 39 + [101.0])}
+    )
+    cache = BarCache(api, lookback=5)
+    r = Resampler(["5Min", "1Hour"])
+
+    cache.refresh_resampled(["AAPL"], r, now=T0 + 600)
+    # the native forming bars were dropped and rebuilt from minutes since 13:00
+    assert api.get_bars.call_args_list[-1].kwargs["start"] == to_iso(T0 - 1800)
+    assert cache.closes("AAPL", "5Min") == [100.0, 100.0, 101.0]  # 13:25 from minutes too
+    assert cache.closes("AAPL", "1Hour") == [98.0, 101.0]
+
+    api.get_bars.reset_mock()
+    cache.refresh_resampled(["AAPL"], r, now=T0 + 600)
+    assert [c.kwargs["timeframe"] for c in api.get_bars.call_args_list] == ["1Min"]
+
+
+def test_cold_symbols_start_from_the_store(tmp_path):
+    day = 86400
+    store = BarStore(tmp_path)
+    midnight = to_epoch("2025-09-02T04:00:00Z")  # Eastern midnight
+    store.append("AAPL", "1Day", [{"t": to_iso(midnight - i * day), "c": 90.0 + i} for i in range(5, 0, -1)])
+    api = Mock()
+    api.get_bars.side_effect = lambda symbols, lookback, timeframe, start=None: {
+        "1Day": {"AAPL": [{"t": to_iso(midnight - day), "c": 91.0}, {"t": to_iso(midnight), "c": 0.0}]},
+        "5Min": {"AAPL": [{"t": to_iso(T0 - 300), "c": 99.0}, {"t": to_iso(T0), "c": 0.0}]},
+        "1Min": {"AAPL": minutes(T0, [100.0] * 5)},
+    }[timeframe]
+    cache = BarCache(api, lookback=5, store=store)
+
+    cache.refresh_resampled(["AAPL"], Resampler(["5Min", "1Day"]), now=T0 + 300)
+    calls = {c.kwargs["timeframe"]: c.kwargs for c in api.get_bars.call_args_list}
+    assert calls["5Min"]["lookback"] == 5  # nothing stored for it
+    assert calls["1Day"]["lookback"] is None and calls["1Day"]["start"] == to_iso(midnight - day)
+    assert cache.closes("AAPL", "1Day") == [94.0, 93.0, 92.0, 91.0, 100.0]
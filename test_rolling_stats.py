@@ -0,0 +1,63 @@
+import random
+import statistics
+
+import pytest
+
+from rolling_stats import RollingStats, mean_stdev
+
+
+def test_mean_stdev_matches_statistics_module():
+    closes = [150.2, 138.99, 151.0]
+    avg, sd = mean_stdev(closes)
+    assert avg == pytest.approx(sum(closes) / len(closes), rel=1e-12)
+    assert sd == pytest.approx(statistics.stdev(closes), rel=1e-12)
+
+
+def test_rolling_stats_tracks_window_like_a_full_recompute():
+    rng = random.Random(7)
+    window = 30
+    rolling = RollingStats(window)
+    closes = []
+    for _ in range(500):
+        x = 64000 + rng.gauss(0, 250)
+        closes.append(x)
+        rolling.push(x)
+        if len(closes) >= 2:
+            last = closes[-window:]
+            assert rolling.mean() == pytest.approx(statistics.fmean(last), rel=1e-12)
+            assert rolling.stdev() == pytest.approx(statistics.stdev(last), rel=1e-9)
+
+
+def test_replace_last_updates_forming_bar():
+    rolling = RollingStats(3, [100.0, 102.0, 101.0])
+    rolling.replace_last(104.0)
+    avg, sd = rolling.mean_stdev()
+    assert avg == pytest.approx(statistics.fmean([100.0, 102.0, 104.0]))
+    assert sd == pytest.approx(statistics.stdev([100.0, 102.0, 104.0]))
+
+
+def test_not_enough_values():
+    rolling = RollingStats(5)
+    assert rolling.mean_stdev() == (None, None)
+    rolling.push(1.0)
+    assert rolling.mean() == 1.0 and rolling.stdev() is None
+
+
+def test_rolling_mean_std_matches_rolling_stats():
+    from rolling_stats import rolling_mean_std
+    import numpy as np
+
+    rng = random.Random(11)
+    values = np.array([[100 + rng.gauss(0, 3), 5 + rng.gauss(0, 0.2)] for _ in range(300)])
+    values[150, 1] = np.nan
+    means, stds = rolling_mean_std(values, 20, chunk_rows=37)
+
+    assert np.isnan(means[18]).all() and np.isfinite(means[19]).all()
+    rolling = RollingStats(20)
+    for t in range(300):
+        rolling.push(values[t, 0])
+        if t >= 19:
+            assert means[t, 0] == pytest.approx(rolling.mean(), rel=1e-12)
+            assert stds[t, 0] == pytest.approx(rolling.stdev(), rel=1e-9)
+    # any window touching the NaN is NaN
+    assert np.isnan(means[150:170, 1]).all() and np.isfinite(means[170, 1])
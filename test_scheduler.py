@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import trading_logic as tl
+from scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_runs_on_wall_clock_deadlines_without_drift():
+    clock = FakeClock(1005.0)
+    starts = []
+
+    def scan():
+        starts.append(clock.now)
+        clock.now += 7  # each scan takes 7s
+
+    s = Scheduler(clock=clock)
+    job = s.add("scan", 60, scan)
+    assert job.next_run == 1020.0
+
+    for _ in range(3):
+        clock.now = job.next_run
+        s.run_pending()
+
+    assert starts == [1020.0, 1080.0, 1140.0]  # not 1020, 1087, 1154
+    assert job.metrics()["last_duration"] == 7
+    assert job.next_run == 1200.0
+
+
+def test_overruns_drop_ticks_instead_of_bunching():
+    clock = FakeClock(1000.0)
+    runs = []
+
+    def slow():
+        runs.append(clock.now)
+        clock.now += 130  # covers two more deadlines
+
+    s = Scheduler(clock=clock)
+    job = s.add("scan", 60, slow)
+    clock.now = 1020.0
+    s.run_pending()
+    assert job.next_run == 1200.0 and job.skipped == 2
+    assert s.run_pending() == 0  # nothing to catch up on
+
+    clock.now = 1250.0  # late: wakes up 50s after the 1200 deadline
+    s.run_pending()
+    assert job.last_lag == 50.0
+    assert job.max_lag == 50.0
+
+
+def test_inactive_ticks_and_errors_are_counted():
+    clock = FakeClock(0.0)
+    s = Scheduler(clock=clock)
+    open_ = {"value": False}
+    stocks = s.add("stocks", 10, lambda: None, active=lambda now: open_["value"])
+    broken = s.add("broken", 10, lambda: 1 / 0)
+
+    clock.now = 10.0
+    s.run_pending()
+    open_["value"] = True
+    clock.now = 20.0
+    s.run_pending()
+
+    assert stocks.runs == 1 and stocks.skipped == 1
+    assert broken.errors == 2 and broken.runs == 2
+    assert s.metrics()["broken"]["next_run"] == 30.0
+
+
+def test_a_raising_active_check_skips_the_tick_and_keeps_the_loop():
+    clock = FakeClock(0.0)
+    s = Scheduler(clock=clock)
+    ran = []
+    stocks = s.add("stocks", 10, lambda: ran.append("stocks"), active=lambda now: 1 / 0)
+    crypto = s.add("crypto", 10, lambda: ran.append("crypto"))
+
+    clock.now = 10.0
+    s.run_pending()
+
+    assert ran == ["crypto"] and crypto.runs == 1
+    assert stocks.runs == 0 and stocks.skipped == 1 and stocks.errors == 1
+    assert stocks.next_run == 20.0
+
+
+def test_build_scheduler_splits_crypto_and_stocks(monkeypatch):
+    monkeypatch.setattr(tl, "summary", {})
+    strategy = tl.MeanReversion(["BTC/USD", "AAPL", "ETH/USD"], {}, 1.08, "2025-01-01")
+    clock = FakeClock(0.0)
+    scheduler = tl.build_scheduler(strategy, Scheduler(clock=clock))
+    assert {j.name for j in scheduler.jobs} == {"crypto", "stocks", "priority", "summary", "metrics"}
+
+    clock.now = 3600.0
+    with patch("trading_logic.run_scan") as run_scan, \
+            patch("trading_logic.is_market_open", return_value=False), \
+            patch.object(strategy, "generate_summary"):
+        scheduler.run_pending()
+
+    assert [c.args[1] for c in run_scan.call_args_list] == [["BTC/USD", "ETH/USD"]]
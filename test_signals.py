@@ -0,0 +1,66 @@
+import math
+import random
+
+import numpy as np
+
+from signals import evaluate, SKIP, HOLD, BUY, SELL
+
+PARAMS = {
+    "z_score": 2.0,
+    "mean_exit_z": 0.5,
+    "hard_tp": 1.03,
+    "panic_z": -2.8,
+    "max_hold_days": 5,
+    "lookback": 30,
+    "min_seconds_between_purchases": 259200,
+}
+
+
+def reference(price, mean, sd, entry_price, entry_time, now):
+    # the original per-symbol branches from MeanReversion.buy_or_sell
+    if price is None or mean is None or sd is None or sd == 0:
+        return SKIP
+    if entry_price is not None:
+        z = (price - mean) / sd
+        days = math.floor((now - entry_time) / 86400)
+        if z >= PARAMS["mean_exit_z"] or price >= entry_price * PARAMS["hard_tp"] \
+                or days >= PARAMS["max_hold_days"] or z <= PARAMS["panic_z"]:
+            return SELL
+        return HOLD
+    if price < mean - sd * PARAMS["z_score"]:
+        return BUY
+    return HOLD
+
+
+def test_matches_per_symbol_rules():
+    rng = random.Random(3)
+    now = 1_760_000_000.0
+    rows = []
+    for _ in range(2000):
+        mean = rng.uniform(50, 150)
+        sd = rng.choice([0.0, rng.uniform(0.5, 10)])
+        price = rng.choice([None, mean + rng.uniform(-4, 2) * (sd or 1)])
+        held = rng.random() < 0.5
+        entry_price = mean * rng.uniform(0.9, 1.05) if held else None
+        entry_time = now - rng.uniform(0, 8 * 86400) if held else None
+        rows.append((price, mean, sd, entry_price, entry_time))
+
+    nan = lambda v: np.nan if v is None else v
+    actions, _ = evaluate(
+        [nan(r[0]) for r in rows],
+        [r[1] for r in rows],
+        [r[2] for r in rows],
+        [nan(r[3]) for r in rows],
+        [nan(r[4]) for r in rows],
+        now,
+        PARAMS,
+    )
+    expected = [reference(*r, now) for r in rows]
+    assert actions.tolist() == expected
+    assert {SKIP, HOLD, BUY, SELL} <= set(expected)
+
+
+def test_z_scores_are_returned():
+    actions, z = evaluate([80.0, 100.0], [100.0, 100.0], [10.0, 10.0], [np.nan, np.nan], [np.nan, np.nan], 0, PARAMS)
+    assert actions.tolist() == [HOLD, HOLD]
+    assert z.tolist() == [-2.0, 0.0]
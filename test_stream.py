@@ -0,0 +1,125 @@
+import asyncio
+from unittest.mock import Mock
+
+from fake_stream_server import FakeAlpacaStream
+from stream import MarketStream, StreamingRunner, parse_time
+
+
+def trade(symbol, price, minute):
+    return {"T": "t", "S": symbol, "p": price, "t": f"2025-09-19T19:{minute:02d}:00.123456789Z"}
+
+
+def bar(symbol, close, minute):
+    return {"T": "b", "S": symbol, "o": close, "h": close, "l": close, "c": close, "v": 1.0, "t": f"2025-09-19T19:{minute:02d}:00Z"}
+
+
+async def run_until(stream, condition, timeout=5):
+    task = asyncio.create_task(stream.run())
+    try:
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        stream.stop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def test_stream_tracks_prices_and_reports_bar_gaps():
+    trades = []
+    gaps = []
+
+    async def scenario():
+        msgs = [
+            trade("BTC/USD", 64000.0, 30),
+            bar("BTC/USD", 64010.0, 30),
+            bar("BTC/USD", 64020.0, 33),  # two minute bars missing
+            trade("BTC/USD", 64100.0, 33),
+        ]
+        async with FakeAlpacaStream(msgs) as server:
+            stream = MarketStream(
+                server.url, ["BTC/USD"], "key", "secret",
+                on_trade=lambda s, p: trades.append((s, p)),
+                on_gap=lambda s, last, t: gaps.append(s),
+            )
+            await run_until(stream, lambda: len(trades) == 2)
+            assert server.subscriptions[0]["trades"] == ["BTC/USD"]
+            return stream
+
+    stream = asyncio.run(scenario())
+    assert trades == [("BTC/USD", 64000.0), ("BTC/USD", 64100.0)]
+    assert gaps == [["BTC/USD"]]
+    assert stream.last_prices["BTC/USD"] == 64100.0
+
+
+def test_stream_reconnects_and_resubscribes():
+    trades = []
+    gaps = []
+
+    async def scenario():
+        msgs = [trade("ETH/USD", 3000.0, 30), trade("ETH/USD", 3010.0, 31)]
+        async with FakeAlpacaStream(msgs, drop_after=1) as server:
+            stream = MarketStream(
+                server.url, ["ETH/USD"], "key", "secret",
+                on_trade=lambda s, p: trades.append(p),
+                on_gap=lambda s, last, t: gaps.append(s),
+                reconnect_delay=0.01,
+            )
+            await run_until(stream, lambda: len(trades) >= 3)
+            return server, stream
+
+    server, stream = asyncio.run(scenario())
+    assert server.connections == 2
+    assert len(server.subscriptions) == 2
+    assert stream.connects == 2
+    # a reconnect is reported as a gap for the stream's symbols
+    assert gaps == [["ETH/USD"]]
+    assert trades[:3] == [3000.0, 3000.0, 3010.0]
+
+
+def test_closed_market_is_quiet_not_stale():
+    gaps = []
+    open_ = {"value": False}
+
+    async def scenario():
+        msgs = [bar("AAPL", 230.0, 30), bar("AAPL", 231.0, 35)]
+        async with FakeAlpacaStream(msgs) as server:
+            stream = MarketStream(
+                server.url, ["AAPL"], "key", "secret",
+                on_gap=lambda s, last, t: gaps.append(s),
+                is_live=lambda t: open_["value"], stale_after=0.02, reconnect_delay=0.01,
+            )
+            await run_until(stream, lambda: False, timeout=0.2)
+            return server, stream
+
+    server, stream = asyncio.run(scenario())
+    assert server.connections == 1  # silence didn't count as a dead socket
+    assert gaps == []  # nor the missing bars, with the market shut
+
+    open_["value"] = True
+    asyncio.run(stream.handle_message(bar("AAPL", 232.0, 40)))
+    assert gaps == [["AAPL"]]
+    assert stream.last_bar_time["AAPL"] == parse_time("2025-09-19T19:40:00Z")
+
+
+def test_trades_are_evaluated_at_most_once_per_interval():
+    clock = {"now": 0.0}
+    strategy = Mock(watchlist=["BTC/USD", "AAPL"])
+    strategy.bars.stats.return_value = (100.0, 2.0)
+    market_open = Mock(return_value=True)
+    runner = StreamingRunner(strategy, "key", "secret", market_open=market_open, clock=lambda: clock["now"])
+    assert [s.is_live for s in runner.streams] == [None, market_open]
+
+    async def trades():
+        for now, symbol, price in [(0.0, "BTC/USD", 1.0), (0.3, "BTC/USD", 2.0), (0.5, "AAPL", 3.0), (1.2, "BTC/USD", 4.0)]:
+            clock["now"] = now
+            await runner.on_trade(symbol, price)
+
+    asyncio.run(trades())
+    evaluated = [c.args[:2] for c in strategy.evaluate_symbol.call_args_list]
+    assert evaluated == [("BTC/USD", 1.0), ("AAPL", 3.0), ("BTC/USD", 4.0)]
+    assert strategy.snapshot.update.call_count == 4  # prices are still tracked
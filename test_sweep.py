@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+from backtest import run_backtest
+from sweep import param_grid, random_search, run_sweep, parse_space, point_key
+
+BASE = {
+    "z_score": 1.5,
+    "mean_exit_z": 0.5,
+    "hard_tp": 1.03,
+    "panic_z": -2.8,
+    "max_hold_days": 5,
+    "lookback": 20,
+    "min_seconds_between_purchases": 259200,
+}
+
+
+def data(rows=1500, cols=4, seed=2):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(rows, cols)), axis=0))
+    times = 1_700_000_000 + np.arange(rows) * 3600.0
+    return closes, times, [f"S{i}" for i in range(cols)]
+
+
+def test_grid_and_random_points():
+    grid = param_grid({"z_score": [1.5, 2.0], "lookback": [10, 20, 30]})
+    assert len(grid) == 6
+    assert {"z_score": 2.0, "lookback": 30} in grid
+
+    points = random_search({"z_score": (1.0, 3.0), "lookback": (10, 60), "hard_tp": [1.02, 1.05]}, 25, seed=1)
+    assert len(points) == 25
+    assert all(10 <= p["lookback"] <= 60 and isinstance(p["lookback"], int) for p in points)
+    assert all(p["hard_tp"] in (1.02, 1.05) for p in points)
+
+    assert parse_space(["z_score=1.5,2", "lookback=10:60"]) == {"z_score": [1.5, 2], "lookback": (10, 60)}
+
+
+def test_sweep_matches_single_backtests_and_resumes(tmp_path):
+    closes, times, symbols = data()
+    points = param_grid({"z_score": [1.5, 2.0], "mean_exit_z": [0.0, 0.5]})
+    out = tmp_path / "results.jsonl"
+
+    results = run_sweep(closes, times, symbols, points[:3], BASE, str(out), processes=2, metric="total_return")
+    assert len(results) == 3
+    returns = [r["summary"]["total_return"] for r in results]
+    assert returns == sorted(returns, reverse=True)
+
+    for r in results:
+        expected = run_backtest(closes, times, symbols, dict(BASE, **r["params"]))["summary"]
+        assert r["summary"] == expected
+
+    # second run only computes the point that's missing from the file
+    results = run_sweep(closes, times, symbols, points, BASE, str(out), processes=2)
+    header, *lines = [json.loads(l) for l in out.read_text().splitlines()]
+    assert set(header) == {"sweep"}
+    assert len(lines) == 4 and len(results) == 4
+    assert {point_key(l["params"]) for l in lines} == {point_key(p) for p in points}
+
+
+def test_resume_refuses_results_from_a_different_sweep(tmp_path):
+    closes, times, symbols = data(rows=300)
+    points = param_grid({"z_score": [1.5, 2.0]})
+    out = str(tmp_path / "results.jsonl")
+    run_sweep(closes, times, symbols, points[:1], BASE, out, processes=1)
+
+    with pytest.raises(ValueError, match="results.jsonl"):
+        run_sweep(closes, times, symbols, points, dict(BASE, lookback=30), out, processes=1)
+    with pytest.raises(ValueError):
+        run_sweep(closes[:-1], times[:-1], symbols, points, BASE, out, processes=1)
+    assert len(run_sweep(closes, times, symbols, points, BASE, out, processes=1)) == 2
+
+
+def test_sweep_without_a_results_file(tmp_path):
+    closes, times, symbols = data(rows=300)
+    results = run_sweep(closes, times, symbols, param_grid({"z_score": [1.5, 2.0]}), BASE, None, processes=1)
+    assert len(results) == 2
@@ -0,0 +1,54 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from transport import Transport
+
+
+def response(status):
+    r = Mock()
+    r.status_code = status
+    r.headers = {}
+    return r
+
+
+def test_get_retries_on_5xx_and_uses_data_timeouts():
+    t = Transport(max_retries=3)
+    with patch.object(t.session, "request", side_effect=[response(503), response(429), response(200)]) as req, \
+         patch("transport.time.sleep") as sleep:
+        r = t.get("https://data.alpaca.markets/v2/stocks/bars", headers={})
+
+        assert r.status_code == 200
+        assert req.call_count == 3
+        assert sleep.call_count == 2
+        assert req.call_args[1]["timeout"] == t.timeouts["data"]
+
+
+def test_post_is_never_retried():
+    t = Transport(max_retries=3)
+    with patch.object(t.session, "request", return_value=response(503)) as req, \
+         patch("transport.time.sleep") as sleep:
+        r = t.post("https://api.alpaca.markets/v2/orders", json={})
+
+        assert r.status_code == 503
+        assert req.call_count == 1
+        sleep.assert_not_called()
+        assert req.call_args[1]["timeout"] == t.timeouts["orders"]
+
+
+def test_connection_errors_raise_after_last_retry():
+    t = Transport(max_retries=2)
+    with patch.object(t.session, "request", side_effect=requests.ConnectionError("boom")) as req, \
+         patch("transport.time.sleep"):
+        with pytest.raises(requests.ConnectionError):
+            t.get("https://api.alpaca.markets/v2/account")
+        assert req.call_count == 3
+
+
+def test_retry_after_header_is_respected():
+    t = Transport()
+    r = response(429)
+    r.headers = {"Retry-After": "2"}
+    assert t.delay(0, r) == 2.0
+    assert 0 <= t.delay(10) <= t.max_backoff
@@ -0,0 +1,70 @@
+import numpy as np
+
+from walk_forward import ResultCache, make_windows, walk_forward
+
+BASE = {
+    "z_score": 1.5,
+    "mean_exit_z": 0.5,
+    "hard_tp": 1.03,
+    "panic_z": -2.8,
+    "max_hold_days": 5,
+    "lookback": 20,
+    "min_seconds_between_purchases": 259200,
+}
+
+
+def data(days=120, cols=3, seed=4):
+    rng = np.random.default_rng(seed)
+    rows = days * 24
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(rows, cols)), axis=0))
+    times = 1_700_000_000 + np.arange(rows) * 3600.0
+    return closes, times, [f"S{i}" for i in range(cols)]
+
+
+def test_windows_roll_forward_without_overlap():
+    _, times, _ = data()
+    windows = make_windows(times, train_days=30, test_days=10)
+    assert len(windows) == 9
+    for (a, b, c, d), (e, f, g, h) in zip(windows, windows[1:]):
+        assert b == c and g == d  # test follows train, next test follows this one
+        assert f - e == b - a
+
+
+def test_reruns_only_compute_new_cells(tmp_path):
+    closes, times, symbols = data()
+    windows = make_windows(times, train_days=30, test_days=10)
+    points = [{"z_score": 1.5}, {"z_score": 2.0}]
+
+    cache = ResultCache(str(tmp_path))
+    first = walk_forward(closes, times, symbols, points, BASE, windows[:-1], cache)
+    assert cache.hits == 0
+    computed = cache.misses
+    assert computed >= len(windows[:-1]) * len(points)
+
+    cache = ResultCache(str(tmp_path))
+    second = walk_forward(closes, times, symbols, points, BASE, windows[:-1], cache)
+    assert cache.misses == 0
+    np.testing.assert_allclose(second["equity"], first["equity"])
+
+    # one more window and one more parameter point: only those cells are new
+    cache = ResultCache(str(tmp_path))
+    third = walk_forward(closes, times, symbols, points + [{"z_score": 2.5}], BASE, windows, cache)
+    # new point on every train window + old points on the new train window
+    # + at most one test cell per window (only if the chosen point changed)
+    assert 0 < cache.misses <= len(windows) + len(points) + len(windows)
+    assert cache.misses < len(windows) * (len(points) + 2)  # a cold run would do this many
+    assert len(third["windows"]) == len(windows)
+    assert len(third["equity"]) == windows[-1][3] - windows[0][2]
+    assert third["summary"]["initial_cash"] == 10000.0
+
+
+def test_summary_counts_the_out_of_sample_trades(tmp_path):
+    closes, times, symbols = data()
+    windows = make_windows(times, train_days=30, test_days=10)
+    result = walk_forward(closes, times, symbols, [{"z_score": 1.5}, {"z_score": 2.0}], BASE, windows, ResultCache(str(tmp_path)))
+
+    per_window = [w["test_summary"] for w in result["windows"]]
+    assert result["summary"]["trades"] == sum(s["trades"] for s in per_window) > 0
+    assert result["summary"]["closed_trades"] == sum(s["closed_trades"] for s in per_window)
+    assert len(result["trades"]) == result["summary"]["trades"]
+    assert all(windows[0][2] <= np.searchsorted(times, t["entry_time"]) < windows[-1][3] for t in result["trades"])
@@ -6,9 +6,28 @@ from spot import *
 from config import *
 from account_stuff import *
 from alpaca_api import AlpacaAPI
+from async_alpaca_api import AsyncAlpacaAPI
+from bar_cache import BarCache
+from bar_store import BarStore
+from indicators import Indicators
+from resample import Resampler
+from position_store import PositionStore
+from reconcile import reconcile
+from order_tracker import OrderTracker
+from order_queue import OrderQueue
+from allocation import allocate
+from scheduler import Scheduler
+from transport import default_transport
+from proximity import PriorityPoller, threshold_distance
+from stream import TradeUpdatesStream
+from price_snapshot import PriceSnapshot
+from signals import evaluate, SKIP, HOLD, BUY, SELL
 from mail import *
 
 # from twit import *
+import asyncio
+import numpy as np
+import threading
 import time
 import datetime
 from zoneinfo import ZoneInfo
@@ -16,6 +35,9 @@ import logging
 
 from twit import tweet
 
+# summary is written from the order queue's worker and read by the daily summary
+summary_lock = threading.Lock()
+
 
 class TradingStrategy:
 
@@ -25,12 +47,23 @@ class TradingStrategy:
         purchase_info,
         target_gain,
         start_date,
+        position_store=None,
     ):
         self.watchlist = watchlist
         self.purchase_info = purchase_info
+        self.position_store = position_store  # durable copy of purchase_info, if any
         self.target_gain = target_gain
         self.start_date = start_date
         self.api = AlpacaAPI(headers)
+        self.async_api = AsyncAlpacaAPI(headers, concurrency=SCAN_CONCURRENCY)
+        if RESAMPLE_TIMEFRAMES and STRATEGY_TIMEFRAME not in RESAMPLE_TIMEFRAMES:
+            # the resampler would fill every timeframe but the one the rules read
+            raise ValueError(f"STRATEGY_TIMEFRAME {STRATEGY_TIMEFRAME} is not in RESAMPLE_TIMEFRAMES {RESAMPLE_TIMEFRAMES}")
+        self.bars = BarCache(
+            self.api, lookback=LOOKBACK, timeframe=STRATEGY_TIMEFRAME, store=BarStore(BAR_STORE_PATH), indicators=Indicators()
+        )
+        self.resampler = Resampler(RESAMPLE_TIMEFRAMES) if RESAMPLE_TIMEFRAMES else None
+        self.snapshot = PriceSnapshot(max_age=PRICE_MAX_AGE)
         self.tz = ZoneInfo("America/Los_Angeles")
 
     def should_buy(self):
@@ -47,14 +80,27 @@ class MeanReversion(TradingStrategy):
         purchase_info,
         target_gain,
         start_date,
+        position_store=None,
     ):
         super().__init__(
             watchlist,
             purchase_info,
             target_gain,
             start_date,
+            position_store,
         )
         self.headers = headers
+        # purchase_info is only written from real fills, reported here
+        self.orders = OrderTracker(on_fill=self.on_order_filled, on_done=self.on_order_done)
+        self.poller = PriorityPoller(
+            min_interval=PRIORITY_MIN_INTERVAL,
+            max_interval=PRIORITY_MAX_INTERVAL,
+            # scans keep their cadence; the quick checks live off the quota they leave
+            requests_per_minute=default_transport.limiter.buckets["data"].capacity * PRIORITY_QUOTA_SHARE,
+            headroom=lambda: default_transport.limiter.headroom(AlpacaAPI.DATA_BASE),
+        )
+        # buy()/sell() run on the queue's worker so a slow order never holds up the scan
+        self.order_queue = OrderQueue(self.execute_intent, on_result=self.on_order_result).start()
 
     def handle_already_purchased(self, symbol, latest_trade):
         if symbol in self.purchase_info:
@@ -63,96 +109,262 @@ class MeanReversion(TradingStrategy):
         else:
             print(f"Price is not far enough from the mean to buy {symbol}")
 
-    def handle_buy_check(self, symbol, latest_trade):
+    def can_buy(self, symbol):
+        if self.orders.pending(symbol) or self.order_queue.busy(symbol):
+            logging.info(f"Buy of {symbol} skipped, an order for it is still open")
+            return False
+        # one read: a fill or a sell on another thread can change purchase_info
+        entry = self.purchase_info.get(symbol)
         if (
-            symbol not in self.purchase_info
+            entry is None
             or (
                 datetime.datetime.now(tz=self.tz)
-                - self.purchase_info[symbol]["purchase_time"]
+                - entry["purchase_time"]
             ).total_seconds()
             > min_seconds_between_purchases
         ):
-            buy(symbol)
-            logging.info(f"{symbol} purchased at {latest_trade}")
-            now = datetime.datetime.now(tz=self.tz)
-            self.purchase_info[symbol] = {
-                "entry_price": latest_trade,
-                "purchase_time": now,
-            }
-            summary[symbol] = {
-                "latest_trade": latest_trade,
-                "purchase_time": now,
-                "order_type": "buy",
-            }
-        else:
-            logging.info(
-                f"Buy order of {symbol} was attempted, but not enough time has passed since the last purchase of {symbol}"
+            return True
+        logging.info(
+            f"Buy order of {symbol} was attempted, but not enough time has passed since the last purchase of {symbol}"
+        )
+        return False
+
+    def indicators_allow_buy(self, symbol):
+        # Entry filters on top of the z-score rule, read from the indicators
+        # the bar cache already keeps up to date
+        if BUY_MAX_RSI is None:
+            return True
+        rsi = self.bars.indicator(symbol, "rsi")
+        if rsi is None or rsi >= BUY_MAX_RSI:
+            logging.info(f"Buy signal for {symbol} filtered out, RSI {rsi} is not below {BUY_MAX_RSI}")
+            return False
+        return True
+
+    def handle_buy_check(self, symbol, latest_trade, z=0.0):
+        self.handle_buys([(symbol, z, latest_trade)])
+
+    def handle_buys(self, candidates):
+        # Every buy signal from one scan, as (symbol, z, latest_trade): one
+        # buying-power lookup, sized together by allocate(), deepest z first
+        candidates = [c for c in candidates if self.can_buy(c[0])]
+        if not candidates:
+            return
+        buying_power = get_buying_power()
+        if buying_power is None:
+            logging.error(f"Could not retrieve buying power for {len(candidates)} buys")
+            return
+        prices = {symbol: latest_trade for symbol, _, latest_trade in candidates}
+        sized = allocate(
+            buying_power, candidates, ALLOCATION_PER_SYMBOL, ALLOCATION_TOTAL, min_notional=MIN_ORDER_NOTIONAL
+        )
+        for symbol, notional in sized:
+            self.order_queue.submit(
+                "buy", symbol, latest_trade=prices[symbol], snapshot=self.snapshot, notional=notional
             )
+            logging.info(f"{symbol} buy of ${notional:.2f} queued at {prices[symbol]}")
+        if len(sized) < len(candidates):
+            logging.critical(f"Out of funds for {len(candidates) - len(sized)} of {len(candidates)} buys")
 
     def handle_sell_check(self, symbol, latest_trade, average, stdev):
-        entry_price = self.purchase_info[symbol]["entry_price"]
-        z = (latest_trade - average) / stdev
-        entry_time = self.purchase_info[symbol]["purchase_time"]
-        holding_period = datetime.datetime.now(tz=self.tz) - entry_time
-        holding_days = holding_period.days
-        if (
-            (z >= MEAN_EXIT_Z)
-            or (latest_trade >= entry_price * HARD_TP)
-            or (holding_days >= MAX_HOLD_DAYS)
-            or (z <= PANIC_Z)
-        ):
-            sell(symbol)
-            logging.info(f"{symbol} sell order completed")
-            exit_time = datetime.datetime.now(tz=self.tz)
-            del self.purchase_info[symbol]
-            summary[symbol] = {
-                "latest_trade": latest_trade,
-                "exit_time": exit_time,
-                "order_type": "sell",
-            }
+        actions, _ = self.evaluate_symbols(
+            [symbol], {symbol: latest_trade}, {symbol: (average, stdev)}
+        )
+        if actions[0] == SELL:
+            self.handle_sell(symbol, latest_trade)
+
+    def handle_sell(self, symbol, latest_trade):
+        if self.orders.pending(symbol, side="sell") or self.order_queue.busy(symbol):
+            logging.info(f"Sell of {symbol} skipped, an order for it is still open")
+            return
+        self.order_queue.submit("sell", symbol, latest_trade=latest_trade)
+        logging.info(f"{symbol} sell queued at {latest_trade}")
+
+    def execute_intent(self, intent):
+        # Runs on the order queue's worker thread
+        if intent["side"] == "buy":
+            return buy(
+                intent["symbol"], snapshot=intent["snapshot"],
+                client_order_id=intent["client_order_id"], notional=intent["notional"],
+            )
+        return sell(intent["symbol"])
+
+    def on_order_result(self, intent, order):
+        symbol = intent["symbol"]
+        if not order:
+            logging.error(f"{intent['side'].capitalize()} order for {symbol} was not placed")
+            return
+        now = datetime.datetime.now(tz=self.tz)
+        if intent["side"] == "buy":
+            logging.info(f"{symbol} buy order placed at {intent['latest_trade']}")
+            with summary_lock:
+                summary[symbol] = {
+                    "latest_trade": intent["latest_trade"],
+                    "purchase_time": now,
+                    "order_type": "buy",
+                }
+            self.orders.track(order)  # entry price/time come from the fill
+        else:
+            logging.info(f"{symbol} sell order placed")
+            entry = self.purchase_info.pop(symbol, None)
+            with summary_lock:
+                summary[symbol] = {
+                    "latest_trade": intent["latest_trade"],
+                    "exit_time": now,
+                    "order_type": "sell",
+                }
+            self.orders.track(order, entry=entry)  # put back if the sell never fills
+
+    def on_order_filled(self, order):
+        account_cache.invalidate()  # buying power and positions moved with the fill
+        symbol = order["symbol"]
+        filled_at = (order["filled_at"] or datetime.datetime.now(tz=self.tz)).astimezone(self.tz)
+        price = order["filled_avg_price"]
+        if order["side"] == "buy":
+            self.purchase_info[symbol] = {"entry_price": price, "purchase_time": filled_at}
+            if self.position_store:
+                self.position_store.record_buy(symbol, price, filled_at)
+        elif self.position_store:
+            self.position_store.record_sell(symbol, price, filled_at)
+
+    def on_order_done(self, order):
+        # Canceled/rejected/expired. A partly filled buy is still a position; a
+        # sell that didn't go all the way leaves us holding the symbol.
+        if order["side"] == "buy" and order["filled_qty"] > 0:
+            self.on_order_filled(order)
+        elif order["side"] == "sell" and order["meta"].get("entry"):
+            self.purchase_info[order["symbol"]] = order["meta"]["entry"]
+
+    def sync_orders(self):
+        # REST fallback for fills while the trade_updates stream isn't connected
+        if not self.orders.live and self.orders.open_orders():
+            self.orders.poll(fetch_order)
+
+    def evaluate_symbols(self, symbols, latest_trades, stats):
+        # Runs the vectorized rules in signals.evaluate, and reschedules the
+        # symbols' quick checks from how close they now are to a threshold
+        prices, means, stdevs, entry_prices, entry_times = self.signal_inputs(symbols, latest_trades, stats)
+        now = datetime.datetime.now(tz=self.tz).timestamp()
+        self.poller.observe(
+            symbols, threshold_distance(prices, means, stdevs, entry_prices, STRATEGY_PARAMS), time.monotonic()
+        )
+        return evaluate(prices, means, stdevs, entry_prices, entry_times, now, STRATEGY_PARAMS)
+
+    def signal_inputs(self, symbols, latest_trades, stats):
+        # Builds the arrays for the vectorized rules in signals.evaluate
+        n = len(symbols)
+        prices = np.full(n, np.nan)
+        means = np.full(n, np.nan)
+        stdevs = np.full(n, np.nan)
+        entry_prices = np.full(n, np.nan)
+        entry_times = np.full(n, np.nan)
+        for i, symbol in enumerate(symbols):
+            average, stdev = stats.get(symbol, (None, None))
+            prices[i] = np.nan if latest_trades.get(symbol) is None else latest_trades[symbol]
+            means[i] = np.nan if average is None else average
+            stdevs[i] = np.nan if stdev is None else stdev
+            entry = self.purchase_info.get(symbol)  # read once, see can_buy
+            if entry is not None:
+                entry_prices[i] = entry["entry_price"]
+                entry_times[i] = entry["purchase_time"].timestamp()
+        return prices, means, stdevs, entry_prices, entry_times
+
+    def apply_action(self, symbol, action, latest_trade, average=None, stdev=None):
+        if action == SKIP:  # If either the latest trade or the standard deviation is None, skip to the next symbol
+            logging.error(
+                f"Error getting current trade price, stdev, avg, or stdev is 0: Latest trade: {latest_trade}, stdev: {stdev}, avg: {average}"
+            )
+        elif action == SELL:
+            logging.debug(f"Sell rule hit for symbol: {symbol}")
+            self.handle_sell(symbol, latest_trade)
+        elif action == BUY:  # If the latest trade is less than the average minus Z_SCORE standard deviations, buy the stock
+            logging.debug(f"Should be looking into a buy order for symbol: {symbol}")
+            self.handle_buy_check(symbol, latest_trade)
+        else:  # If the latest trade is within the average plus or minus the standard deviation, hold the stock
+            logging.debug(f"No action being taken for symbol: {symbol}")
+            self.handle_already_purchased(symbol, latest_trade)
+
+    def evaluate_symbol(self, symbol, latest_trade, average, stdev):
+        actions, _ = self.evaluate_symbols(
+            [symbol], {symbol: latest_trade}, {symbol: (average, stdev)}
+        )
+        self.apply_action(symbol, actions[0], latest_trade, average, stdev)
+
+    def evaluate_watchlist(self, symbols, latest_trades):
+        # One vectorized pass over every symbol. Sells and holds are handled in
+        # watchlist order, then all buy signals are sized and queued as one batch.
+        stats = {symbol: self.bars.stats(symbol) for symbol in symbols}
+        actions, z = self.evaluate_symbols(symbols, latest_trades, stats)
+        buys = []
+        for symbol, action, zscore in zip(symbols, actions, z):
+            if action == BUY:
+                if self.indicators_allow_buy(symbol):
+                    buys.append((symbol, float(zscore), latest_trades.get(symbol)))
+                continue
+            average, stdev = stats[symbol]
+            self.apply_action(symbol, action, latest_trades.get(symbol), average, stdev)
+        self.handle_buys(buys)
 
     def buy_or_sell(
-        self,
+        self, symbols=None
     ):  # This function determines whether to buy or sell a stock based on the average and standard deviation of the closing prices
         i = 0
-        for symbol in self.watchlist:
-            logging.info(f"Getting price for {symbol}")
-            average, stdev = self.api.get_historical_data(
-                symbol, lookback=LOOKBACK
-            )  # Gets the average and standard deviation of the closing prices
-            latest_trade = self.api.get_latest_trade(
-                symbol
-            )  # Gets the price of the latest trade
-            if (
-                (latest_trade is None)
-                or (stdev is None)
-                or (average is None)
-                or (stdev == 0)
-            ):  # If either the latest trade or the standard deviation is None, skip to the next symbol
-                logging.error(
-                    f"Error getting current trade price, stdev, avg, or stdev is 0: Latest trade: {latest_trade}, stdev: {stdev}, avg: {average}"
-                )
-                continue
-            if symbol in self.purchase_info:
-                logging.debug(f"Symbol in purchase history check was hit for: {symbol}")
-                self.handle_sell_check(symbol, latest_trade, average, stdev)
-            elif latest_trade < average - (
-                stdev * Z_SCORE
-            ):  # If the latest trade is less than the average minus the standard deviation, buy the stock
-                logging.debug(
-                    f"Should be looking into a buy order for symbol: {symbol}"
-                )
-                self.handle_buy_check(symbol, latest_trade)
-            else:  # If the latest trade is within the average plus or minus the standard deviation, hold the stock
-                logging.debug(f"No action being taken for symbol: {symbol}")
-                self.handle_already_purchased(symbol, latest_trade)
+        self.sync_orders()
+        symbols = list(self.watchlist) if symbols is None else list(symbols)
+        self.refresh_bars(symbols)  # Only downloads bars newer than the ones already cached
+        latest_trades = self.api.get_latest_trades(
+            symbols
+        )  # Gets the price of the latest trade for the whole watchlist at once
+        self.snapshot = PriceSnapshot(
+            latest_trades, max_age=PRICE_MAX_AGE
+        )  # buy() sizes orders from these prices instead of fetching them again
+        self.evaluate_watchlist(symbols, latest_trades)
         i += 1
         logging.info(f"Successfully looped through watchlist. Iteration: {i}")
 
+    def refresh_bars(self, symbols):
+        if self.resampler:
+            self.bars.refresh_resampled(symbols, self.resampler)
+        else:
+            self.bars.refresh(symbols)
+
+    def priority_scan(self, symbols=None):
+        # Quick check between full scans: fresh prices only for the symbols the
+        # poller says are due (the ones near a threshold come up most often),
+        # evaluated against the cached bar stats
+        due = self.poller.due(time.monotonic(), symbols)
+        if not due:
+            return
+        latest_trades = self.api.get_latest_trades(due)
+        self.snapshot.update(latest_trades)
+        self.evaluate_watchlist(due, latest_trades)
+        logging.debug(f"Priority check of {len(due)} symbols: {due}")
+
+    async def async_buy_or_sell(self, batch_size=SCAN_BATCH_SIZE, symbols=None):
+        # Same decisions as buy_or_sell, but bars and prices for every batch of
+        # symbols are fetched concurrently. Orders still go out one at a time in
+        # watchlist order once all the data is in.
+        await asyncio.to_thread(self.sync_orders)
+        symbols = list(self.watchlist) if symbols is None else list(symbols)
+        if batch_size:
+            groups = [symbols[i : i + batch_size] for i in range(0, len(symbols), batch_size)]
+        else:  # one request per asset class, same as the synchronous scan
+            groups = [g for g in ([s for s in symbols if "/" in s], [s for s in symbols if "/" not in s]) if g]
+        _, latest_trades = await asyncio.gather(
+            asyncio.to_thread(self.refresh_bars, symbols)
+            if self.resampler
+            else self.bars.refresh_async(symbols, self.async_api, groups),
+            self.async_api.gather_latest_trades(groups),
+        )
+        self.snapshot = PriceSnapshot(latest_trades, max_age=PRICE_MAX_AGE)
+        self.evaluate_watchlist(symbols, latest_trades)
+        logging.info(f"Successfully looped through watchlist ({len(symbols)} symbols, async)")
+
     def generate_summary(self):
         message = "Summary of transactions: \n"
         message += "\nPurchases: \n"
-        purchases = [t for t in summary.items() if t[1]["order_type"] == "buy"]
+        with summary_lock:
+            entries = list(summary.items())
+        purchases = [t for t in entries if t[1]["order_type"] == "buy"]
         if purchases:
             for symbol, data in purchases:
                 message += (
@@ -164,7 +376,7 @@ class MeanReversion(TradingStrategy):
 
         # Add sales
         message += "\nSales:\n"
-        sales = [t for t in summary.items() if t[1]["order_type"] == "sell"]
+        sales = [t for t in entries if t[1]["order_type"] == "sell"]
         if sales:
             for symbol, data in sales:
                 ts = data.get("exit_time")
@@ -175,39 +387,81 @@ class MeanReversion(TradingStrategy):
             message += "No sales today\n"
 
         tweet(message)
-        summary.clear()
+        with summary_lock:
+            # orders placed while the tweet went out stay for the next summary
+            for symbol, data in entries:
+                if summary.get(symbol) is data:
+                    del summary[symbol]
+
+
+def run_scan(strategy, symbols=None):
+    if USE_ASYNC_SCAN:
+        asyncio.run(strategy.async_buy_or_sell(symbols=symbols))
+    else:
+        strategy.buy_or_sell(symbols)
+
+
+def after_close(now_pt):
+    return (now_pt.hour > 13) or (now_pt.hour == 13 and now_pt.minute >= 5)
+
+
+def build_scheduler(strategy, scheduler=None):
+    # Crypto trades around the clock; stocks are only scanned during a market
+    # session (from the cached calendar, so no requests go out for them on
+    # nights, weekends and holidays). The daily summary goes out on the first
+    # check after the close.
+    scheduler = scheduler or Scheduler()
+    crypto = sorted(s for s in strategy.watchlist if "/" in s)
+    stocks = sorted(s for s in strategy.watchlist if "/" not in s)
+    if crypto:
+        scheduler.add("crypto", CRYPTO_SCAN_SECONDS, lambda: run_scan(strategy, crypto))
+    if stocks:
+        scheduler.add(
+            "stocks", STOCK_SCAN_SECONDS, lambda: run_scan(strategy, stocks), active=lambda now: is_market_open(now)
+        )
+
+    last_summary_date = None
+
+    def summary_check():
+        nonlocal last_summary_date
+        now_pt = datetime.datetime.now(tz=strategy.tz)
+        if after_close(now_pt) and last_summary_date != now_pt.date():
+            strategy.generate_summary()
+            last_summary_date = now_pt.date()
+
+    # symbols near a threshold get re-checked in between the full scans
+    scheduler.add(
+        "priority",
+        PRIORITY_TICK_SECONDS,
+        lambda: strategy.priority_scan(crypto + (stocks if stocks and is_market_open() else [])),
+    )
+    scheduler.add("summary", SUMMARY_CHECK_SECONDS, summary_check)
+    scheduler.add(
+        "metrics",
+        SCHEDULER_METRICS_SECONDS,
+        lambda: logging.info(f"Scheduler: {scheduler.metrics()}"),
+    )
+    return scheduler
 
 
 def main():
-    last_summary_date: datetime.date | None = None
+    position_store = PositionStore(POSITION_DB_PATH)
+    purchase_info.update(position_store.purchase_info())
+    logging.info(f"Restored {len(purchase_info)} open positions from {POSITION_DB_PATH}")
+    reconcile(
+        watchlist, purchase_info, ZoneInfo("America/Los_Angeles"), position_store,
+        lookback_days=RECONCILE_LOOKBACK_DAYS,
+    )
     strategy = MeanReversion(
         watchlist,
         purchase_info,
         target_gain,
         start_date,
+        position_store,
     )
-    while True:
-        try:
-            now_pt = datetime.datetime.now(tz=strategy.tz)
-            today_pt = now_pt.date()
-            if is_market_open():
-                strategy.buy_or_sell()
-                time.sleep(120)
-            else:
-                strategy.buy_or_sell()
-                after_close = (now_pt.hour > 13) or (
-                    now_pt.hour == 13 and now_pt.minute >= 5
-                )
-
-                if after_close and (
-                    last_summary_date is None or last_summary_date != today_pt
-                ):
-                    strategy.generate_summary()
-                    last_summary_date = today_pt
-                time.sleep(120)
-        except Exception as e:
-            logging.error(f"Error in trading loop: {e}")
-            time.sleep(60)  # wait before retrying
+    trade_updates = TradeUpdatesStream(TRADE_STREAM_URL, API_KEY, SECRET_KEY, strategy.orders, fetch_order)
+    threading.Thread(target=asyncio.run, args=(trade_updates.run(),), daemon=True).start()
+    build_scheduler(strategy).run_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+import logging
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import RateLimiter
+
+# (connect, read) timeouts in seconds per kind of endpoint
+TIMEOUTS = {
+    "data": (3.05, 15),
+    "account": (3.05, 10),
+    "positions": (3.05, 10),
+    "orders": (3.05, 10),
+    "default": (3.05, 15),
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class Transport:
+    # One pooled requests.Session shared by AlpacaAPI and the order functions, so
+    # connections (and their TLS handshakes) get reused across calls. Idempotent
+    # requests are retried with jittered exponential backoff on 429/5xx and
+    # connection errors; orders are only retried when the caller says the request
+    # is safe to repeat (an order with a client_order_id can't be placed twice).
+    # Every attempt first takes a token from the shared rate limiter; order
+    # traffic (POST/DELETE, /orders) may use the tokens kept back from the rest.
+    def __init__(self, pool_size=32, max_retries=3, backoff=0.5, max_backoff=8.0, timeouts=None, limiter=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+    def endpoint(self, url):
+        if "data.alpaca.markets" in url:
+            return "data"
+        for kind in ("orders", "positions", "account"):
+            if f"/{kind}" in url:
+                return kind
+        return "default"
+
+    def delay(self, attempt, response=None):
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        # full jitter: anywhere between 0 and the exponential cap
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def request(self, method, url, timeout=None, idempotent=None, **kwargs):
+        method = method.upper()
+        timeout = timeout or self.timeouts[self.endpoint(url)]
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = self.max_retries if idempotent else 0
+        priority = method in ("POST", "DELETE", "PATCH") or self.endpoint(url) == "orders"
+
+        for attempt in range(retries + 1):
+            self.limiter.acquire(url, priority)
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries:
+                    raise
+                wait = self.delay(attempt)
+                logging.warning(f"{method} {url} failed ({e}), retrying in {wait:.2f}s")
+                time.sleep(wait)
+                continue
+
+            self.limiter.observe(url, response)
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                wait = self.delay(attempt, response)
+                logging.warning(
+                    f"{method} {url} returned {response.status_code}, retrying in {wait:.2f}s"
+                )
+                time.sleep(wait)
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+default_transport = Transport()
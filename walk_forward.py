@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from backtest import run_backtest, summarize
+from signals import SECONDS_PER_DAY
+from sweep import data_hash, param_grid, parse_space, point_key
+
+
+class ResultCache:
+    # On-disk memo of backtest results (summary, trades and equity), one .npz per
+    # (params, data slice, options).
+    # Keys are content hashes, so adding a window or a parameter point only ever
+    # computes the cells that aren't on disk yet.
+    def __init__(self, path="cache/walk_forward"):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, params, data_hash, options):
+        blob = json.dumps({"params": params, "data": data_hash, "options": options}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key):
+        file = os.path.join(self.path, f"{key}.npz")
+        if not os.path.exists(file):
+            return None
+        with np.load(file) as data:
+            if "trades" not in data.files:
+                return None  # written before trades were kept: compute it again
+            return {
+                "summary": json.loads(str(data["summary"])),
+                "trades": json.loads(str(data["trades"])),
+                "equity": data["equity"],
+            }
+
+    def put(self, key, result):
+        file = os.path.join(self.path, f"{key}.npz")
+        tmp = f"{file}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp, summary=json.dumps(result["summary"]), trades=json.dumps(result["trades"]), equity=result["equity"]
+        )
+        os.replace(tmp, file)  # readers never see a half-written file
+
+
+def make_windows(times, train_days, test_days, step_days=None):
+    # Rolling (train, test) row ranges; each test window starts where its train
+    # window ends, and windows advance by step_days (default: one test window)
+    step = (step_days or test_days) * SECONDS_PER_DAY
+    windows = []
+    start = times[0]
+    while True:
+        train_lo = int(np.searchsorted(times, start))
+        test_lo = int(np.searchsorted(times, start + train_days * SECONDS_PER_DAY))
+        test_hi = int(np.searchsorted(times, start + (train_days + test_days) * SECONDS_PER_DAY))
+        if test_lo >= len(times) or test_hi <= test_lo:
+            break
+        windows.append((train_lo, test_lo, test_lo, test_hi))
+        if test_hi >= len(times):
+            break
+        start += step
+    return windows
+
+
+def cached_backtest(cache, closes, times, symbols, params, lo, hi, options, hashes):
+    # Backtest rows [lo, hi) with lookback-1 rows of warm-up in front, so the
+    # rolling stats are ready from the first row of the window
+    warm = max(0, lo - (params["lookback"] - 1))
+    if (warm, hi) not in hashes:
+        hashes[(warm, hi)] = data_hash(closes[warm:hi], times[warm:hi], symbols)
+    key = cache.key(params, hashes[(warm, hi)], options)
+    result = cache.get(key)
+    if result is not None:
+        cache.hits += 1
+        return result
+    cache.misses += 1
+    full = run_backtest(closes[warm:hi], times[warm:hi], symbols, params, **options)
+    equity = full["equity"][lo - warm :]
+    result = {
+        "summary": summarize(full["trades"], times[lo:hi], equity, options.get("initial_cash", 10000.0)),
+        "trades": full["trades"],
+        "equity": equity,
+    }
+    cache.put(key, result)
+    return result
+
+
+def walk_forward(closes, times, symbols, points, base_params, windows, cache, metric="sharpe", options=None):
+    # For each window: pick the best point on the train slice, run it on the
+    # following test slice, and chain the test equity curves (and trades) together
+    options = dict(options or {})
+    initial_cash = options.setdefault("initial_cash", 10000.0)
+    hashes = {}
+    report = []
+    stitched = []
+    stitched_times = []
+    stitched_trades = []
+    capital = initial_cash
+
+    for train_lo, train_hi, test_lo, test_hi in windows:
+        best, best_score = None, float("-inf")
+        for point in points:
+            params = dict(base_params, **point)
+            summary = cached_backtest(cache, closes, times, symbols, params, train_lo, train_hi, options, hashes)["summary"]
+            score = summary.get(metric, float("-inf"))
+            if best is None or score > best_score:
+                best, best_score = point, score
+
+        params = dict(base_params, **best)
+        test = cached_backtest(cache, closes, times, symbols, params, test_lo, test_hi, options, hashes)
+        equity = np.asarray(test["equity"], dtype=float)
+        if len(equity):
+            scale = capital / initial_cash  # each test slice starts from the capital the last one ended with
+            stitched.append(equity * scale)
+            stitched_times.append(times[test_lo:test_hi])
+            stitched_trades += [
+                dict(t, qty=t["qty"] * scale, notional=t["notional"] * scale, pnl=None if t["pnl"] is None else t["pnl"] * scale)
+                for t in test["trades"]
+            ]
+            capital = stitched[-1][-1]
+        report.append(
+            {
+                "train": (float(times[train_lo]), float(times[train_hi - 1])),
+                "test": (float(times[test_lo]), float(times[test_hi - 1])),
+                "params": best,
+                "train_score": best_score,
+                "test_summary": test["summary"],
+            }
+        )
+        logging.info(f"Walk-forward window {len(report)}: {point_key(best)} {metric}={best_score:.4g}")
+
+    equity = np.concatenate(stitched) if stitched else np.array([])
+    out_times = np.concatenate(stitched_times) if stitched_times else np.array([])
+    return {
+        "windows": report,
+        "times": out_times,
+        "equity": equity,
+        "trades": stitched_trades,
+        "summary": summarize(stitched_trades, out_times, equity, initial_cash) if len(equity) else {},
+    }
+
+
+def main():
+    from backtest import load_closes, research_settings
+
+    STRATEGY_PARAMS, BAR_STORE_PATH, watchlist = research_settings()
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimisation of the MeanReversion rules")
+    parser.add_argument("space", nargs="+", help="name=v1,v2,... grid to choose from on each train window")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--timeframe", default="1Day")
+    parser.add_argument("--train-days", type=float, default=180)
+    parser.add_argument("--test-days", type=float, default=30)
+    parser.add_argument("--metric", default="sharpe")
+    parser.add_argument("--cache", default="cache/walk_forward")
+    args = parser.parse_args()
+
+    symbols = sorted(watchlist)
+    times, closes = load_closes(symbols, args.timeframe, args.start, args.end, BAR_STORE_PATH)
+    cache = ResultCache(args.cache)
+    result = walk_forward(
+        closes, times, symbols, param_grid(parse_space(args.space)), STRATEGY_PARAMS,
+        make_windows(times, args.train_days, args.test_days), cache, metric=args.metric,
+    )
+    for i, w in enumerate(result["windows"], 1):
+        print(f"{i:>3}. {point_key(w['params'])} train {args.metric}={w['train_score']:.4g} "
+              f"test return={w['test_summary']['total_return']:.4g}")
+    for key, value in result["summary"].items():
+        print(f"{key}: {value}")
+    print(f"cache: {cache.hits} hits, {cache.misses} computed")
+
+
+if __name__ == "__main__":
+    main()